@@ -0,0 +1,228 @@
+"""
+Benchmarks for the performance of the fixed point solvers.
+"""
+import os
+import time
+import resource
+import subprocess
+import multiprocessing as mp
+import numpy as np
+import rnn_fxpts as rfx
+import fxpt_experiments as fe
+
+# Names of the benchmarked functions, in the order they are run by run_benchmarks
+BENCHMARKS = [
+    'traverse',
+    'directional_fiber',
+    'refine_fxpts_capped',
+    'post_process_fxpts',
+    'get_unique_points_recursively',
+    'baseline_solver',
+    'identical_fixed_points',
+]
+
+def refine_scaling(N=64, num_points=2**14, worker_counts=None, seed=0):
+    """
+    Measure how refine_fxpts_parallel scales with the number of worker threads.
+    Set OMP_NUM_THREADS=1 (or equivalent for the BLAS in use) so each worker is single-threaded.
+    N is the network size
+    num_points is the number of candidate points refined
+    worker_counts[k] is the number of workers in the k^{th} trial
+      if None, powers of 2 up to the number of cpus are used (e.g., 1,...,32 on 32 cores)
+    seed seeds the random network and candidates
+    returns results, a list with one dictionary per trial, including the runtime and speedup over 1 worker
+    """
+    if worker_counts is None:
+        worker_counts = [2**k for k in range(int(np.log2(mp.cpu_count()))+1)]
+    rng = np.random.RandomState(seed)
+    W = 1.5*rng.randn(N,N)/np.sqrt(N)
+    V = np.tanh(W.dot(rng.randn(N,num_points)))
+
+    results = []
+    for num_workers in worker_counts:
+        start = time.time()
+        _, converged = rfx.refine_fxpts_parallel(W, V.copy(), num_workers)
+        runtime = time.time()-start
+        results.append({
+            "num_workers": num_workers,
+            "runtime": runtime,
+            "speedup": (results[0]["runtime"] if len(results) > 0 else runtime)/runtime,
+            "num_converged": converged.sum(),
+        })
+        print('%d workers: %f seconds, speedup %.2f, %d of %d converged'%(num_workers, runtime, results[-1]["speedup"], converged.sum(), num_points))
+    return results
+
+def benchmark_inputs(N, seed, max_steps):
+    """
+    Prepare the (untimed) inputs shared by the benchmarks for one network size.
+    The inputs are cached in the results directory, so that benchmark processes only load them
+      and the memory used to generate them does not count towards benchmark peak memory.
+    N is the network size
+    seed seeds generate_test_data and all random choices in the benchmarks
+    max_steps is the number of traversal steps used to generate candidate fixed points
+    returns W, V, fxV, where
+      W and V are the weight matrix and known fixed points from generate_test_data
+      fxV[:,p] is the p^{th} candidate fixed point found by traverse
+    """
+    filename = 'results/benchmark_inputs_N_%d_seed_%d_steps_%d.npz'%(N, seed, max_steps)
+    if not os.path.exists(filename):
+        np.random.seed(seed)
+        test_data = fe.generate_test_data([N], [1])
+        W, V = test_data['N_%d_W_0'%N], test_data['N_%d_V_0'%N]
+        _, fxV, _, _, _, _, _ = rfx.traverse(W, max_traverse_steps=max_steps)
+        fe.save_npz_file(filename, W=W, V=V, fxV=fxV)
+    with fe.load_npz_file(filename) as npz:
+        return npz['W'], npz['V'], npz['fxV']
+
+def run_benchmark(args):
+    """
+    Run one benchmark and measure its throughput and peak memory.
+    Wrapper function passed to multiprocessing.Pool by run_benchmarks,
+      so that each benchmark runs in a fresh process and peak memory is measured in isolation.
+    The benchmarked call is repeated (with the same seed) at least repeats times and for at least min_time seconds,
+      and the best repetition is reported (interference from other processes only ever slows a repetition down),
+      so that timings are stable enough to compare between runs.
+    args should be (name, N, seed, max_steps, timeout, repeats, min_time), where
+      name is one of BENCHMARKS
+      N, seed, and max_steps are as in benchmark_inputs
+      timeout is the number of seconds given to baseline_solver
+      repeats is the minimum number of repetitions
+      min_time is the minimum total number of seconds spent repeating
+    returns result, a dictionary with keys
+      "name", "N", "seed": the benchmark identifiers
+      "repetitions": the number of repetitions
+      "runtime": the least wall clock seconds spent in the benchmarked function
+      "steps", "steps_per_second": steps taken (traversal steps or baseline repetitions) and best rate, if applicable
+      "candidates", "candidates_per_second": candidate fixed points produced or processed, and best rate
+      "peak_memory": the increase in peak resident memory while the benchmark ran (bytes)
+        only exact in a freshly started process (see run_benchmarks), since ru_maxrss in a forked process
+        starts from the parent's high-water mark, so only usage beyond that mark is counted
+    """
+    name, N, seed, max_steps, timeout, repeats, min_time = args
+    W, V, fxV = benchmark_inputs(N, seed, max_steps)
+    if name not in BENCHMARKS: raise ValueError('Unknown benchmark %s'%name)
+    def run_once():
+        # returns steps (None if not applicable), candidates
+        if name == 'traverse':
+            _, fxV_found, VA, _, _, _, _ = rfx.traverse(W, max_traverse_steps=max_steps)
+            return VA.shape[1], fxV_found.shape[1]
+        if name == 'directional_fiber':
+            candidates = 0
+            for (status, fxv, _, _, step_sizes, _, _, _) in rfx.directional_fiber(W, max_traverse_steps=max_steps):
+                candidates += fxv.shape[1]
+            return step_sizes.shape[0], candidates
+        if name == 'refine_fxpts_capped':
+            U = V + 2**-8*np.random.randn(*V.shape)
+            rfx.refine_fxpts_capped(W, U)
+            return None, U.shape[1]
+        if name == 'post_process_fxpts':
+            rfx.post_process_fxpts(W, fxV)
+            return None, fxV.shape[1]
+        if name == 'get_unique_points_recursively':
+            U = np.concatenate((V, V + 2**-32*np.random.randn(*V.shape)), axis=1)
+            rfx.get_unique_points_recursively(U, neighbors=lambda X, y: (np.fabs(X-y) < 2**-21).all(axis=0), index=rfx.tolerance_index(N, 2**-21))
+            return None, U.shape[1]
+        if name == 'baseline_solver':
+            fxV_found, steps = rfx.baseline_solver(W, timeout=timeout)
+            return steps, fxV_found.shape[1]
+        if name == 'identical_fixed_points':
+            for j in range(V.shape[1]):
+                rfx.identical_fixed_points(W, V, V[:,[j]])
+            return None, V.shape[1]
+    memory_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    runtimes, steps, candidates = [], [], []
+    while len(runtimes) < repeats or sum(runtimes) < min_time:
+        np.random.seed(seed)
+        start = time.time()
+        steps_k, candidates_k = run_once()
+        runtimes.append(time.time()-start)
+        steps.append(steps_k)
+        candidates.append(candidates_k)
+    peak_memory = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - memory_start)*1024 # ru_maxrss is in KB on Linux
+    runtimes = np.array(runtimes)
+    has_steps = steps[0] is not None
+    return {
+        "name": name,
+        "N": N,
+        "seed": seed,
+        "repetitions": len(runtimes),
+        "runtime": runtimes.min(),
+        "steps": np.median(steps) if has_steps else None,
+        "steps_per_second": (np.array(steps, dtype=float)/runtimes).max() if has_steps else None,
+        "candidates": np.median(candidates),
+        "candidates_per_second": (np.array(candidates, dtype=float)/runtimes).max(),
+        "peak_memory": peak_memory,
+    }
+
+def git_revision():
+    """
+    Returns the short hash of the current git commit, or None if it cannot be determined.
+    """
+    try:
+        devnull = open(os.devnull, 'w')
+        revision = subprocess.check_output(['git','rev-parse','--short','HEAD'], stderr=devnull)
+        devnull.close()
+        return revision.decode().strip()
+    except Exception:
+        return None
+
+def run_benchmarks(network_sizes=[8,32,128,512], benchmarks=BENCHMARKS, seed=0, max_steps=2**7, timeout=1, repeats=5, min_time=1.0, label=None):
+    """
+    Run the benchmark suite and save the results for regression comparison (see compare_benchmarks).
+    Every benchmark runs in a fresh process on the same seeded test network at each size.
+    Processes are spawned (not forked) where multiprocessing supports it, so that peak memory is measured from a fresh interpreter.
+      Otherwise (e.g., Python 2) they are forked and peak memory is approximate (see run_benchmark), as marked in the output.
+    network_sizes is the list of network sizes N to benchmark
+    benchmarks is the list of benchmark names to run (see BENCHMARKS)
+    seed, max_steps, timeout, repeats and min_time are as in run_benchmark
+    label names the saved results file results/benchmarks_<label>.pkl
+      if None, the current git commit hash is used
+    returns results, a list with one dictionary per benchmark as returned by run_benchmark
+    """
+    if label is None: label = git_revision() or 'latest'
+    context = mp.get_context('spawn') if hasattr(mp, 'get_context') else mp
+    approximate = '' if hasattr(mp, 'get_context') else ' (approximate)'
+    results = []
+    for N in network_sizes:
+        benchmark_inputs(N, seed, max_steps)
+        for name in benchmarks:
+            pool = context.Pool(processes=1, maxtasksperchild=1)
+            result = pool.apply(run_benchmark, ((name, N, seed, max_steps, timeout, repeats, min_time),))
+            pool.close()
+            pool.join()
+            results.append(result)
+            print('N=%d %s: %fs (best of %d), %s steps/s, %f candidates/s, %.1fMB peak%s'%(N, name, result["runtime"], result["repetitions"],
+                '%f'%result["steps_per_second"] if result["steps"] is not None else '-', result["candidates_per_second"], result["peak_memory"]/2.**20, approximate))
+    fe.save_pkl_file('results/benchmarks_%s.pkl'%label, results)
+    return results
+
+def compare_benchmarks(base_label, new_label, tolerance=0.1):
+    """
+    Compare two saved benchmark runs and report regressions.
+    base_label and new_label should be labels passed to (or chosen by) run_benchmarks
+    tolerance is the fractional throughput loss (or memory increase) beyond which a benchmark is flagged
+    Throughput (steps and candidates per second) is compared rather than runtime,
+      since some benchmarks (e.g., baseline_solver) run for a fixed time regardless of speed.
+    returns regressions, a list of (name, N, metric, base value, new value) for every flagged benchmark
+    """
+    base = {(r["name"], r["N"]): r for r in fe.load_pkl_file('results/benchmarks_%s.pkl'%base_label)}
+    regressions = []
+    for r in fe.load_pkl_file('results/benchmarks_%s.pkl'%new_label):
+        if (r["name"], r["N"]) not in base: continue
+        b = base[(r["name"], r["N"])]
+        # no throughput ratio when the base run produced no candidates
+        ratio = '%.2fx'%(r["candidates_per_second"]/b["candidates_per_second"]) if b["candidates_per_second"] > 0 else '-'
+        flags = []
+        for metric in ["steps_per_second", "candidates_per_second"]:
+            if b[metric] is None or r[metric] is None: continue
+            if r[metric] < (1-tolerance)*b[metric]:
+                if 'SLOWER' not in flags: flags.append('SLOWER')
+                regressions.append((r["name"], r["N"], metric, b[metric], r[metric]))
+        if r["peak_memory"] > (1+tolerance)*max(b["peak_memory"], 2**20):
+            flags.append('MORE MEMORY')
+            regressions.append((r["name"], r["N"], "peak_memory", b["peak_memory"], r["peak_memory"]))
+        print('N=%d %s: throughput %s, memory %.1fMB -> %.1fMB %s'%(r["N"], r["name"], ratio, b["peak_memory"]/2.**20, r["peak_memory"]/2.**20, ' '.join(flags)))
+    return regressions
+
+if __name__ == '__main__':
+    run_benchmarks()
@@ -14,6 +14,8 @@ File names provided to methods in this module should follow these naming convent
 import os
 import sys
 import time
+import shutil
+import tempfile
 import multiprocessing as mp
 import numpy as np
 import matplotlib as mpl
@@ -53,7 +55,7 @@ def generate_test_data(network_sizes, num_samples, test_data_id=None, refine_ite
             W = rfx.mrdivide(np.arctanh(V), V)
             # Refine V
             # V, _ = rfx.refine_fxpts(W, V) # too slow on big experiments
-            V, _ = rfx.refine_fxpts_capped(W, V, max_iters=refine_iters, cap=refine_cap)
+            V, _ = rfx.refine_fxpts_batched(W, V, max_iters=refine_iters, cap=refine_cap)
             # Store
             test_data["N_%d_W_%d"%(N,s)] = W
             test_data["N_%d_V_%d"%(N,s)] = V
@@ -93,20 +95,146 @@ def generate_scarce_test_data(network_sizes, num_samples, numfx=8, test_data_id=
         np.savez(test_data_id, **test_data)
     return test_data
 
-def load_test_data(filename):
+class LazyArrays:
+    """
+    A dictionary of numpy arrays that are each loaded from disk only when accessed.
+    Arrays are read from the members of a .npz archive, or from a directory of .npy files,
+      which are memory-mapped read-only so that only the pages actually used are read.
+    Either way, accessing one array costs time and memory proportional to that array alone.
+    Each array is cached after it is first read.
+    The .npz archive stays open until close is called (or the with statement exits, when used as a context manager),
+      so callers should close it once they have read the arrays they need.
+    As a convenience it is also closed once every array has been read, but callers should not rely on this.
+    Arrays assigned into the dictionary are kept in memory and take precedence over those on disk.
+    """
+    def __init__(self, filename):
+        """
+        filename should be the file name of a .npz archive or a directory of .npy files
+        """
+        self.filename = filename
+        self.is_directory = os.path.isdir(filename)
+        if self.is_directory:
+            self.npz = None
+            self.names = sorted([f[:-4] for f in os.listdir(filename) if f.endswith('.npy')])
+        else:
+            self.npz = np.load(filename)
+            self.names = list(self.npz.files)
+        self.assigned = {}
+        self.loaded = {}
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc_info):
+        self.close()
+    def __getitem__(self, name):
+        if name in self.assigned: return self.assigned[name]
+        if name not in self.names: raise KeyError(name)
+        if name not in self.loaded:
+            if self.is_directory:
+                self.loaded[name] = np.load(os.path.join(self.filename, '%s.npy'%name), mmap_mode='r')
+            elif self.npz is None:
+                raise ValueError('%s was closed before %s was read'%(self.filename, name))
+            else:
+                self.loaded[name] = self.npz[name]
+                if all(n in self.loaded for n in self.names): self.close()
+        return self.loaded[name]
+    def __setitem__(self, name, array):
+        self.assigned[name] = array
+    def __contains__(self, name):
+        return name in self.assigned or name in self.names
+    def __iter__(self):
+        return iter(self.keys())
+    def __len__(self):
+        return len(self.keys())
+    def keys(self):
+        return self.names + [k for k in self.assigned if k not in self.names]
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+    def pop(self, name):
+        """
+        Remove an array from the dictionary and return it
+        """
+        array = self[name]
+        self.assigned.pop(name, None)
+        self.loaded.pop(name, None)
+        if name in self.names: self.names.remove(name)
+        if self.npz is not None and all(n in self.loaded for n in self.names): self.close()
+        return array
+    def close(self):
+        """
+        Close the underlying .npz archive (if any)
+        Arrays already read remain available, but no others can be read afterwards
+        """
+        if self.npz is not None: self.npz.close()
+        self.npz = None
+
+def load_test_data(filename, mmap=False):
     """
     Load test data that was generated and saved by generate_test_data.
     filename should be the file name where the data was saved.
-    returns test_data, with the same format as in generate_test_data.
-    """
-    f = open(filename,"r")
-    test_data = np.load(f)
-    test_data = {k: test_data[k] for k in test_data.files}
-    f.close()
+    Networks are loaded lazily (see LazyArrays), so only the networks accessed are read from disk.
+    if mmap == True, networks are memory-mapped from the .npy files extracted by share_test_data
+      (extracting them first if necessary), instead of being decompressed from the archive
+    returns test_data, with the same format as in generate_test_data
+      (except that test_data is a LazyArrays instead of a dictionary, which should be closed when done).
+    """
+    if mmap:
+        test_data_id = filename[:-4] if filename.endswith('.npz') else filename
+        share_test_data(test_data_id)
+        test_data = LazyArrays('%s_shared'%test_data_id)
+    else:
+        test_data = LazyArrays(filename)
     network_sizes = test_data.pop("network_sizes")
     num_samples = test_data.pop("num_samples")[0]
     return network_sizes, num_samples, test_data
 
+def share_test_data(test_data_id):
+    """
+    Prepare test data for sharing among worker processes without copying.
+    Each array in the test data archive is extracted to its own .npy file in the directory <test_data_id>_shared,
+      which workers memory-map read-only with load_test_network.
+    The operating system then keeps one copy of each network in memory for all workers,
+      and only (test_data_id, N, s) needs to be passed to each worker.
+    The files are only extracted again if the test data archive has changed since.
+    Several processes may call this at once; the first to finish extracting is used by all.
+    test_data_id should be as in generate_test_data (without file extension)
+    returns network_sizes, num_samples, as in load_test_data
+    """
+    shared_dir = '%s_shared'%test_data_id
+    stale = lambda: not os.path.exists(shared_dir) or os.path.getmtime(shared_dir) < os.path.getmtime('%s.npz'%test_data_id)
+    if stale():
+        # extract to a temporary directory first so workers never see partial data
+        temp_dir = '%s_%d'%(shared_dir, os.getpid())
+        os.makedirs(temp_dir)
+        npz = np.load('%s.npz'%test_data_id)
+        for key in npz.files:
+            np.save(os.path.join(temp_dir, '%s.npy'%key), npz[key])
+        npz.close()
+        if stale():
+            if os.path.exists(shared_dir): shutil.rmtree(shared_dir)
+            try:
+                os.rename(temp_dir, shared_dir)
+            except OSError: # another process renamed its extraction first
+                pass
+        if os.path.exists(temp_dir): shutil.rmtree(temp_dir)
+    network_sizes = np.load(os.path.join(shared_dir, 'network_sizes.npy'))
+    num_samples = np.load(os.path.join(shared_dir, 'num_samples.npy'))[0]
+    return network_sizes, num_samples
+
+def load_test_network(test_data_id, N, s):
+    """
+    Memory-map a single network from test data prepared by share_test_data.
+    The test data is extracted with share_test_data on first use if needed.
+    test_data_id should be as in generate_test_data (without file extension)
+    Loads the s^{th} network of size N
+    returns W, V, numpy.memmaps as in generate_test_data
+      the memmaps are read-only, so copy them (e.g., with np.array) before modifying them in place
+    """
+    shared_dir = '%s_shared'%test_data_id
+    if not os.path.exists(os.path.join(shared_dir, 'N_%d_W_%d.npy'%(N,s))): share_test_data(test_data_id)
+    W = np.load(os.path.join(shared_dir, 'N_%d_W_%d.npy'%(N,s)), mmap_mode='r')
+    V = np.load(os.path.join(shared_dir, 'N_%d_V_%d.npy'%(N,s)), mmap_mode='r')
+    return W, V
+
 def save_pkl_file(filename, data):
     """
     Convenience function for pickling data to a file
@@ -134,14 +262,499 @@ def save_npz_file(filename, **kwargs):
 def load_npz_file(filename):
     """
     Convenience function for loading numpy data from a file
+    Arrays are only read from the file when accessed (see LazyArrays)
+    The file stays open until npz is closed (e.g., with npz: ...)
+    returns npz, a LazyArrays with key-value pairs of the form
+      array_name: array
+    """
+    return LazyArrays(filename)
+
+class ResultsStore:
+    """
+    A single results archive per test data set, used instead of one .pkl and one .npz file per network per test.
+    Layout of the directory results/<test_data_id>_store:
+      rows.log: append-only log of pickled (result_key, results) records, one per save
+        the latest record for a result_key is its current results dictionary
+      columns.npz: optional compacted copy of the rows (see compact), with one array per results column
+        columns can be read individually without loading the rest of the table
+      arrays/<result_key>/<name>.npz (or .npy): each numpy output saved separately
+        so that arrays can be added as a test progresses and read back individually
+    Appends are single writes to a file opened in append mode, so worker processes can save concurrently.
+    """
+    def __init__(self, test_data_id, compress=True):
+        """
+        test_data_id should be as in generate_test_data (without file extension)
+        if compress == True, arrays are saved zlib-compressed (.npz)
+          otherwise arrays are saved as plain .npy files, which can be memory-mapped by get_arrays
+        """
+        self.directory = 'results/%s_store'%test_data_id
+        self.compress = compress
+        self.clear_cache()
+        if not os.path.exists(os.path.join(self.directory, 'arrays')):
+            try:
+                os.makedirs(os.path.join(self.directory, 'arrays'))
+            except OSError: # created concurrently by another process
+                pass
+    def clear_cache(self):
+        """
+        Forget the rows read from the log so far
+        """
+        self.rows = {}
+        self.row_keys = []
+        self.log_offset = 0
+    def __getstate__(self):
+        # don't pickle cached rows when passed to worker processes
+        return {'directory': self.directory, 'compress': self.compress}
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.clear_cache()
+    def read_log(self, offset):
+        """
+        Read the rows appended to the log since a given offset
+        offset should be a byte offset into rows.log at which a record starts
+        A record cut off by a crash at the end of the log is ignored.
+        returns records, offset, where
+          records[r] is the r^{th} (result_key, results) pair read
+          offset is the byte offset just past the last complete record
+        """
+        records = []
+        log_name = os.path.join(self.directory, 'rows.log')
+        if not os.path.exists(log_name): return records, offset
+        log_file = open(log_name, 'rb')
+        log_file.seek(offset)
+        while True:
+            try:
+                records.append(pkl.load(log_file))
+            except Exception: # end of log or incomplete last record
+                break
+            offset = log_file.tell()
+        log_file.close()
+        return records, offset
+    def update(self):
+        """
+        Read any rows appended to the log since the last update into the cache
+        """
+        records, self.log_offset = self.read_log(self.log_offset)
+        for (result_key, results) in records:
+            if result_key not in self.rows: self.row_keys.append(result_key)
+            self.rows[result_key] = results
+    def put(self, result_key, results=None, **arrays):
+        """
+        Save test results to the store
+        result_key is the unique string identifier for the test
+        results is the dictionary summarizing the test results
+          it replaces any results previously saved for result_key
+          if None, only arrays are saved
+        Each kwarg should have the form
+          array_name=array
+        and replaces any array previously saved with that name for result_key
+        """
+        if results is not None:
+            record = pkl.dumps((result_key, results), 2)
+            fd = os.open(os.path.join(self.directory, 'rows.log'), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            os.write(fd, record)
+            os.fsync(fd)
+            os.close(fd)
+        if len(arrays) == 0: return
+        array_dir = os.path.join(self.directory, 'arrays', result_key)
+        if not os.path.exists(array_dir): os.makedirs(array_dir)
+        for (name, array) in arrays.items():
+            # write to a temporary file first so readers never see partial arrays
+            temp_name = os.path.join(array_dir, '%s.tmp%d'%(name, os.getpid()))
+            array_file = open(temp_name, 'wb')
+            if self.compress: np.savez_compressed(array_file, **{name: array})
+            else: np.save(array_file, array)
+            array_file.close()
+            os.rename(temp_name, os.path.join(array_dir, '%s.%s'%(name, 'npz' if self.compress else 'npy')))
+    def get(self, result_key):
+        """
+        Get the latest results dictionary saved for result_key (None if there is none)
+        """
+        self.update()
+        return self.rows.get(result_key)
+    def keys(self, prefix=''):
+        """
+        Get the result_keys with saved results, in the order they were first saved
+        Only keys that start with prefix are included
+        returns keys, a list of result_key strings
+        """
+        self.update()
+        return [k for k in self.row_keys if k.startswith(prefix)]
+    def get_arrays(self, result_key, names=None, mmap_mode=None):
+        """
+        Load some or all of the arrays saved for result_key
+        names is a list of the array names to load
+          if None, all saved arrays are loaded (none if no arrays were saved for result_key)
+          raises KeyError if a named array was not saved
+        mmap_mode is passed to numpy.load for arrays saved uncompressed
+        returns npz, a dictionary with key-value pairs of the form
+          array_name: array
+        """
+        array_dir = os.path.join(self.directory, 'arrays', result_key)
+        if names is None:
+            if not os.path.isdir(array_dir): return {}
+            names = [f[:-4] for f in os.listdir(array_dir) if f[-4:] in ['.npy','.npz']]
+        npz = {}
+        for name in names:
+            filename = os.path.join(array_dir, name)
+            if os.path.exists('%s.npy'%filename):
+                npz[name] = np.load('%s.npy'%filename, mmap_mode=mmap_mode)
+            elif not os.path.exists('%s.npz'%filename):
+                raise KeyError('No array %s saved for %s'%(name, result_key))
+            else:
+                archive = np.load('%s.npz'%filename)
+                npz[name] = archive[name]
+                archive.close()
+        return npz
+    def columns(self, prefix, names):
+        """
+        Load selected results columns for every result_key starting with prefix
+        names is a list of the results dictionary keys to load
+        Only the requested columns are read from columns.npz, plus any rows appended since it was compacted.
+        returns columns, a dictionary with key-value pairs of the form
+          name: values
+        where values[r] is the value for the r^{th} result_key (None where it was not saved),
+          and columns["result_key"] is the list of result_keys
+        """
+        row_keys, table, offset = [], {}, 0
+        columns_name = os.path.join(self.directory, 'columns.npz')
+        if os.path.exists(columns_name):
+            archive = np.load(columns_name, allow_pickle=True)
+            offset = int(archive['log_offset'])
+            row_keys = list(archive['result_key'])
+            for name in names:
+                table[name] = list(archive['column_%s'%name]) if 'column_%s'%name in archive.files else [None]*len(row_keys)
+            archive.close()
+        position = dict(zip(row_keys, range(len(row_keys))))
+        records, _ = self.read_log(offset)
+        for (result_key, results) in records:
+            if result_key not in position:
+                position[result_key] = len(row_keys)
+                row_keys.append(result_key)
+                for name in names: table.setdefault(name, []).append(None)
+            for name in names: table.setdefault(name, [None]*len(row_keys))[position[result_key]] = results.get(name)
+        rows = [r for r in range(len(row_keys)) if row_keys[r].startswith(prefix)]
+        columns = {name: [table[name][r] for r in rows] for name in names}
+        columns['result_key'] = [row_keys[r] for r in rows]
+        return columns
+    def compact(self):
+        """
+        Rewrite all of the rows in the log as columns.npz, so that columns can be read individually
+        Should only be called while no other process is saving to the store
+        """
+        self.clear_cache()
+        self.update()
+        names = set()
+        for results in self.rows.values(): names.update(results.keys())
+        table = {'result_key': np.array(self.row_keys), 'log_offset': np.array(self.log_offset)}
+        for name in names:
+            column = np.empty(len(self.row_keys), dtype=object)
+            column[:] = [self.rows[k].get(name) for k in self.row_keys]
+            table['column_%s'%name] = column
+        temp_name = os.path.join(self.directory, 'columns.tmp%d'%os.getpid())
+        columns_file = open(temp_name, 'wb')
+        np.savez_compressed(columns_file, **table)
+        columns_file.close()
+        os.rename(temp_name, os.path.join(self.directory, 'columns.npz'))
+
+def find_results_store(test_data_id):
+    """
+    Find the ResultsStore for a test data set
+    test_data_id should be as in generate_test_data (without file extension)
+    returns the ResultsStore if any results have been saved in one for test_data_id, otherwise None
+      an empty store (e.g., only created by ResultsStore) does not count, so separate result files are still read
+    """
+    directory = 'results/%s_store'%test_data_id
+    rows_log = os.path.join(directory, 'rows.log')
+    arrays = os.path.join(directory, 'arrays')
+    has_rows = os.path.exists(rows_log) and os.path.getsize(rows_log) > 0
+    has_arrays = os.path.isdir(arrays) and len(os.listdir(arrays)) > 0
+    if not (has_rows or has_arrays): return None
+    return ResultsStore(test_data_id)
+
+def save_results(store, result_key, results=None, npz=None, new_arrays=None):
+    """
+    Save the results of a test, either to a ResultsStore or to separate files in the results directory
+    store should be a ResultsStore
+      if None, results are saved in results/<result_key>.pkl and results/<result_key>.npz
+    result_key is the unique string identifier for the test
+    results is the dictionary summarizing the test results (None to skip)
+    npz is the dictionary of full numpy output from the test (None to skip)
+    new_arrays is a list of the keys in npz added since it was last saved
+      only these arrays are written to the store (the .npz file is always rewritten in full)
+      if None, every array in npz is written
+    """
+    if store is None:
+        if results is not None: save_pkl_file('results/%s.pkl'%result_key, results)
+        if npz is not None: save_npz_file('results/%s.npz'%result_key, **npz)
+        return
+    if npz is None: npz = {}
+    if new_arrays is None: new_arrays = npz.keys()
+    store.put(result_key, results, **{k: npz[k] for k in new_arrays if k in npz})
+
+def load_results(store, result_key):
+    """
+    Load the results dictionary saved by save_results (None if there is none)
+    store should be as in save_results
+    """
+    if store is None:
+        filename = 'results/%s.pkl'%result_key
+        return load_pkl_file(filename) if os.path.exists(filename) else None
+    return store.get(result_key)
+
+def load_result_arrays(store, result_key, names=None):
+    """
+    Load numpy output saved by save_results
+    store should be as in save_results
+    names is a list of array names to load (None for all)
+      a store only reads the requested arrays from disk
     returns npz, a dictionary with key-value pairs of the form
       array_name: array
-    """    
-    npz = np.load(filename)
-    npz = {k:npz[k] for k in npz.files}
-    return npz
+    """
+    if store is None:
+        npz = np.load('results/%s.npz'%result_key)
+        if names is None: names = npz.files
+        arrays = {k: npz[k] for k in names}
+        npz.close()
+        return arrays
+    return store.get_arrays(result_key, names)
 
-def test_traverse(W, V, c=None, result_key=None, logfilename=os.devnull, save_result=False, save_npz=False, max_traverse_steps=2**20,max_fxpts=None):
+def load_results_columns(test_data_ids, prefix, aggregate, names):
+    """
+    Load selected results columns for the networks in one or more test data sets
+    test_data_ids should be the list of ids, each as in generate_test_data (without file extension)
+    prefix is the result_key prefix for the test type (e.g., "TvB_")
+    Results are read from each test data set's ResultsStore if it exists,
+      otherwise from the aggregate results file results/<aggregate>_<test data id>.pkl
+    names is the list of results dictionary keys to load
+    returns results, a list where
+      results[r] is a dictionary with the requested keys for the r^{th} network
+    """
+    results = []
+    for test_data_id in test_data_ids:
+        store = find_results_store(test_data_id)
+        if store is not None:
+            columns = store.columns('%s%s_N_'%(prefix, test_data_id), names)
+            results += [{name: columns[name][r] for name in names} for r in range(len(columns['result_key']))]
+        else:
+            results += [{name: r[name] for name in names} for r in load_pkl_file('results/%s_%s.pkl'%(aggregate, test_data_id))]
+    return results
+
+def predict_job_costs(result_keys, network_sizes, store=None):
+    """
+    Predict the relative cost of each job in an experiment run, for scheduling.
+    result_keys[j] should be the result_key of the j^{th} job
+    network_sizes[j] should be the network size N of the j^{th} job
+    The runtime saved by a prior run is used when available.
+    store is the ResultsStore holding prior results (None for separate files, see save_results)
+    Otherwise the mean prior runtime at the same N is used, or failing that,
+      the prior runtime at the nearest N scaled by the O(N^3) cost of the linear algebra.
+    If there are no prior runtimes at all, the cost is N^3.
+    returns costs, a flat numpy.array where costs[j] is the predicted cost of the j^{th} job
+    """
+    network_sizes = np.array(network_sizes, dtype=float)
+    costs = np.empty(len(result_keys))
+    costs[:] = np.nan
+    for j in range(len(result_keys)):
+        try:
+            results = load_results(store, result_keys[j])
+        except Exception: # partially written by an interrupted run
+            continue
+        if results is None: continue
+        if type(results) is dict: results = [results]
+        runtimes = [r['runtime'] + r.get('post_runtime',0) for r in results if 'runtime' in r]
+        if len(runtimes) > 0: costs[j] = sum(runtimes)
+    known = ~np.isnan(costs)
+    if not known.any(): return network_sizes**3
+    known_sizes = np.unique(network_sizes[known])
+    known_costs = np.array([costs[known & (network_sizes == N)].mean() for N in known_sizes])
+    for j in np.flatnonzero(~known):
+        k = np.fabs(np.log(known_sizes/network_sizes[j])).argmin()
+        costs[j] = known_costs[k]*(network_sizes[j]/known_sizes[k])**3
+    return costs
+
+def pool_indexed_job(args):
+    """
+    Wrapper function passed to multiprocessing.Pool by run_pool_jobs
+    args should be (j, test_fun, job_args)
+    returns j, test_fun(job_args)
+    """
+    j, test_fun, job_args = args
+    return j, test_fun(job_args)
+
+def load_manifest(manifest):
+    """
+    Load the result keys recorded as complete in a run manifest.
+    manifest should be the file name of the manifest (see run_pool_jobs)
+    A key only counts as complete once its full line (including the newline) is on disk,
+      so a line cut off by a crash is ignored.
+    returns completed, a set of result_key strings (empty if the manifest does not exist)
+    """
+    if not os.path.exists(manifest): return set()
+    manifest_file = open(manifest,'r')
+    lines = manifest_file.read().split('\n')
+    manifest_file.close()
+    return set(lines[:-1]) # last entry is '' or an incomplete line
+
+def run_pool_jobs(test_fun, pool_args, num_procs, costs=None, results_filename=None, result_keys=None, manifest=None, resume=False, store=None):
+    """
+    Run test_fun on every set of arguments in pool_args, most expensive jobs first.
+    Jobs are handed out one at a time, so each process takes the next job as soon as it is idle
+      and a few large networks do not straggle at the end of the run while other processes sit idle.
+    test_fun should be a module-level function (so that it can be pickled)
+    pool_args[j] should be the arguments for the j^{th} job
+    num_procs is the number of processors to use in parallel
+      if < 1, jobs are run serially in the current process
+    costs[j] should be the predicted cost of the j^{th} job (see predict_job_costs)
+      if None, jobs are run in their original order
+    if results_filename is not None, the results of all jobs are pickled there (in their original order) once every job has finished
+      an interrupted run is instead resumed from the manifest, after which the complete results are written
+    result_keys[j] should be the result_key of the j^{th} job (required if manifest is not None)
+    manifest is a file name at which the result_key of each job is appended once the job returns
+      test functions save results incrementally, so a results file alone does not mean the job finished
+      if None, no manifest is kept
+    if resume == True, jobs already recorded in the manifest are skipped,
+      and their saved results are loaded (None if they were not saved)
+      otherwise, any existing manifest is started over
+    store is the ResultsStore holding saved results (None for separate files, see save_results)
+    returns pool_results, where pool_results[j] is test_fun(pool_args[j])
+    """
+    pool_results = [None]*len(pool_args)
+    done = np.zeros(len(pool_args), dtype=bool)
+    if manifest is not None:
+        completed = load_manifest(manifest) if resume else set()
+        for j in range(len(pool_args)):
+            if result_keys[j] not in completed: continue
+            pool_results[j] = load_results(store, result_keys[j])
+            done[j] = True
+        print('%d of %d jobs already complete'%(done.sum(), len(pool_args)))
+        # rewrite completed keys so a truncated last line cannot corrupt the next entry
+        manifest_file = open(manifest,'w')
+        for j in np.flatnonzero(done): manifest_file.write('%s\n'%result_keys[j])
+        rfx.hardwrite(manifest_file, '')
+
+    order = range(len(pool_args)) if costs is None else np.argsort(-np.asarray(costs), kind='mergesort')
+    indexed_args = [(j, test_fun, pool_args[j]) for j in order if not done[j]]
+    if num_procs < 1: # don't multiprocess
+        pool = None
+        completed = (pool_indexed_job(args) for args in indexed_args)
+    else:
+        pool = mp.Pool(processes=num_procs)
+        completed = pool.imap_unordered(pool_indexed_job, indexed_args, chunksize=1)
+    for (j, results) in completed:
+        pool_results[j] = results
+        done[j] = True
+        if manifest is not None:
+            rfx.hardwrite(manifest_file, '%s\n'%result_keys[j])
+    if pool is not None:
+        pool.close()
+        pool.join()
+    if manifest is not None: manifest_file.close()
+    if results_filename is not None: save_pkl_file(results_filename, pool_results)
+    return pool_results
+
+def pool_sanity_job(args):
+    """
+    Cheap job for test_run_pool_jobs: saves and returns its results, after logging its result_key in calls.log
+    args should be (result_key, interrupt), where the job raises RuntimeError instead if interrupt is True
+    """
+    result_key, interrupt = args
+    calls_file = open('calls.log','a')
+    rfx.hardwrite(calls_file, '%s\n'%result_key)
+    calls_file.close()
+    if interrupt: raise RuntimeError('Interrupted at %s'%result_key)
+    results = {'result_key': result_key, 'runtime': 0.}
+    save_results(None, result_key, results)
+    return results
+
+def test_run_pool_jobs():
+    """
+    Sanity check that run_pool_jobs runs the most expensive jobs first,
+      and that a run interrupted partway is resumed from its manifest,
+      skipping the jobs already complete and finishing the rest
+    """
+    def read_calls():
+        calls_file = open('calls.log','r')
+        calls = calls_file.read().split('\n')[:-1]
+        calls_file.close()
+        os.remove('calls.log')
+        return calls
+    cwd = os.getcwd()
+    test_dir = tempfile.mkdtemp()
+    try:
+        os.chdir(test_dir)
+        os.mkdir('results')
+        result_keys = ['job_%d'%j for j in range(8)]
+        costs = [3, 7, 1, 5, 0, 6, 2, 4]
+        order = [result_keys[j] for j in np.argsort(costs)[::-1]]
+        # interrupt the run at the fourth most expensive job
+        pool_args = [(k, k == order[3]) for k in result_keys]
+        try:
+            run_pool_jobs(pool_sanity_job, pool_args, 0, costs=costs, result_keys=result_keys, manifest='manifest.log')
+            assert False
+        except RuntimeError: pass
+        assert read_calls() == order[:4]
+        assert load_manifest('manifest.log') == set(order[:3])
+        # resume in parallel
+        pool_args = [(k, False) for k in result_keys]
+        pool_results = run_pool_jobs(pool_sanity_job, pool_args, 2, costs=costs, results_filename='results/all.pkl',
+            result_keys=result_keys, manifest='manifest.log', resume=True)
+        assert sorted(read_calls()) == sorted(order[3:])
+        assert load_manifest('manifest.log') == set(result_keys)
+        assert [r['result_key'] for r in pool_results] == result_keys
+        assert load_pkl_file('results/all.pkl') == pool_results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(test_dir)
+    print('test run pool jobs passed!')
+
+def test_results_store():
+    """
+    Sanity check that a ResultsStore round-trips results and arrays,
+      through overwrites, compaction, rows appended after compaction, and partial memory-mapped array loads
+    """
+    cwd = os.getcwd()
+    test_dir = tempfile.mkdtemp()
+    try:
+        os.chdir(test_dir)
+        os.mkdir('results')
+        assert find_results_store('sanity') is None
+        store = ResultsStore('sanity', compress=False)
+        V, VA = np.random.randn(4,3), np.random.randn(5,7)
+        store.put('a', {'runtime': 1., 'count': 1}, V=V, VA=VA)
+        store.put('b', {'runtime': 2.})
+        store.put('a', {'runtime': 3., 'count': 2})
+        assert store.get('a') == {'runtime': 3., 'count': 2}
+        assert store.keys() == ['a', 'b']
+        store.compact()
+        assert os.path.exists(os.path.join(store.directory, 'columns.npz'))
+        store.put('c', {'runtime': 4.})
+        store = find_results_store('sanity')
+        columns = store.columns('', ['runtime', 'count'])
+        assert columns == {'result_key': ['a', 'b', 'c'], 'runtime': [3., 2., 4.], 'count': [2, None, None]}
+        assert store.columns('b', ['runtime']) == {'result_key': ['b'], 'runtime': [2.]}
+        arrays = store.get_arrays('a', ['V'], mmap_mode='r')
+        assert list(arrays.keys()) == ['V']
+        assert isinstance(arrays['V'], np.memmap) and np.array_equal(arrays['V'], V)
+        assert np.array_equal(store.get_arrays('a')['VA'], VA)
+        assert store.get_arrays('b') == {}
+        try:
+            store.get_arrays('b', ['V'])
+            assert False
+        except KeyError: pass
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(test_dir)
+    print('test results store passed!')
+
+def run_tests():
+    """
+    Run sanity checks
+    """
+    test_run_pool_jobs()
+    test_results_store()
+
+def test_traverse(W, V, c=None, result_key=None, logfilename=os.devnull, save_result=False, save_npz=False, max_traverse_steps=2**20,max_fxpts=None,checkpoint=None,streaming=False,store=None,trace=None):
     """
     Test the traverse algorithm on a single test network.
     W should be the weight matrix (N by N numpy.array)
@@ -154,18 +767,32 @@ def test_traverse(W, V, c=None, result_key=None, logfilename=os.devnull, save_re
     if save_npz == True, traverse numpy outputs are saved in a file with name based on result_key
     max_traverse_steps is number of steps allowed for traverse algorithm
     max_fxpts is number of fxpts after which traverse can terminate
+    checkpoint is a base file name at which traversal progress is saved (see rfx.traverse)
+      if a checkpoint exists from an interrupted test, traversal resumes from it
+      the checkpoint is removed once the test completes
+      if None, no progress is saved
+    if streaming == True, candidates are post-processed by a rfx.PostProcessor concurrently with traversal
+      post_runtime then only measures the post-processing left over after traversal finishes
+    store is a ResultsStore in which to save results instead of separate files (see save_results)
+    trace is a file name at which per-step timings are saved as a rfx.TraversalTrace
+      a summary of the trace is included in results under "trace_summary"
+      if None, no timings are recorded
     returns results, npz, where
       results is a dictionary summarizing the test results
       npz is a dictionary with full numpy output from traverse
     """
     N = W.shape[0]
-    logfile = open(logfilename,'w')
+    logfile = rfx.ProgressLog(logfilename,'w' if checkpoint is None else 'a')
 
     # run traversal
     rfx.hardwrite(logfile,'Running traversal: %s...\n'%result_key)
+    post_processor = rfx.PostProcessor(W, logfile=logfile) if streaming else None
+    candidate_callback = post_processor.put if streaming else None
+    traversal_trace = None if trace is None else rfx.TraversalTrace(trace, mode='w' if checkpoint is None else 'a')
     start = time.clock()
-    status, fxV, VA, c, step_sizes, s_mins, residuals = rfx.traverse(W, c=c, max_traverse_steps = max_traverse_steps, max_fxpts=max_fxpts,logfile=logfile)
+    status, fxV, VA, c, step_sizes, s_mins, residuals = rfx.traverse(W, c=c, max_traverse_steps = max_traverse_steps, max_fxpts=max_fxpts,logfile=logfile,checkpoint=checkpoint,resume=True,candidate_callback=candidate_callback,trace=traversal_trace)
     runtime = time.clock()-start
+    if checkpoint is not None: runtime = float(rfx.load_checkpoint_state(checkpoint)['runtime']) # includes interrupted runs
     num_steps = VA.shape[1]
 
     results = {
@@ -178,103 +805,125 @@ def test_traverse(W, V, c=None, result_key=None, logfilename=os.devnull, save_re
         "min_s_min": s_mins.min(),
         "num_fxV": fxV.shape[1]
     }
+    if trace is not None: results["trace_summary"] = rfx.trace_summary(traversal_trace.array())
     npz = {"W":W, "V":V, "VA":VA, "fxV":fxV, "c":c, "residuals":residuals}
-    if save_result: save_pkl_file('results/%s.pkl'%result_key, results)
-    if save_npz: save_npz_file('results/%s.npz'%result_key, **npz)
+    save_results(store, result_key, results if save_result else None, npz if save_npz else None)
 
     # Post-process
     # count unique fixed points found
     start = time.clock()
-    fxV_unique, fxV_converged = rfx.post_process_fxpts(W, fxV, logfile=logfile)
+    if streaming:
+        fxV_unique, fxV_converged = post_processor.finish()
+    else:
+        fxV_unique, fxV_converged = rfx.post_process_fxpts(W, fxV, logfile=logfile)
     post_runtime = time.clock()-start
     results['post_runtime'] = post_runtime
     results['num_fxV_unique'] = fxV_unique.shape[1]
     npz["fxV_unique"] = fxV_unique
     npz["fxV_converged"] = fxV_converged
-    if save_result: save_pkl_file('results/%s.pkl'%result_key, results)
-    if save_npz: save_npz_file('results/%s.npz'%result_key, **npz)
+    save_results(store, result_key, results if save_result else None, npz if save_npz else None, new_arrays=['fxV_unique', 'fxV_converged'])
 
     # check for ground truth inclusion
     rfx.hardwrite(logfile,'Checking ground truths...\n')
     V_found = np.zeros(N, dtype=bool)
-    Winv = np.linalg.inv(W)
     if fxV_converged.shape[1] > V.shape[1]:
-        for j in range(V.shape[1]):
-            identical, _, _ = rfx.identical_fixed_points(W, fxV_converged, V[:,[j]], Winv)
-            V_found[j] = identical.any()
+        pairs, _ = rfx.identical_fixed_points_graph(W, fxV_converged, V)
+        V_found[pairs[1]] = True
     else:
-        for j in range(fxV_converged.shape[1]):
-            identical, _, _ = rfx.identical_fixed_points(W, V, fxV_converged[:,[j]], Winv)
-            V_found |= identical
+        pairs, _ = rfx.identical_fixed_points_graph(W, V, fxV_converged)
+        V_found[pairs[0]] = True
     results["num_V_found"] = V_found.sum(),
     npz["V_found"] = V_found
-    if save_result: save_pkl_file('results/%s.pkl'%result_key, results)
-    if save_npz: save_npz_file('results/%s.npz'%result_key, **npz)
+    save_results(store, result_key, results if save_result else None, npz if save_npz else None, new_arrays=['V_found'])
 
     finish_str = "pid %d: %s, %d fxV (%d unique), %d of %d gt, %d iters (length ~ %f, step_size ~ %f).  restarting..."%(os.getpid(), result_key, fxV.shape[1], fxV_unique.shape[1], V_found.sum(), N, num_steps, step_sizes.sum(), step_sizes.mean())
     rfx.hardwrite(logfile,'%s\n'%finish_str)
     print(finish_str)
 
+    if checkpoint is not None: rfx.remove_checkpoint(checkpoint)
     logfile.close()
     return results, npz
 
 def pool_test_traverse(args):
     """
     Wrapper function passed to multiprocessing.Pool
+    args should be (test_data_id, N, s) followed by the test_traverse arguments after W and V
     """
-    results, _ = test_traverse(*args)
+    W, V = load_test_network(*args[:3])
+    results, _ = test_traverse(W, V, *args[3:])
     return results
 
-def run_traverse_experiments(test_data_id, num_procs, max_traverse_steps=2**20,max_fxpts=None):
+def run_traverse_experiments(test_data_id, num_procs, max_traverse_steps=2**20,max_fxpts=None,streaming=False,resume=False,use_store=False,trace=False):
     """
     Run test_traverse on every network in the test data
     Uses multi-processing to test on multiple networks in parallel
+    Networks are scheduled most expensive first, and results are saved as each one finishes (see run_pool_jobs)
+    When multi-processing, traversal progress is checkpointed in the results directory,
+      so re-running after an interruption resumes each unfinished network where it left off
     test_data_id should be as in generate_test_data (without file extension)
     num_procs is the number of processors to use in parallel
     max_traverse_steps is number of steps allowed for traverse algorithm
     max_fxpts is number of fxpts after which traverse can terminate
+    streaming is passed to test_traverse (post-processing concurrently with traversal)
+    if trace == True, per-step timings of each traversal are saved in results/<result key>.trace (see test_traverse)
+    if resume == True, networks recorded as complete in the run manifest are skipped (see run_pool_jobs)
+    if use_store == True, results are saved in a ResultsStore instead of separate files
     returns pool_results, a list of results with one entry per network
     """
 
-    network_sizes, num_samples, test_data = load_test_data('%s.npz'%test_data_id)
+    network_sizes, num_samples = share_test_data(test_data_id)
 
     cpu_count = mp.cpu_count()
     print('%d cpus, using %d'%(cpu_count, num_procs))
 
-    pool_args = []
+    store = ResultsStore(test_data_id) if use_store else None
+    pool_args, result_keys = [], []
     for (N, S) in zip(network_sizes, num_samples):
         for s in range(S):
-            W = test_data['N_%d_W_%d'%(N,s)]
-            V = test_data['N_%d_V_%d'%(N,s)]
             c = None
             result_key = 'traverse_%s_N_%d_s_%d'%(test_data_id, N, s)
             if num_procs > 0:
                 logfilename = 'logs/%s.log'%result_key
                 save_result=True
                 save_npz=True
+                checkpoint = 'results/%s_checkpoint'%result_key
+                trace_file = 'results/%s.trace'%result_key if trace else None
             else:
                 logfilename = 'logs/temp.txt'
                 save_result=False
                 save_npz=False
-            pool_args.append((W,V,c,result_key,logfilename,save_result,save_npz,max_traverse_steps,max_fxpts))
+                checkpoint = None
+                trace_file = None
+            pool_args.append((test_data_id,N,s,c,result_key,logfilename,save_result,save_npz,max_traverse_steps,max_fxpts,checkpoint,streaming,store,trace_file))
+            result_keys.append(result_key)
+    costs = predict_job_costs(result_keys, [args[1] for args in pool_args], store=store)
     start_time = time.time()
-    test_fun = pool_test_traverse
-    if num_procs < 1: # don't multiprocess
-        pool_results = [test_fun(args) for args in pool_args]
-    else:
-        pool = mp.Pool(processes=num_procs)
-        pool_results = pool.map(test_fun, pool_args)
-        pool.close()
-        pool.join()
-    print('total time: %f. saving results...'%(time.time()-start_time))
-
-    results_file = open('results/traverse_%s.pkl'%test_data_id, 'w')
-    pkl.dump(pool_results, results_file)
-    results_file.close()
+    pool_results = run_pool_jobs(pool_test_traverse, pool_args, num_procs, costs=costs, results_filename='results/traverse_%s.pkl'%test_data_id, result_keys=result_keys, manifest='results/traverse_%s_manifest.txt'%test_data_id, resume=resume, store=store)
+    if store is not None: store.compact()
+    print('total time: %f. results saved.'%(time.time()-start_time))
 
     return pool_results
 
-def test_Wc(W, V, result_key=None, logfilename=os.devnull, save_result=False):
+def show_traverse_traces(test_data_id):
+    """
+    Report where traversal time went at each network size, from the traces saved by run_traverse_experiments(trace=True)
+    test_data_id should be as in generate_test_data (without file extension)
+    returns reports, a dictionary with key-value pairs of the form
+      N: the rfx.trace_report of all traces at network size N combined
+    """
+    network_sizes, num_samples = share_test_data(test_data_id)
+    reports = {}
+    for (N, S) in zip(network_sizes, num_samples):
+        records = []
+        for s in range(S):
+            trace_file = 'results/traverse_%s_N_%d_s_%d.trace'%(test_data_id, N, s)
+            if os.path.exists(trace_file): records.append(rfx.load_trace(trace_file))
+        if len(records) == 0: continue
+        reports[N] = rfx.trace_report(np.concatenate(records))
+        print('N = %d (%d networks): %s'%(N, len(records), reports[N]))
+    return reports
+
+def test_Wc(W, V, result_key=None, logfilename=os.devnull, save_result=False, batched=False):
     """
     Test traverse with different c choices on a single test network.
     One choice is tested for each of the 2^N possible values of numpy.sign(W.dot(c)).
@@ -283,24 +932,35 @@ def test_Wc(W, V, result_key=None, logfilename=os.devnull, save_result=False):
     result_key is a unique string identifier for the test
     logfilename is a file name at which to write progress updates
     if save_result == True, results are saved in a file with name based on result_key
+    if batched == True, all c choices are traversed in lockstep with rfx.traverse_batch,
+      and each runtime is the batch runtime divided by the number of c choices
     returns results, a list where
       results[i] is a dictionary summarizing the test results for the i^{th} choice of c
     """
     N = W.shape[0]
-    logfile = open(logfilename,'w')
+    logfile = rfx.ProgressLog(logfilename,'w')
     rfx.hardwrite(logfile,'Running Wc: %s...\n'%result_key)
 
     signs = ptr.lattice(-np.ones((N,1)),np.ones((N,1)),2)
     C = rfx.solve(W, signs + 0.1*(np.random.rand(*signs.shape)-0.5))
+    if batched:
+        rfx.hardwrite(logfile,'Running %d traversals in batch...\n'%signs.shape[1])
+        start = time.clock()
+        batch = rfx.traverse_batch(W, C=C, max_traverse_steps = 2**20, logfile=logfile)
+        batch_runtime = (time.clock()-start)/signs.shape[1]
     all_fxV = []
     results = []
     for s in range(signs.shape[1]):
 
         # run traversal
-        rfx.hardwrite(logfile,'Running traversal %d...\n'%s)
-        start = time.clock()
-        status, fxV, VA, c, step_sizes, s_mins, residuals = rfx.traverse(W, c=C[:,[s]], max_traverse_steps = 2**20, logfile=logfile)
-        runtime = time.clock()-start
+        if batched:
+            status, fxV, VA, c, step_sizes, s_mins, residuals = batch[s]
+            runtime = batch_runtime
+        else:
+            rfx.hardwrite(logfile,'Running traversal %d...\n'%s)
+            start = time.clock()
+            status, fxV, VA, c, step_sizes, s_mins, residuals = rfx.traverse(W, c=C[:,[s]], max_traverse_steps = 2**20, logfile=logfile)
+            runtime = time.clock()-start
         num_steps = VA.shape[1]
 
         # count unique fixed points found
@@ -321,9 +981,8 @@ def test_Wc(W, V, result_key=None, logfilename=os.devnull, save_result=False):
         # check for ground truth inclusion
         rfx.hardwrite(logfile,'Checking ground truths...\n')
         V_found = np.zeros(N, dtype=bool)
-        for j in range(V.shape[1]):
-            identical, _, _ = rfx.identical_fixed_points(W, fxV_unique, V[:,[j]])
-            V_found[j] = identical.any()
+        pairs, _ = rfx.identical_fixed_points_graph(W, fxV_unique, V)
+        V_found[pairs[1]] = True
         result["num_V_found"] = V_found.sum(),
 
         results.append(result)
@@ -349,50 +1008,44 @@ def test_Wc(W, V, result_key=None, logfilename=os.devnull, save_result=False):
 def pool_test_Wc(args):
     """
     Wrapper function passed to multiprocessing.Pool
+    args should be (test_data_id, N, s) followed by the test_Wc arguments after W and V
     """
-    return test_Wc(*args)
+    W, V = load_test_network(*args[:3])
+    return test_Wc(W, V, *args[3:])
 
-def run_Wc_experiments(test_data_id, num_procs):
+def run_Wc_experiments(test_data_id, num_procs, batched=False, resume=False):
     """
     Run test_Wc on every network in the test data
     Uses multi-processing to test on multiple networks in parallel
+    Networks are scheduled most expensive first, and results are saved as each one finishes (see run_pool_jobs)
     test_data_id should be as in generate_test_data (without file extension)
     num_procs is the number of processors to use in parallel
+    batched should be as in test_Wc
+    if resume == True, networks recorded as complete in the run manifest are skipped (see run_pool_jobs)
     returns pool_results, a list of results with one entry per network
     """
 
-    network_sizes, num_samples, test_data = load_test_data('%s.npz'%test_data_id)
+    network_sizes, num_samples = share_test_data(test_data_id)
 
     cpu_count = mp.cpu_count()
     print('%d cpus, using %d'%(cpu_count, num_procs))
 
-    pool_args = []
+    pool_args, result_keys = [], []
     for (N, S) in zip(network_sizes, num_samples):
         for s in range(S):
-            W = test_data['N_%d_W_%d'%(N,s)]
-            V = test_data['N_%d_V_%d'%(N,s)]
             result_key = '%s_Wc_N_%d_s_%d'%(test_data_id, N, s)
             logfilename =  'logs/%s.log'%result_key
             save_result=True
-            pool_args.append((W,V,result_key,logfilename,save_result))
+            pool_args.append((test_data_id,N,s,result_key,logfilename,save_result,batched))
+            result_keys.append(result_key)
+    costs = predict_job_costs(result_keys, [args[1] for args in pool_args])
     start_time = time.time()
-    test_fun = pool_test_Wc
-    if num_procs < 1: # don't multiprocess
-        pool_results = [test_fun(args) for args in pool_args]
-    else:
-        pool = mp.Pool(processes=num_procs)
-        pool_results = pool.map(test_fun, pool_args)
-        pool.close()
-        pool.join()
-    print('total time: %f. saving results...'%(time.time()-start_time))
-
-    results_file = open('results/%s_Wc.pkl'%test_data_id, 'w')
-    pkl.dump(pool_results, results_file)
-    results_file.close()
+    pool_results = run_pool_jobs(pool_test_Wc, pool_args, num_procs, costs=costs, results_filename='results/%s_Wc.pkl'%test_data_id, result_keys=result_keys, manifest='results/%s_Wc_manifest.txt'%test_data_id, resume=resume)
+    print('total time: %f. results saved.'%(time.time()-start_time))
 
     return pool_results
 
-def test_baseline(W, V, timeout=60, result_key=None, logfilename=os.devnull, save_result=False, save_npz=False):
+def test_baseline(W, V, timeout=60, result_key=None, logfilename=os.devnull, save_result=False, save_npz=False, store=None):
     """
     Test the baseline solver on a single test network.
     W should be the weight matrix (N by N numpy.array)
@@ -402,12 +1055,13 @@ def test_baseline(W, V, timeout=60, result_key=None, logfilename=os.devnull, sav
     logfilename is a file name at which to write progress updates
     if save_result == True, results are saved in a file with name based on result_key
     if save_npz == True, solver numpy outputs are saved in a file with name based on result_key
+    store is a ResultsStore in which to save results instead of separate files (see save_results)
     returns results, npz, where
       results is a dictionary summarizing the test results
       npz is a dictionary with full numpy output from the solver
     """
     N = W.shape[0]
-    logfile = open(logfilename,'w')
+    logfile = rfx.ProgressLog(logfilename,'w')
 
     # run baseline
     start = time.clock()
@@ -422,8 +1076,7 @@ def test_baseline(W, V, timeout=60, result_key=None, logfilename=os.devnull, sav
     }
 
     npz = {"W":W, "V":V, "fxV":fxV}
-    if save_result: save_pkl_file('results/%s.pkl'%result_key, results)
-    if save_npz: save_npz_file('results/%s.npz'%result_key, **npz)
+    save_results(store, result_key, results if save_result else None, npz if save_npz else None)
 
     rfx.hardwrite(logfile,"Post-processing...\n")
     start = time.clock()
@@ -433,19 +1086,16 @@ def test_baseline(W, V, timeout=60, result_key=None, logfilename=os.devnull, sav
     results["num_fxV_unique"] = fxV_unique.shape[1]
     npz["fxV_unique"] = fxV_unique
     npz["fxV_converged"] = fxV_converged
-    if save_result: save_pkl_file('results/%s.pkl'%result_key, results)
-    if save_npz: save_npz_file('results/%s.npz'%result_key, **npz)
+    save_results(store, result_key, results if save_result else None, npz if save_npz else None, new_arrays=['fxV_unique', 'fxV_converged'])
 
     # check for ground truth inclusion
     rfx.hardwrite(logfile,'checking ground truths...\n')
     V_found = np.zeros(N, dtype=bool)
-    for j in range(V.shape[1]):
-        identical, _, _ = rfx.identical_fixed_points(W, fxV_converged, V[:,[j]])
-        V_found[j] = identical.any()
+    pairs, _ = rfx.identical_fixed_points_graph(W, fxV_converged, V)
+    V_found[pairs[1]] = True
     results["num_V_found"] = V_found.sum()
     npz["V_found"] = V_found
-    if save_result: save_pkl_file('results/%s.pkl'%result_key, results)
-    if save_npz: save_npz_file('results/%s.npz'%result_key, **npz)
+    save_results(store, result_key, results if save_result else None, npz if save_npz else None, new_arrays=['V_found'])
 
     finish_str = "pid %d: %s, %d fxV (%d unique), %d of %d gt, %d reps.  restarting..."%(os.getpid(), result_key, fxV_converged.shape[1], fxV_unique.shape[1], V_found.sum(), N, num_reps)
     rfx.hardwrite(logfile,"%s\n"%finish_str)
@@ -457,81 +1107,76 @@ def test_baseline(W, V, timeout=60, result_key=None, logfilename=os.devnull, sav
 def pool_test_baseline(args):
     """
     Wrapper function passed to multiprocessing.Pool
+    args should be (test_data_id, N, s) followed by the test_baseline arguments after W and V
     """
-    results, _ = test_baseline(*args)
+    W, V = load_test_network(*args[:3])
+    results, _ = test_baseline(W, V, *args[3:])
     return results
 
-def run_baseline_experiments(test_data_id, num_procs):
+def run_baseline_experiments(test_data_id, num_procs, resume=False, use_store=False):
     """
     Run test_baseline on every network in the test data
     Uses multi-processing to test on multiple networks in parallel
+    Networks are scheduled most expensive first, and results are saved as each one finishes (see run_pool_jobs)
     test_data_id should be as in generate_test_data (without file extension)
     num_procs is the number of processors to use in parallel
+    if resume == True, networks recorded as complete in the run manifest are skipped (see run_pool_jobs)
+    if use_store == True, results are saved in a ResultsStore instead of separate files
     returns pool_results, a list of results with one entry per network
     """
 
-    network_sizes, num_samples, test_data = load_test_data('%s.npz'%test_data_id)
+    network_sizes, num_samples = share_test_data(test_data_id)
 
     cpu_count = mp.cpu_count()
     print('%d cpus, using %d'%(cpu_count, num_procs))
 
-    pool_args = []
+    store = ResultsStore(test_data_id) if use_store else None
+    pool_args, result_keys = [], []
     for (N, S) in zip(network_sizes, num_samples):
         for s in range(S):
-            W = test_data['N_%d_W_%d'%(N,s)]
-            V = test_data['N_%d_V_%d'%(N,s)]
             traverse_result_key = 'traverse_%s_N_%d_s_%d'%(test_data_id, N, s)
-            traverse_results_file = open('results/%s.pkl'%traverse_result_key, 'r')
-            traverse_results = pkl.load(traverse_results_file)
-            traverse_results_file.close()
+            traverse_results = load_results(store, traverse_result_key)
             timeout = traverse_results['runtime']
             result_key = 'baseline_%s_N_%d_s_%d'%(test_data_id, N, s)
             logfilename = 'logs/baseline_%s_N_%d_s_%d.log'%(test_data_id, N, s)
             save_result=True
             save_npz=True
-            pool_args.append((W,V,timeout,result_key,logfilename,save_result,save_npz))
+            pool_args.append((test_data_id,N,s,timeout,result_key,logfilename,save_result,save_npz,store))
+            result_keys.append(result_key)
+    costs = predict_job_costs(result_keys, [args[1] for args in pool_args], store=store)
     start_time = time.time()
-    test_fun = pool_test_baseline
-    if num_procs < 1: # don't multiprocess
-        pool_results = [test_fun(args) for args in pool_args]
-    else:
-        pool = mp.Pool(processes=num_procs)
-        pool_results = pool.map(test_fun, pool_args)
-        pool.close()
-        pool.join()
-    print('total time: %f. saving results...'%(time.time()-start_time))
-
-    results_file = open('results/baseline_%s.pkl'%test_data_id, 'w')
-    pkl.dump(pool_results, results_file)
-    results_file.close()
+    pool_results = run_pool_jobs(pool_test_baseline, pool_args, num_procs, costs=costs, results_filename='results/baseline_%s.pkl'%test_data_id, result_keys=result_keys, manifest='results/baseline_%s_manifest.txt'%test_data_id, resume=resume, store=store)
+    if store is not None: store.compact()
+    print('total time: %f. results saved.'%(time.time()-start_time))
 
     return pool_results
 
-def test_TvB(test_data_id, N, s, logfilename=os.devnull, save_result=False, save_npz=False):
+def test_TvB(test_data_id, N, s, logfilename=os.devnull, save_result=False, save_npz=False, store=None):
     """
     Compare the traverse and baseline results on a single test network.
     test_data_id should be as in generate_test_data (without file extension)
-    Inspects the s^{th} network of size N
+    Inspects the s^{th} network of size N, loaded read-only with load_test_network
     logfilename is a file name at which to write progress updates
     if save_result == True, results are saved in a file with name based on test_data_id
     if save_npz == True, numpy outputs are saved in a file with name based on test_data_id
+    store is a ResultsStore from which to load and in which to save results instead of separate files (see save_results)
     returns results, npz, where
       results is a dictionary summarizing the test results
       npz is a dictionary with full numpy output
     """
-    logfile = open(logfilename,'w')
+    logfile = rfx.ProgressLog(logfilename,'w')
 
     rfx.hardwrite(logfile,'Loading results...\n')
-    _,_,test_data = load_test_data('%s.npz'%test_data_id)
-    W = test_data['N_%d_W_%d'%(N,s)]
-    baseline_npz = np.load('results/baseline_%s_N_%d_s_%d.npz'%(test_data_id, N, s))
-    traverse_npz = np.load('results/traverse_%s_N_%d_s_%d.npz'%(test_data_id, N, s))
+    W, _ = load_test_network(test_data_id, N, s)
+    baseline_npz = load_result_arrays(store, 'baseline_%s_N_%d_s_%d'%(test_data_id, N, s), ['fxV_unique'])
+    traverse_npz = load_result_arrays(store, 'traverse_%s_N_%d_s_%d'%(test_data_id, N, s), ['fxV_unique'])
     fxV_baseline = baseline_npz["fxV_unique"]
     fxV_traverse = traverse_npz["fxV_unique"]
     #### !!! simpler unique test
     neighbors = lambda X, y: (np.fabs(X-y) < 2**-21).all(axis=0)
-    fxV_baseline = rfx.get_unique_points_recursively(fxV_baseline, neighbors=neighbors)
-    fxV_traverse = rfx.get_unique_points_recursively(fxV_traverse, neighbors=neighbors)
+    index = rfx.tolerance_index(N, 2**-21)
+    fxV_baseline = rfx.get_unique_points_recursively(fxV_baseline, neighbors=neighbors, index=index)
+    fxV_traverse = rfx.get_unique_points_recursively(fxV_traverse, neighbors=neighbors, index=index)
     # set trivials to true zero
     fxV_baseline[:,np.fabs(fxV_baseline).max(axis=0) < 2**-21] = 0
     fxV_traverse[:,np.fabs(fxV_traverse).max(axis=0) < 2**-21] = 0
@@ -547,14 +1192,13 @@ def test_TvB(test_data_id, N, s, logfilename=os.devnull, save_result=False, save
         'B':B,
     }
     npz = {"W":W, "fxV_baseline":fxV_baseline,"fxV_traverse":fxV_traverse}
-    if save_result: save_pkl_file('results/%s.pkl'%result_key, results)
-    if save_npz: save_npz_file('results/%s.npz'%result_key, **npz)
+    save_results(store, result_key, results if save_result else None, npz if save_npz else None)
 
     # Get union
     rfx.hardwrite(logfile,'unioning %d + %d...\n'%(T, B))
     fxV_union = np.concatenate((fxV_traverse, fxV_baseline), axis=1)
     # neighbors = lambda X, y: rfx.identical_fixed_points(W, X, y)[0]
-    fxV_union = rfx.get_unique_points_recursively(fxV_union, neighbors=neighbors)
+    fxV_union = rfx.get_unique_points_recursively(fxV_union, neighbors=neighbors, index=index)
     TB = fxV_union.shape[1]
     finish_str = 'N:%d,T:%d, B:%d, T|B:%d, T&B:%d, T-B:%d(%f), B-T:%d(%f)'%(N,T,B,TB,T+B-TB,TB-B,1.*(TB-B)/TB,TB-T,1.*(TB-T)/TB)
     rfx.hardwrite(logfile,'%s\n'%finish_str)
@@ -565,8 +1209,7 @@ def test_TvB(test_data_id, N, s, logfilename=os.devnull, save_result=False, save
     results['T-B']=TB-B
     results['B-T']=TB-T
     npz['fxV_union'] = fxV_union
-    if save_result: save_pkl_file('results/%s.pkl'%result_key, results)
-    if save_npz: save_npz_file('results/%s.npz'%result_key, **npz)
+    save_results(store, result_key, results if save_result else None, npz if save_npz else None, new_arrays=['fxV_union'])
 
     # distances around means
     baseline_mean = fxV_baseline.mean(axis=1)
@@ -579,7 +1222,7 @@ def test_TvB(test_data_id, N, s, logfilename=os.devnull, save_result=False, save
     # traverse_dist = np.mean(np.fabs(fxV_traverse-traverse_mean[:,np.newaxis]).max(axis=0))
     results['baseline_dist'] = baseline_dist
     results['traverse_dist'] = traverse_dist
-    if save_result: save_pkl_file('results/%s.pkl'%result_key, results)
+    if save_result: save_results(store, result_key, results)
 
     # vertex proximities:
     # L2
@@ -590,7 +1233,7 @@ def test_TvB(test_data_id, N, s, logfilename=os.devnull, save_result=False, save
     # fxV_traverse_dist_v = np.fabs(fxV_traverse - np.sign(fxV_traverse)).max(axis=0)
     results['baseline_dist_v'] = fxV_baseline_dist_v.mean()
     results['traverse_dist_v'] = fxV_traverse_dist_v.mean()
-    if save_result: save_pkl_file('results/%s.pkl'%result_key, results)
+    if save_result: save_results(store, result_key, results)
 
     logfile.close()
     return results, npz
@@ -602,44 +1245,40 @@ def pool_test_TvB(args):
     results, _ = test_TvB(*args)
     return results
 
-def run_TvB_experiments(test_data_id, num_procs):
+def run_TvB_experiments(test_data_id, num_procs, resume=False, use_store=False):
     """
     Run test_TvB on every network in the test data
     Uses multi-processing to test on multiple networks in parallel
+    Networks are scheduled most expensive first, and results are saved as each one finishes (see run_pool_jobs)
     test_data_id should be as in generate_test_data (without file extension)
     num_procs is the number of processors to use in parallel
+    if resume == True, networks recorded as complete in the run manifest are skipped (see run_pool_jobs)
+    if use_store == True, results are saved in a ResultsStore instead of separate files
     returns pool_results, a list of results with one entry per network
     """
 
     cpu_count = mp.cpu_count()
     print('%d cpus, using %d'%(cpu_count, num_procs))
 
-    pool_args = []
-    network_sizes, num_samples, test_data = load_test_data('%s.npz'%test_data_id)
+    store = ResultsStore(test_data_id) if use_store else None
+    pool_args, result_keys = [], []
+    network_sizes, num_samples = share_test_data(test_data_id)
     for (N,S) in zip(network_sizes, num_samples):
         for s in range(S):
             logfilename = 'logs/tvb_%s_N_%d_s_%d.log'%(test_data_id, N, s)
             save_result=True
             save_npz=True
-            pool_args.append((test_data_id, N, s, logfilename, save_result, save_npz))
+            pool_args.append((test_data_id, N, s, logfilename, save_result, save_npz, store))
+            result_keys.append('TvB_%s_N_%d_s_%d'%(test_data_id, N, s))
+    costs = predict_job_costs(result_keys, [args[1] for args in pool_args], store=store)
     start_time = time.time()
-    test_fun = pool_test_TvB
-    if num_procs < 1: # don't multiprocess
-        pool_results = [test_fun(args) for args in pool_args]
-    else:
-        pool = mp.Pool(processes=num_procs)
-        pool_results = pool.map(test_fun, pool_args)
-        pool.close()
-        pool.join()
-    print('total time: %f. saving results...'%(time.time()-start_time))
-
-    results_file = open('results/tvb_%s.pkl'%test_data_id, 'w')
-    pkl.dump(pool_results, results_file)
-    results_file.close()
+    pool_results = run_pool_jobs(pool_test_TvB, pool_args, num_procs, costs=costs, results_filename='results/tvb_%s.pkl'%test_data_id, result_keys=result_keys, manifest='results/tvb_%s_manifest.txt'%test_data_id, resume=resume, store=store)
+    if store is not None: store.compact()
+    print('total time: %f. results saved.'%(time.time()-start_time))
 
     return pool_results
 
-def test_TvB_stability(test_data_id, N, s, logfilename=os.devnull, save_result=False, save_npz=False):
+def test_TvB_stability(test_data_id, N, s, logfilename=os.devnull, save_result=False, save_npz=False, store=None):
     """
     Compare the stability at traverse and baseline results on a single test network.
     test_data_id should be as in generate_test_data (without file extension)
@@ -647,11 +1286,12 @@ def test_TvB_stability(test_data_id, N, s, logfilename=os.devnull, save_result=F
     logfilename is a file name at which to write progress updates
     if save_result == True, results are saved in a file with name based on test_data_id
     if save_npz == True, numpy outputs are saved in a file with name based on test_data_id
+    store is a ResultsStore from which to load and in which to save results instead of separate files (see save_results)
     returns results, npz, where
       results is a dictionary summarizing the test results
       npz is a dictionary with full numpy output
     """
-    logfile = open(logfilename,'w')
+    logfile = rfx.ProgressLog(logfilename,'w')
 
     rfx.hardwrite(logfile,'Loading results...\n')
     # _,_,test_data = load_test_data('%s.npz'%test_data_id)
@@ -660,7 +1300,7 @@ def test_TvB_stability(test_data_id, N, s, logfilename=os.devnull, save_result=F
     # traverse_npz = np.load('results/traverse_%s_N_%d_s_%d.npz'%(test_data_id, N, s))
     # fxV_baseline = baseline_npz["fxV_unique"]
     # fxV_traverse = traverse_npz["fxV_unique"]
-    npz = load_npz_file('results/TvB_%s_N_%d_s_%d.npz'%(test_data_id, N, s))
+    npz = load_result_arrays(store, 'TvB_%s_N_%d_s_%d'%(test_data_id, N, s), ['W','fxV_baseline','fxV_traverse'])
     fxVs = {'baseline':npz['fxV_baseline'],'traverse':npz['fxV_traverse']}
     W = npz['W']
 
@@ -672,8 +1312,7 @@ def test_TvB_stability(test_data_id, N, s, logfilename=os.devnull, save_result=F
         'B':npz['fxV_baseline'].shape[1],
     }
     npz = {}
-    if save_result: save_pkl_file('results/%s.pkl'%result_key, results)
-    if save_npz: save_npz_file('results/%s.npz'%result_key, **npz)
+    save_results(store, result_key, results if save_result else None, npz if save_npz else None)
 
     # Stability analysis
     rfx.hardwrite(logfile,'linearizing and checking stability...\n')
@@ -705,8 +1344,7 @@ def test_TvB_stability(test_data_id, N, s, logfilename=os.devnull, save_result=F
     rfx.hardwrite(logfile,'%s\n'%finish_str)
     print(finish_str)
 
-    if save_result: save_pkl_file('results/%s.pkl'%result_key, results)
-    if save_npz: save_npz_file('results/%s.npz'%result_key, **npz)
+    save_results(store, result_key, results if save_result else None, npz if save_npz else None)
 
     logfile.close()
     return results, npz
@@ -718,49 +1356,44 @@ def pool_test_TvB_stability(args):
     results, _ = test_TvB_stability(*args)
     return results
 
-def run_TvB_stability_experiments(test_data_id, num_procs):
+def run_TvB_stability_experiments(test_data_id, num_procs, resume=False, use_store=False):
     """
     Run test_TvB_stability on every network in the test data
     Uses multi-processing to test on multiple networks in parallel
+    Networks are scheduled most expensive first, and results are saved as each one finishes (see run_pool_jobs)
     test_data_id should be as in generate_test_data (without file extension)
     num_procs is the number of processors to use in parallel
+    if resume == True, networks recorded as complete in the run manifest are skipped (see run_pool_jobs)
+    if use_store == True, results are saved in a ResultsStore instead of separate files
     returns pool_results, a list of results with one entry per network
     """
 
     cpu_count = mp.cpu_count()
     print('%d cpus, using %d'%(cpu_count, num_procs))
 
-    pool_args = []
-    network_sizes, num_samples, test_data = load_test_data('%s.npz'%test_data_id)
+    store = ResultsStore(test_data_id) if use_store else None
+    pool_args, result_keys = [], []
+    network_sizes, num_samples = share_test_data(test_data_id)
     for (N,S) in zip(network_sizes, num_samples):
         for s in range(S):
             logfilename = 'logs/tvb_stab_%s_N_%d_s_%d.log'%(test_data_id, N, s)
             save_result=True
             save_npz=True
-            pool_args.append((test_data_id, N, s, logfilename, save_result, save_npz))
+            pool_args.append((test_data_id, N, s, logfilename, save_result, save_npz, store))
+            result_keys.append('TvB_stable_%s_N_%d_s_%d'%(test_data_id, N, s))
+    costs = predict_job_costs(result_keys, [args[1] for args in pool_args], store=store)
     start_time = time.time()
-    test_fun = pool_test_TvB_stability
-    if num_procs < 1: # don't multiprocess
-        pool_results = [test_fun(args) for args in pool_args]
-    else:
-        pool = mp.Pool(processes=num_procs)
-        pool_results = pool.map(test_fun, pool_args)
-        pool.close()
-        pool.join()
-    print('total time: %f. saving results...'%(time.time()-start_time))
-
-    results_file = open('results/tvb_stab_%s.pkl'%test_data_id, 'w')
-    pkl.dump(pool_results, results_file)
-    results_file.close()
+    pool_results = run_pool_jobs(pool_test_TvB_stability, pool_args, num_procs, costs=costs, results_filename='results/tvb_stab_%s.pkl'%test_data_id, result_keys=result_keys, manifest='results/tvb_stab_%s_manifest.txt'%test_data_id, resume=resume, store=store)
+    if store is not None: store.compact()
+    print('total time: %f. results saved.'%(time.time()-start_time))
 
 def show_tvb_results(test_data_ids=['full_base','big256_base','big512_base','big1024_base']):
     """
     Plot the results of traverse-baseline performance comparison on one or more testing data sets
     test_data_ids should be the list of ids, each as in generate_test_data (without file extension)
     """
-    results = []
-    for test_data_id in test_data_ids:
-        results += load_pkl_file('results/tvb_%s.pkl'%test_data_id)
+    results = load_results_columns(test_data_ids, 'TvB_', 'tvb', ['N','T|B','T&B','T-B','B-T'])
+    # for test_data_id in test_data_ids:
         # # temp because accidentally overwrote
         # curr_results = []
         # network_sizes, num_samples, test_data = load_test_data('%s.npz'%test_data_id)
@@ -826,8 +1459,7 @@ def show_tvb_dist_results(test_data_ids=['full_base','big256_base','big512_base'
     results = []
     plt.figure(figsize=(8,2.65))
     sp = 0
-    for test_data_id in test_data_ids:
-        results += load_pkl_file('results/tvb_%s.pkl'%test_data_id)
+    results = load_results_columns(test_data_ids, 'TvB_', 'tvb', ['N','traverse_dist','baseline_dist','traverse_dist_v','baseline_dist_v'])
     results = [r for r in results if r['N'] in [2,4,7,10,13,16,24,32,48,64,128,256,512,1024]]
     N_cut = 128
     split_results = [[r for r in results if r['N'] <= N_cut], [r for r in results if r['N'] > N_cut]]
@@ -869,8 +1501,7 @@ def show_tvb_stab_result(test_data_id='full_base', N=24, s=0):
     mpl.rcParams.update({'font.size': 16})
     mpl.rcParams['pdf.fonttype'] = 42
     mpl.rcParams['ps.fonttype'] = 42
-    results = load_pkl_file('results/TvB_stable_%s_N_%d_s_%d.pkl'%(test_data_id, N, s))
-    npz = load_npz_file('results/TvB_stable_%s_N_%d_s_%d.npz'%(test_data_id, N, s))
+    npz = load_result_arrays(find_results_store(test_data_id), 'TvB_stable_%s_N_%d_s_%d'%(test_data_id, N, s), ['norms_baseline','norms_traverse','max_eigs_baseline','max_eigs_traverse'])
     plt.figure(figsize=(11,4.5))
     plt.subplot(1,2,1)
     ms = 2*(mpl.rcParams['lines.markersize'] ** 2)
@@ -924,11 +1555,10 @@ def show_tvb_stab_results(test_data_ids):
     Plot the results of traverse-baseline stability analysis on one or more testing data sets
     test_data_ids should be the list of ids, each as in generate_test_data (without file extension)
     """
-    results = []
-    for test_data_id in test_data_ids:
+    results = load_results_columns(test_data_ids, 'TvB_stable_', 'tvb_stab', ['N','T','B','num_stable_traverse','num_stable_baseline'])
+    # for test_data_id in test_data_ids:
         # results += load_pkl_file('results/tvb_dist_%s.pkl'%test_data_id)
         # results += load_pkl_file('results/tvb_%s.pkl'%test_data_id)
-        next_results = load_pkl_file('results/tvb_stab_%s.pkl'%test_data_id)
         # # temp because left out of code before first run:
         # for r in range(len(next_results)):
         #     npz = load_npz_file('results/%s.npz'%next_results[r]['result_key'])
@@ -937,7 +1567,6 @@ def show_tvb_stab_results(test_data_ids):
         #     next_results[r]['min_big_eigs_traverse'] = npz['num_big_eigs_traverse'].min()
         #     next_results[r]['min_big_eigs_baseline'] = npz['num_big_eigs_baseline'].min()
         # # save_pkl_file('results/tvb_stab_%s.pkl'%test_data_id,next_results)
-        results += next_results
     results = [r for r in results if r['N'] in [2,4,7,10,13,16,24,32,48,64,128,256,512,1024]]
     mpl.rcParams['mathtext.default'] = 'regular'
     # mpl.rcParams.update({'figure.autolayout': True})
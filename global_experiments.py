@@ -1,4 +1,5 @@
 import time
+import multiprocessing as mp
 import numpy as np
 import rnn_fxpts as rfx
 import fxpt_experiments as fe
@@ -11,17 +12,16 @@ def local_trial(W, timeout = .1):
     W is the rnn weight matrix
     timeout is the number of seconds to continue repeating
     returns V, timestamp, where
-        V[i][:,p] is the p^th fixed point found after the i^th iterate
+        V is the rfx.FixedPointSet of fixed points found
+        V.history() gives the number of fixed points found after each iterate
         timestamp[i] is the clock time after the i^th iterate 
     """
     stop_time = time.clock() + timeout
-    V = [np.zeros((W.shape[0],1))]
-    timestamp = [time.clock()]
+    V = rfx.FixedPointSet(W, V=np.zeros((W.shape[0],1)))
     iterates = rfx.local_search(W, stop_time=stop_time)
     for status, v, _ in iterates:
-        V_new, _, _, _ = rfx.process_fxpt(W, V[-1], v)
-        V.append(V_new)
-        timestamp.append(time.clock())
+        V.add(v)
+    _, timestamp = V.history()
     return V, timestamp
 
 def fiber_trial(W, timeout = .1, repeats = None):
@@ -32,17 +32,17 @@ def fiber_trial(W, timeout = .1, repeats = None):
     timeout is the number of seconds to continue repeating
     repeats is the number of times to continue repeating
     returns V, timestamp, traversal, c, status, VA, where
-        V[i][:,p] is the p^th fixed point found after the i^th iterate
+        V is the rfx.FixedPointSet of fixed points found
+        V.history() gives the number of fixed points found after each iterate
         timestamp[i] is the clock time after the i^th iterate
         traversal[i]: is t, where the t^th traversal returned the i^th iterate
         c[i] is the random c used by the i^th iterate
         status[i] is the traversal status at the i^th iterate
-        VA[t][n] is the n^th point along the t^th traversal
+        VA[t][:,n] is the n^th point along the t^th traversal
     """
     stop_time = time.clock() + timeout
-    V = [np.zeros((W.shape[0],1))]
-    VA = [[np.zeros((W.shape[0]+1,1))]]
-    timestamp = [time.clock()]
+    V = rfx.FixedPointSet(W, V=np.zeros((W.shape[0],1)))
+    VA = [np.zeros((W.shape[0]+1,1))]
     traversal = [0]
     c = [None]
     status = [None]
@@ -53,16 +53,15 @@ def fiber_trial(W, timeout = .1, repeats = None):
         t += 1
         iterates = rfx.directional_fiber(W, stop_time=stop_time)
         for iterate in iterates:
-            V_new, _, _, _ = rfx.process_fxpt(W, V[-1], iterate[1])
-            V.append(V_new)
-            timestamp.append(time.clock())
+            V.add(iterate[1])
             traversal.append(t)
             c.append(iterate[3])
             status.append(iterate[0])
         VA.append(iterate[2])
+    _, timestamp = V.history()
     return V, timestamp, traversal, c, status, VA
 
-def combo_trial(W, c=None, timeout=1, term_ratio=None, max_step_size=None, verbose_prefix = None):
+def combo_trial(W, c=None, timeout=1, term_ratio=None, max_step_size=None, verbose_prefix = None, seed_workers=None, traversal_workers=None, early_merge=False):
     """
     Run a solver trial using combined local search and fiber traversal
     Repeats traversal with the same c but different initial fixed points until timeout
@@ -70,8 +69,14 @@ def combo_trial(W, c=None, timeout=1, term_ratio=None, max_step_size=None, verbo
     timeout is the number of seconds to continue repeating
     term_ratio, if not None, allows early termination if:
         (the current time elapsed) / (time elapsed at the last new fixed point) > term_ratio
+    seed_workers, if not None, is the number of background processes producing local search seeds
+        (see rfx.LocalSearchSeeds), so that local search overlaps with traversal
+    traversal_workers, if not None, is the number of components traversed concurrently (see concurrent_combo_trial)
+    early_merge, if True, stops each traversal once it merges into the fiber of an earlier traversal
+        (status 'Merged', see rfx.FiberIndex), since the rest of that fiber was already traversed
     returns:
-        V[i][:,p] is the p^th fixed point found after the i^th iterate
+        V is the rfx.FixedPointSet of fixed points found
+        V.history() gives the number of fixed points found after each iterate
         timestamp[i] is the clock time after the i^th iterate
         traversal[i] is t, where the t^th traversal returned the i^th iterate
         c is the random c used by all iterates
@@ -83,63 +88,227 @@ def combo_trial(W, c=None, timeout=1, term_ratio=None, max_step_size=None, verbo
         V_rp[i] is the refined point in the i^th iterate
         step_sizes[t] are the step sizes of the t^th traversal
     """
+    if traversal_workers is not None:
+        return concurrent_combo_trial(W, c, timeout, term_ratio, max_step_size, verbose_prefix, seed_workers, traversal_workers, early_merge)
     start_time = time.clock()
     stop_time = start_time + timeout
     # Start with origin component
-    V = [np.zeros((W.shape[0],1))]
+    V = rfx.FixedPointSet(W, V=np.zeros((W.shape[0],1)))
     VA_cp = [np.zeros((W.shape[0]+1,1))]
     V_rp = [np.zeros((W.shape[0],1))]
-    timestamp = [time.clock()]
     traversal = [0]
     status = ['Traversing']
     t = 0
     fiber_component = rfx.directional_fiber(W, c=c, stop_time=stop_time, max_step_size=max_step_size)
     for iterate in fiber_component:
-        V_new, _, _, _ = rfx.process_fxpt(W, V[-1], iterate[1])
-        V.append(V_new)
+        V.add(iterate[1])
         V_rp.append(iterate[1])
-        VA_cp.append(iterate[2][-1])
-        timestamp.append(time.clock())
+        VA_cp.append(iterate[2][:,[-1]])
         traversal.append(t)
         status.append(iterate[0])
     VA = [iterate[2]]
     step_sizes = [iterate[4]]
     seed = [np.zeros((W.shape[0],1))]
     c = iterate[3] # Same c for subsequent traversals
+    fiber_index = rfx.FiberIndex(W.shape[0]) if early_merge else None
+    if early_merge: fiber_index.add(c, iterate[2], iterate[4])
     if verbose_prefix is not None: print('%scomponent 1...'%verbose_prefix)
     # Do non-origin components with local seeds
-    seeds = rfx.local_search(W, stop_time=stop_time)
+    if seed_workers is None:
+        seeds = rfx.local_search(W, stop_time=stop_time)
+    else:
+        seed_producer = rfx.LocalSearchSeeds(W, num_workers=seed_workers)
+        seeds = seed_producer.seeds(stop_time=stop_time)
     num_components = 1
     for seed_status, fxv, _ in seeds:
         # check if timed out
         if seed_status == 'Timed out': break
         # check if term_ratio exceeded
-        current_ratio = (time.clock() - start_time)/(timestamp[-1] - start_time)
+        current_ratio = (time.clock() - start_time)/(V.timestamps[-1] - start_time)
         if term_ratio is not None and current_ratio > term_ratio:
             # status[-1] = 'Term ratio satisfied'
             break
         # check if not fixed or already found
-        _, fx, dup, fxv = rfx.process_fxpt(W, V[-1], fxv)
+        fx, dup, fxv = V.check(fxv)
         if dup or not fx: continue
         # traverse component
         va = np.concatenate((fxv, [[0]]), axis=0)
         t += 1
         seed.append(va)
-        fiber_component = rfx.directional_fiber(W, va=va, c=c, stop_time=stop_time, max_step_size=max_step_size)
+        fiber_component = rfx.directional_fiber(W, va=va, c=c, stop_time=stop_time, max_step_size=max_step_size, fiber_index=fiber_index)
         for iterate in fiber_component:
-            V_new, _, _, _ = rfx.process_fxpt(W, V[-1], iterate[1])
+            V.add(iterate[1])
             V_rp.append(iterate[1])
-            VA_cp.append(iterate[2][-1])
-            V.append(V_new)
-            timestamp.append(time.clock())
+            VA_cp.append(iterate[2][:,[-1]])
             traversal.append(t)
             status.append(iterate[0])
         VA.append(iterate[2])
         step_sizes.append(iterate[4])
+        if early_merge: fiber_index.add(c, iterate[2], iterate[4])
         num_components += 1
         if verbose_prefix is not None: print('%scomponent %d...'%(verbose_prefix, num_components))
+    if seed_workers is not None: seed_producer.close()
+    _, timestamp = V.history()
     return V, timestamp, traversal, c, status, VA, seed, VA_cp, V_rp, step_sizes
 
+def traverse_component(W, t, va, c, timeout, max_step_size, result_queue, cancel_event, fiber_index=None):
+    """
+    Worker process for concurrent_combo_trial: traverses the fiber component through va
+    Puts ('iterate', t, status, fxv, va_cp) on result_queue for every iterate of the traversal,
+        followed by ('done', t, status, VA, step_sizes) when it terminates (including when cancel_event is set)
+    fiber_index is passed to rfx.directional_fiber, and holds the traversals finished before this one started
+    """
+    stop_time = time.clock() + timeout
+    fiber_component = rfx.directional_fiber(W, va=va, c=c, stop_time=stop_time, max_step_size=max_step_size, cancel=cancel_event.is_set, fiber_index=fiber_index)
+    for iterate in fiber_component:
+        result_queue.put(('iterate', t, iterate[0], iterate[1], iterate[2][:,[-1]]))
+    result_queue.put(('done', t, iterate[0], iterate[2], iterate[4]))
+
+def concurrent_combo_trial(W, c=None, timeout=1, term_ratio=None, max_step_size=None, verbose_prefix = None, seed_workers=None, traversal_workers=2, early_merge=False):
+    """
+    Run a solver trial as in combo_trial, but traverse independent components concurrently
+    Each new seed is traversed in its own process, with up to traversal_workers traversals running at once
+    A running traversal is cancelled (status 'Cancelled') when its seed is found by another traversal,
+        since both are then on the same component (up to sign); the later of the two is cancelled
+    A traversal whose process exits without finishing (e.g., on an exception) gets a final iterate at its seed
+        with status 'Failed (exit code <code>)', and its fiber VA[t] is just the seed
+    Time is measured on the wall clock, since time.clock() does not advance while waiting on the workers
+    W, c, timeout, term_ratio, max_step_size, verbose_prefix, seed_workers and early_merge are as in combo_trial
+        with early_merge, each traversal only checks against the traversals finished before it started
+    traversal_workers is the maximum number of concurrent traversals
+    returns the same outputs as combo_trial, where traversal numbers t follow the order traversals were started
+    """
+    N = W.shape[0]
+    start_time = time.clock()
+    wall_start = time.time()
+    if c is None:
+        c = np.random.randn(N,1)
+        c = c/np.sqrt((c**2).sum())
+    V = rfx.FixedPointSet(W, V=np.zeros((N,1)))
+    VA_cp = [np.zeros((N+1,1))]
+    V_rp = [np.zeros((N,1))]
+    traversal = [0]
+    status = ['Traversing']
+    VA, step_sizes, seed = [], [], []
+    result_queue = mp.Queue()
+    running = {} # t: (process, cancel_event, seed fxpt)
+    last_iterate = [wall_start] # wall clock time of the last iterate received
+    fiber_index = rfx.FiberIndex(N) if early_merge else None
+
+    def start(va):
+        t = len(seed)
+        cancel_event = mp.Event()
+        process = mp.Process(target=traverse_component,
+            args=(W, t, va, c, timeout - (time.time() - wall_start), max_step_size, result_queue, cancel_event, fiber_index))
+        process.daemon = True
+        process.start()
+        running[t] = (process, cancel_event, va[:N,:])
+        seed.append(va)
+        VA.append(None)
+        step_sizes.append(None)
+        if verbose_prefix is not None: print('%scomponent %d...'%(verbose_prefix, len(seed)))
+
+    def fail(t):
+        process, _, fxv = running.pop(t)
+        process.join()
+        V.log()
+        V_rp.append(fxv)
+        VA_cp.append(seed[t])
+        traversal.append(t)
+        status.append('Failed (exit code %d)'%process.exitcode)
+        VA[t], step_sizes[t] = seed[t], np.empty(0)
+        if verbose_prefix is not None: print('%scomponent %d failed'%(verbose_prefix, t+1))
+
+    def receive(wait):
+        try:
+            message = result_queue.get(timeout=wait)
+        except rfx.queue.Empty:
+            # a process that exited with nothing left on the queue never sent 'done'
+            for t in list(running):
+                if running[t][0].exitcode is not None and result_queue.empty(): fail(t)
+            return
+        if message[0] == 'done':
+            _, t, _, VA[t], step_sizes[t] = message
+            running.pop(t)[0].join()
+            if early_merge: fiber_index.add(c, VA[t], step_sizes[t])
+            return
+        _, t, iterate_status, fxv, va_cp = message
+        fx, dup, fxv = V.add(fxv)
+        last_iterate[0] = time.time()
+        V_rp.append(fxv)
+        VA_cp.append(va_cp)
+        traversal.append(t)
+        status.append(iterate_status)
+        # cancel the later of two traversals on the same component
+        if not fx: return
+        for u in list(running):
+            if u == t: continue
+            if min(np.fabs(running[u][2] - s).max() for s in [fxv, -fxv]) < V.tolerance:
+                running[max(t,u)][1].set()
+
+    seed_producer = None
+    try:
+        # Start with origin component
+        start(np.zeros((N+1,1)))
+        # Do non-origin components with local seeds
+        if seed_workers is None:
+            seeds = rfx.local_search(W, stop_time=start_time + timeout)
+        else:
+            seed_producer = rfx.LocalSearchSeeds(W, num_workers=seed_workers)
+            seeds = seed_producer.seeds(stop_time=start_time + timeout)
+        while time.time() - wall_start < timeout:
+            # process finished work, waiting for some if all workers are busy
+            receive(0.1 if len(running) >= traversal_workers else 0)
+            while not result_queue.empty(): receive(0)
+            # check if term_ratio exceeded
+            elapsed = time.time() - wall_start
+            if term_ratio is not None and len(traversal) > 1 and elapsed > term_ratio*(last_iterate[0] - wall_start): break
+            if len(running) >= traversal_workers: continue
+            # start a new traversal if the next seed is new
+            seed_status, fxv, _ = next(seeds)
+            if seed_status == 'Timed out': break
+            fx, dup, fxv = V.check(fxv)
+            if dup or not fx: continue
+            if any(np.fabs(running[u][2] - fxv).max() < V.tolerance for u in running): continue
+            start(np.concatenate((fxv, [[0]]), axis=0))
+        # Cancel any remaining traversals and collect their results
+        for t in running: running[t][1].set()
+        while len(running) > 0: receive(0.1)
+    finally:
+        for t in running: running[t][1].set()
+        if seed_producer is not None: seed_producer.close()
+    _, timestamp = V.history()
+    return V, timestamp, traversal, c, status, VA, seed, VA_cp, V_rp, step_sizes
+
+def test_concurrent_combo_trial():
+    """
+    Sanity check that concurrent_combo_trial finishes by its timeout (with and without seed workers and early merging),
+        returns consistent outputs for every traversal, and leaves no live child processes
+    """
+    N = 8
+    W = 3*np.random.randn(N,N)/np.sqrt(N)
+    W = (W + W.T)/2 # symmetric, so that there are several components to traverse
+    for seed_workers, early_merge in [(None, False), (1, True)]:
+        wall_start = time.time()
+        V, timestamp, traversal, c, status, VA, seed, VA_cp, V_rp, step_sizes = combo_trial(W, timeout=1,
+            seed_workers=seed_workers, traversal_workers=2, early_merge=early_merge)
+        assert time.time() - wall_start < 3
+        assert len(mp.active_children()) == 0
+        assert len(timestamp) == len(traversal) == len(status) == len(VA_cp) == len(V_rp)
+        assert len(VA) == len(seed) == len(step_sizes) == max(traversal) + 1
+        for t in range(len(VA)):
+            assert VA[t].shape[1] == len(step_sizes[t])
+            final_status = status[max(i for i in range(len(traversal)) if traversal[i] == t)]
+            assert final_status in ['Success', 'Max steps reached', 'Max fxpts found', 'Closed loop detected', 'Timed out', 'Cancelled', 'Merged']
+        assert len(V) >= 1
+    print('test concurrent combo trial passed!')
+
+def run_tests():
+    """
+    Run sanity checks
+    """
+    test_concurrent_combo_trial()
+
 def mini_compare():
 
     N = 32
@@ -153,15 +322,14 @@ def mini_compare():
     results['fiber'] = fiber_trial(W, timeout=timeout)
     results['combo'] = combo_trial(W, timeout=timeout)
 
-    fxpts = (V,) + tuple(results[k][0][-1] for k in results)
+    fxpts = (V,) + tuple(results[k][0].array() for k in results)
     neighbors = lambda X, y: (np.fabs(X-y) < 2**-21).all(axis=0)
-    U = rfx.get_unique_points_recursively(np.concatenate(fxpts,axis=1), neighbors=neighbors)
+    U = rfx.get_unique_points_recursively(np.concatenate(fxpts,axis=1), neighbors=neighbors, index=rfx.tolerance_index(N))
 
     keys = results.keys()
     for k in keys:
-        V_k = results[k][0] # V[i][:,p] = p^th point found after i^th iterate
-        T_k = results[k][1] # timestamp[i] = clock time after i^th iterate
-        plt.plot([T_ki - T_k[0] for T_ki in T_k], [V_ki.shape[1] for V_ki in V_k])
+        V_k, T_k = results[k][0].history() # V_k[i] = # points found after i^th iterate, T_k[i] = its clock time
+        plt.plot([T_ki - T_k[0] for T_ki in T_k], V_k)
     plt.plot([0,timeout], 2*[U.shape[1]])
     plt.xlabel('Time elapsed')
     plt.ylabel('# fixed points found')
@@ -170,7 +338,7 @@ def mini_compare():
 
     # for i in range(len(V)):
     #     if status[i] == 'Traversing': continue
-    #     print(timestamp[i],V[i].shape[1], traversal[i], status[i])
+    #     print(timestamp[i],V.counts[i], traversal[i], status[i])
         
     # if N == 3: ax = plt.gca(projection='3d')
     # else: ax = plt.gca()
@@ -178,7 +346,7 @@ def mini_compare():
     #     va = np.concatenate(va,axis=1)[:N,:]
     #     print(np.fabs(va[:,1:]-va[:,:-1]).max(axis=0).max())
     #     ptr.plot(ax,va,'ko-')
-    # ptr.plot(ax,V[-1],'r.')    
+    # ptr.plot(ax,V.array(),'r.')    
     # plt.show()
 
 def combo_checks():
@@ -210,7 +378,7 @@ def combo_checks():
                     bad_i = i
                     bad_status = True
                     if bad_status: break
-        print('%d fxpts, %d components, took %f of %f seconds'%(V[-1].shape[1], traversal[-1]+1, time.clock()-start, timeout))
+        print('%d fxpts, %d components, took %f of %f seconds'%(len(V), traversal[-1]+1, time.clock()-start, timeout))
         if bad_status: break
         break # lork check
 
@@ -233,7 +401,7 @@ def combo_checks():
     ax=plt.gca(projection='3d')
     
     for t in range(len(VA)):
-        VA_t = np.concatenate(VA[t],axis=1)
+        VA_t = VA[t]
         A = VA_t[N,:]
         extrema = 1 + np.flatnonzero((A[1:-1]-A[:-2])*(A[1:-1]-A[2:]) > 0)
         K = W[humps,:].dot(VA_t[:N,extrema+0])
@@ -267,14 +435,14 @@ def combo_checks():
 
     return # lork check
 
-    # print(V[-1][:,np.argsort(np.fabs(V[-1]).max(axis=0))[:5]])
+    # print(V.array()[:,np.argsort(np.fabs(V.array()).max(axis=0))[:5]])
     plt.ion()
     print(seed[bad_t])
     print('\a') # beep
     if N == 3: ax = plt.gca(projection='3d')
     else: ax = plt.gca()
     for t in range(len(VA)):
-        ptr.plot(ax,np.concatenate(VA[t],axis=1)[:N,:],'ko-') 
+        ptr.plot(ax,VA[t][:N,:],'ko-') 
     # ptr.plot(ax,np.concatenate(VA[0],axis=1)[:N,:],'ko-')
     # # ptr.plot(ax,np.concatenate(VA[bad_t],axis=1)[:N,:],'go-')
     # # ptr.plot(ax,np.concatenate(VA[1],axis=1)[:N,:],'go-')
@@ -282,12 +450,12 @@ def combo_checks():
     for p in range(len(VA_cp)):
         ptr.plot(ax, np.concatenate((VA_cp[p][:N,:],V_rp[p]),axis=1),'-b')
         ptr.plot(ax,V_rp[p],'b.')
-    ptr.plot(ax,V[-1],'r.')
+    ptr.plot(ax,V.array(),'r.')
     ptr.set_lims(ax,3*np.ones((N,1))*np.array([-1,1]))
     plt.show()
     plt.figure()
     bad_t = 0
-    plt.plot(np.array(step_sizes[bad_t]).cumsum(), np.concatenate(VA[bad_t],axis=1)[N,:],'-b.')
+    plt.plot(np.array(step_sizes[bad_t]).cumsum(), VA[bad_t][N,:],'-b.')
     plt.plot(np.array(step_sizes[bad_t]).cumsum(), np.zeros(len(step_sizes[bad_t])))
     plt.show()
     raw_input('.')
@@ -313,10 +481,10 @@ def single_c_search():
             num_c += 1
             
             
-            print(' %d^th c: %d fxpts, %d components, took %f of %f seconds'%(num_c, V[-1].shape[1], traversal[-1]+1, time.clock()-start, timeout))
+            print(' %d^th c: %d fxpts, %d components, took %f of %f seconds'%(num_c, len(V), traversal[-1]+1, time.clock()-start, timeout))
             
-            if num_fx is None: num_fx = V[-1].shape[1]
-            if not V[-1].shape[1] == num_fx:
+            if num_fx is None: num_fx = len(V)
+            if not len(V) == num_fx:
                 print('\a')
                 raw_input('oh no...')
 
@@ -3,27 +3,137 @@ Library for fixed point location in recurrent neural networks using directional
 """
 import os
 import sys
+import shutil
+import tempfile
 import time
+import json
+import threading
 import pickle as pkl
 import itertools as it
+import multiprocessing as mp
+import multiprocessing.pool as mpp
 import numpy as np
 import scipy.optimize as spo
 import scipy.linalg as spl
+import scipy.sparse as sps
+import scipy.sparse.csgraph as spg
 import plotter as ptr
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 T2CONST = (np.sqrt(2.)-1.)**2 / np.sqrt(16./27.)
 
+# Default durability settings for ProgressLog
+LOG_DURABILITY = 'periodic'
+LOG_SYNC_INTERVAL = 1.0
+
+class ProgressLog:
+    """
+    A log file with configurable durability, for progress updates written from inside hot loops.
+    Forcing every line to disk serializes concurrent worker processes on disk syncs,
+      so by default lines are only synced periodically.
+    """
+    def __init__(self, filename, mode='w', durability=None, sync_interval=None):
+        """
+        filename is the file name of the log
+        mode is the file mode, 'w' to start a new log or 'a' to append to an existing one
+        durability should be one of
+          'line': every write is flushed and synced to disk (as with a plain file passed to hardwrite)
+          'periodic': writes are flushed and synced at most once every sync_interval seconds, and on close
+          'buffered': writes are left to the file buffer and the operating system until close
+          if None, LOG_DURABILITY is used
+        sync_interval is the number of seconds between syncs in 'periodic' mode
+          if None, LOG_SYNC_INTERVAL is used
+        """
+        if durability is None: durability = LOG_DURABILITY
+        if sync_interval is None: sync_interval = LOG_SYNC_INTERVAL
+        if durability not in ['line','periodic','buffered']:
+            raise ValueError("durability must be 'line', 'periodic', or 'buffered'")
+        self.file = open(filename, mode)
+        self.name = filename
+        self.durability = durability
+        self.sync_interval = sync_interval
+        self.last_sync = time.time()
+    def write(self, data):
+        """
+        Write data to the log, syncing to disk as often as the durability setting requires
+        """
+        self.file.write(data)
+        if self.durability == 'line' or (self.durability == 'periodic' and time.time() - self.last_sync >= self.sync_interval):
+            self.sync()
+    def sync(self):
+        """
+        Flush the log and force it to disk (no-op for os.devnull, as in hardwrite)
+        """
+        self.file.flush()
+        if self.name == os.devnull: return
+        os.fsync(self.file.fileno())
+        self.last_sync = time.time()
+    def flush(self):
+        self.file.flush()
+    def fileno(self):
+        return self.file.fileno()
+    def close(self):
+        """
+        Close the log, syncing it to disk first unless durability is 'buffered'
+        """
+        if self.file.closed: return
+        if self.durability == 'buffered': self.file.flush()
+        else: self.sync()
+        self.file.close()
+
 def hardwrite(f,data):
     """
     Force file write to disk
+    If f is a ProgressLog, data is only synced as often as its durability setting requires
     """
     if f.name == os.devnull: return
+    if isinstance(f, ProgressLog):
+        f.write(data)
+        return
     f.write(data)
     f.flush()
     os.fsync(f)
 
+def log_progress(f, event, **kwargs):
+    """
+    Write a structured progress record to a log, as a single line of JSON
+    f should be the log file (a ProgressLog or plain file), or None to skip
+    event is a string naming the kind of progress record (e.g., 'traverse')
+    Each kwarg should have the form
+      field_name=value
+    and is included in the record along with the event, process id, and wall clock time.
+    Records can be read back with read_progress.
+    """
+    if f is None or f.name == os.devnull: return
+    record = {'event': event, 'pid': os.getpid(), 'time': time.time()}
+    record.update(kwargs)
+    hardwrite(f, '%s\n'%json.dumps(record, default=lambda x: x.item()))
+
+def read_progress(filename, event=None):
+    """
+    Read the structured progress records written to a log by log_progress
+    filename is the file name of the log
+    event is the kind of record to read (if None, all records are read)
+    Free-text lines in the log are skipped.
+    returns records, a list where records[r] is the r^{th} record (a dictionary)
+    """
+    records = []
+    log_file = open(filename, 'r')
+    for line in log_file:
+        if not line.startswith('{'): continue
+        try:
+            record = json.loads(line)
+        except ValueError: # line cut off by a crash
+            continue
+        if event is None or record['event'] == event: records.append(record)
+    log_file.close()
+    return records
+
 def eps(x):
     """
     Returns the machine precision at x.
@@ -66,7 +176,7 @@ def solve(A, B):
     # return wrap(r.astype(result_t, copy=False))
     
     a, b = A, B
-    signature = 'dd->d'
+    signature = 'ff->f' if a.dtype == np.float32 and b.dtype == np.float32 else 'dd->d'
     extobj = np.linalg.linalg.get_linalg_error_extobj(np.linalg.linalg._raise_linalgerror_singular)
     if b.ndim == a.ndim - 1:
         r = np.linalg.linalg._umath_linalg.solve1(a, b, signature=signature, extobj=extobj)
@@ -80,43 +190,264 @@ def mrdivide(B,A):
     """
     return np.linalg.lstsq(A.T, B.T)[0].T
 
-def get_connected_components(V, neighbors=None):
+class GridIndex:
+    """
+    Spatial hash of points for near-linear neighbor search (e.g., when de-duplicating fixed points).
+    Points are hashed by quantizing a few linear projections Q.dot(v) on a grid,
+      so any neighbor of a point lies in one of the 3**K adjacent grid cells.
+    Candidates from those cells should be confirmed with the exact neighbors function.
+    Q should be the projections (K by N numpy.array)
+    spacing should be the grid spacing, where
+      |Q[k,:].dot(x - y)| < spacing for every k whenever x, y are neighbors
+    See fixed_point_index and tolerance_index for the standard neighbors relations.
+    """
+    def __init__(self, Q, spacing):
+        self.Q = Q
+        self.spacing = spacing
+        self.offsets = np.array(list(it.product([-1,0,1], repeat=Q.shape[0])))
+        self.clear()
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        """
+        Remove all points from the index
+        """
+        self.cells = {}
+        self.size = 0
+
+    def keys(self, V):
+        """
+        Returns the grid cells of points V, where V[:,p] is the p^{th} point, as an integer numpy.array
+        """
+        return np.floor(self.Q.dot(V)/self.spacing).astype(np.int64)
+
+    def add(self, V):
+        """
+        Index points V, where V[:,p] is the p^{th} point.
+        Points are numbered in the order they are added, starting from 0.
+        """
+        for key in self.keys(V).T:
+            self.cells.setdefault(tuple(key), []).append(self.size)
+            self.size += 1
+
+    def candidates(self, v):
+        """
+        Returns the sorted indices of all indexed points in cells adjacent to v (N by 1 numpy.array).
+        Every neighbor of v is included.
+        """
+        key = self.keys(v)[:,0]
+        cand = []
+        for offset in self.offsets:
+            cand.extend(self.cells.get(tuple(key + offset), []))
+        return np.sort(np.array(cand, dtype=int))
+
+def fixed_point_index(W, num_keys=2):
+    """
+    Make an empty GridIndex for the neighbors relation of identical_fixed_points.
+    Identical fixed points x, v satisfy ||W(x-v)|| < R, where R is bounded above for every v by
+      sqrt(8*D2*sqrt(N)*E)/D2 (with D2 and E as in identical_fixed_points),
+      so points are hashed on random unit projections of W.dot(v).
+    W should be the weight matrix (N by N numpy.array)
+    num_keys is the number of projections hashed
+    returns the GridIndex
     """
-    Find all connected components in an adjacency graph.
+    N = W.shape[0]
+    _, E = fixed_point_constants(W)
+    D2 = np.sqrt(16./27.)
+    R_max = np.sqrt(8*D2*np.sqrt(N)*E)/D2
+    U, _ = np.linalg.qr(np.random.RandomState(0).randn(N, min(num_keys, N)))
+    return GridIndex(U.T.dot(W), R_max)
+
+def tolerance_index(N, tol=2**-21, num_keys=2):
+    """
+    Make an empty GridIndex for the neighbors relation (np.fabs(X-y) < tol).all(axis=0)
+    Points are hashed on random projections with unit 1-norm, which change by less than tol between neighbors.
+    N is the dimension of the points
+    tol is the infinity-norm tolerance within which points are neighbors
+    num_keys is the number of projections hashed
+    returns the GridIndex
+    """
+    Q = np.random.RandomState(0).randn(min(num_keys, N), N)
+    Q = Q/np.fabs(Q).sum(axis=1)[:,np.newaxis]
+    return GridIndex(Q, tol)
+
+class FiberIndex:
+    """
+    Spatial hash of the points along previously traversed fibers, keyed by the direction vector c.
+    A new traversal with the same c can check whether it has merged into a known fiber component
+      (or the negation of one, which holds the negated fixed points) and stop early.
+    A point matches the indexed fiber point VA[:,n] if they are within step_sizes[n] (capped at max_radius) in the infinity norm,
+      since consecutive fiber points are about one step apart, and steps are small enough to stay on the same fiber.
+    Merges are checked every step just after the seed (where a traversal seeded on a known fiber merges),
+      and every check_every steps after that, so that checks are cheap relative to steps when nothing merges.
+    N is the network size
+    max_radius is the largest matching radius (and the grid spacing of the underlying tolerance_index)
+    min_matches is the number of consecutive matching checks after which a traversal has merged
+    num_keys is the number of projections hashed by the underlying tolerance_index
+      more keys keep candidate sets small (fiber points far from the query rarely share all cells)
+    check_steps is the number of steps after the seed that are all checked
+    check_every is the number of steps between checks after that
+    """
+    def __init__(self, N, max_radius=2**-6, min_matches=3, num_keys=4, check_steps=2**3, check_every=2**4):
+        self.N = N
+        self.max_radius = max_radius
+        self.min_matches = min_matches
+        self.num_keys = num_keys
+        self.check_steps = check_steps
+        self.check_every = check_every
+        self.fibers = {} # c key: (points, radii, index)
+
+    def key(self, c):
+        """
+        Returns the dict key of direction vector c
+        """
+        return np.asarray(c, dtype=float).tobytes()
+
+    def add(self, c, VA, step_sizes=None):
+        """
+        Index the points of a traversal with direction vector c, where
+          VA[:,n] is the n^{th} point along the fiber, as returned by traverse or directional_fiber
+          step_sizes[n] is the step size used for the n^{th} step
+            if None, the distances between consecutive points are used instead
+        If VA only holds the most recent points (max_fiber_points), it is aligned with the last step sizes.
+        """
+        if step_sizes is None:
+            step_sizes = np.sqrt(((VA[:,1:] - VA[:,:-1])**2).sum(axis=0))
+            step_sizes = np.append(step_sizes, step_sizes[-1:] if len(step_sizes) > 0 else self.max_radius)
+        if self.key(c) not in self.fibers:
+            self.fibers[self.key(c)] = (FiberBuffer(self.N+1), FiberBuffer(), tolerance_index(self.N+1, self.max_radius, self.num_keys))
+        points, radii, index = self.fibers[self.key(c)]
+        P, S = VA.shape[1], len(step_sizes)
+        R = np.full(P, self.max_radius)
+        R[P-min(P,S):] = np.minimum(step_sizes[S-min(P,S):], self.max_radius)
+        points.extend(VA)
+        radii.extend(R)
+        index.add(VA)
+
+    def contains(self, c, va):
+        """
+        Returns True if va (N+1 by 1 numpy.array) or -va matches a point indexed with direction vector c
+        """
+        if self.key(c) not in self.fibers: return False
+        points, radii, index = self.fibers[self.key(c)]
+        VA, R = points.array(), radii.array()
+        for s in [va, -va]:
+            cand = index.candidates(s)
+            if (np.fabs(VA[:,cand] - s).max(axis=0) < R[cand]).any(): return True
+        return False
+
+    def watch(self, c):
+        """
+        Make a per-step merge check for a new traversal with direction vector c
+        Once a checked point matches, every following point is checked until a merge is confirmed or a point misses.
+        returns merged, a function called with each new fiber point va (N+1 by 1 numpy.array),
+          which returns True once the last min_matches checked points have all matched indexed points
+        """
+        steps, matches = [0], [0]
+        def merged(va):
+            steps[0] += 1
+            if matches[0] == 0 and steps[0] > self.check_steps and steps[0] % self.check_every != 0: return False
+            matches[0] = matches[0] + 1 if self.contains(c, va) else 0
+            return matches[0] >= self.min_matches
+        return merged
+
+class UnionFind:
+    """
+    Disjoint-set forest for merging graph nodes into connected components.
+    Uses path compression and union by rank, so merging is nearly linear in the number of edges.
+    num_nodes is the number of nodes, which are numbered 0,...,num_nodes-1
+    """
+    def __init__(self, num_nodes):
+        self.parent = list(range(num_nodes))
+        self.rank = [0]*num_nodes
+
+    def find(self, p):
+        """
+        Returns the root node of the component containing node p
+        """
+        root = p
+        while self.parent[root] != root: root = self.parent[root]
+        while self.parent[p] != root: self.parent[p], p = root, self.parent[p]
+        return root
+
+    def union(self, p, q):
+        """
+        Merge the components containing nodes p and q
+        """
+        p, q = self.find(p), self.find(q)
+        if p == q: return
+        if self.rank[p] < self.rank[q]: p, q = q, p
+        self.parent[q] = p
+        if self.rank[p] == self.rank[q]: self.rank[p] += 1
+
+    def components(self):
+        """
+        Returns a numpy.array components, where
+          components[p] is the smallest node in the component containing node p
+        """
+        roots = np.array([self.find(p) for p in range(len(self.parent))], dtype=int)
+        _, first, labels = np.unique(roots, return_index=True, return_inverse=True)
+        return first[labels]
+
+def get_connected_components(V, neighbors=None, index=None):
+    """
+    Find all connected components in an adjacency graph, using a UnionFind.
     Assumes the nodes of the adjacency graph are points in Euclidean space.
     V should be a numpy.array, where V[:,p] is the p^{th} node.
     Returns a numpy.array components, where
       components[p]==components[q] iff V[:,p], V[:,q] are connected.
+      components[p] is the index of the first node in the component of V[:,p]
     neighbors should be a function handle that returns a boolean numpy.array.
     The boolean array should satisfy
       neighbors(X, y)[q] == True iff X[:,p], y are neighbors in the graph.
+    index should be a GridIndex compatible with neighbors, used to avoid comparing all pairs of points
+      it is cleared and then filled with V
+      if None, every point is compared with every earlier point
     """
     # Default neighbor criteria
     if neighbors==None:
         neighbors = lambda X, y: (np.fabs(X-y) < 10*eps(y)).all(axis=0)
 
     # Initialize each point in isolated component
-    components = np.arange(V.shape[1])
+    components = UnionFind(V.shape[1])
+    if index is not None:
+        index.clear()
+        index.add(V)
     # Merge components one point at a time
     for p in range(V.shape[1]):
-        # Index neighbors to current point
-        n = neighbors(V[:,:p+1], V[:,[p]])
+        # Index neighbors to current point, among candidates up to the current point
+        if index is None:
+            n = np.flatnonzero(neighbors(V[:,:p+1], V[:,[p]]))
+        else:
+            cand = index.candidates(V[:,[p]])
+            cand = cand[cand <= p]
+            n = cand[neighbors(V[:,cand], V[:,[p]])]
         # Merge components containing neighbors
-        if len(components[:p+1][n]) == 0:
-            print('comp',components)
-            print('comp[:p+1]',components[:p+1])
-            print('n',n)
-            print('comp[:p+1][n]',components[:p+1][n])
-            print('|V|,p',V.shape,p)
-        components[:p+1][n] = components[:p+1][n].min()
+        for q in n: components.union(p, q)
 
-    return components
+    return components.components()
 
-def get_unique_points(V, neighbors=None):
+def get_graph_components(num_nodes, pairs):
+    """
+    Find all connected components in a graph given by its edges.
+    num_nodes is the number of nodes in the graph
+    pairs should be a numpy.array, where pairs[:,k] are the indices of the nodes joined by the k^{th} edge
+      e.g., the pairs returned by identical_fixed_points_graph
+    Returns a numpy.array components, as in get_connected_components.
+    """
+    adjacency = sps.coo_matrix((np.ones(pairs.shape[1]), (pairs[0], pairs[1])), shape=(num_nodes, num_nodes))
+    _, labels = spg.connected_components(adjacency, directed=False)
+    # label each component by its first node, as in get_connected_components
+    _, first, labels = np.unique(labels, return_index=True, return_inverse=True)
+    return first[labels]
+
+def get_unique_points(V, neighbors=None, index=None):
     """
     This is a helper function, consider get_unique_fxpts instead.
     Extract "unique" points from a set of duplicates.
-    V and neighbors should be as in get_connected_components.
+    V, neighbors, and index should be as in get_connected_components.
     Neighboring points are considered identical.
     One unique representative is selected from each connected component in the neighbor graph.
     returns V_unique, components, where
@@ -124,7 +455,7 @@ def get_unique_points(V, neighbors=None):
       components is as in get_connected_components.
     """
     # Get connected components of neighbor graph
-    components = get_connected_components(V, neighbors)
+    components = get_connected_components(V, neighbors, index)
 
     # Extract representatives from each component
     _, idx = np.unique(components, return_index=True)
@@ -132,15 +463,18 @@ def get_unique_points(V, neighbors=None):
 
     return V_unique, components
 
-def get_unique_points_recursively(V, neighbors=None, base=2):
+def get_unique_points_recursively(V, neighbors=None, base=2, index=None):
     """
     This is a helper function, consider get_unique_fxpts instead.
-    V and neighbors should be as in get_connected_components.
+    V, neighbors, and index should be as in get_connected_components.
     This is a recursive variant of get_unique_points with better performance.
     The base case of the recursion is determined by the base parameter.
+    If index is not None, the recursion is unnecessary and get_unique_points is used directly.
     Returns V_unique as in get_unique_points.
     """
-    if V.shape[1] <= base:
+    if index is not None:
+        V_unique, _ = get_unique_points(V, neighbors=neighbors, index=index)
+    elif V.shape[1] <= base:
         V_unique, _ = get_unique_points(V, neighbors=neighbors)
     else:
         split = int(V.shape[1]/2)
@@ -157,8 +491,9 @@ def get_unique_fxpts(W, fxV, neighbors = None):
     Returns the unique fixed points in fxV_unique, where
       fxV_unique[:,q] is the q^{th} unique fixed point.
     """
-    neighbors = lambda X, y: identical_fixed_points(W, X, y)[0]
-    fxV_unique = get_unique_points_recursively(fxV, neighbors=neighbors)
+    pairs, _ = identical_fixed_points_graph(W, fxV)
+    _, idx = np.unique(get_graph_components(fxV.shape[1], pairs), return_index=True)
+    fxV_unique = fxV[:,idx]
     return fxV_unique
 
 def estimate_forward_error(W, V):
@@ -192,34 +527,120 @@ def fixed_within_eps(W, V):
     fixed = (np.fabs(np.tanh(W.dot(V))-V) < margin).all(axis=0)
     return fixed, margin
 
-def identical_fixed_points(W, V, v, Winv=None):
+_fixed_point_constants = [] # (W, Winv, E) for the most recently used weight matrices
+
+def fixed_point_constants(W, Winv=None, cache_size=4):
+    """
+    Computes the per-network constants used by identical_fixed_points.
+    Results for the cache_size most recently used weight matrices are cached,
+      so repeated calls with the same W only cost an O(N^2) comparison.
+    W should be the weight matrix (a numpy.array).
+    Winv should be the inverse of W, unless None, in which case it is computed (or taken from the cache).
+    returns Winv, E, where
+      Winv is the inverse of W
+      E is the maximum forward error estimate at v = ones, as in identical_fixed_points
+    """
+    for (W_, Winv_, E_) in _fixed_point_constants:
+        if W_.shape == W.shape and np.array_equal(W_, W): return Winv_, E_
+    if Winv is None: Winv = np.linalg.inv(W)
+    E = estimate_forward_error(W,np.ones((W.shape[0],1))).max()
+    _fixed_point_constants.insert(0, (W.copy(), Winv, E))
+    del _fixed_point_constants[cache_size:]
+    return Winv, E
+
+def fixed_point_radii(W, V, Winv=None, max_elements=2**24):
+    """
+    Computes the radius R of identical_fixed_points around every point in V at once.
+    The singular values are computed with stacked (batched) SVDs.
+    W should be the weight matrix (a numpy.array).
+    V should be a numpy.array where each V[:,p] is a fixed point.
+    Winv should be the inverse of W, unless None, in which case it is computed (or cached).
+    max_elements bounds the size of each stack of N by N matrices, to limit memory usage.
+    returns R, where
+      R[p] is the radius around V[:,p] past which another fixed point is considered distinct
+      (R[p] == 0 if only truly identical points can be identified with V[:,p])
+    """
+    Winv, E = fixed_point_constants(W, Winv)
+    N = W.shape[0]
+    D2 = np.sqrt(16./27.)
+    R = np.zeros(V.shape[1])
+    chunk = max(1, int(max_elements/N**2))
+    for start in range(0, V.shape[1], chunk):
+        D = 1-np.tanh(W.dot(V[:,start:start+chunk]))**2
+        Df = D.T[:,:,np.newaxis]*W[np.newaxis,:,:] - np.eye(N)[np.newaxis,:,:]
+        s_min = np.linalg.svd(np.matmul(Df, Winv), compute_uv=False)[:,-1]
+        det = s_min**2 - 8*D2*np.sqrt(N)*E
+        R[start:start+chunk] = np.where(det < 0, 0, (s_min - np.sqrt(np.fabs(det)))/D2)
+    return R
+
+def identical_fixed_points_graph(W, V, U=None, Winv=None, index=None):
+    """
+    Finds every pair of identical fixed points in one pass, as in identical_fixed_points.
+    The radius around each query point is computed once for all of them with fixed_point_radii,
+      and only pairs in adjacent cells of a spatial index are compared.
+    W should be the weight matrix (a numpy.array).
+    V should be a numpy.array where each V[:,p] is a fixed point.
+    U should be a numpy.array of query fixed points, where each U[:,q] is compared with every V[:,p].
+      if None, each V[:,q] is compared with V[:,p] for p <= q, as when de-duplicating V.
+    Winv should be the inverse of W, unless None, in which case it is computed (or cached).
+    index should be an empty GridIndex, as in fixed_point_index, which is filled with V
+      if None, a fixed_point_index is used
+    returns pairs, R, where
+      pairs[:,k] == (p, q) for the k^{th} pair in which V[:,p] is identical to U[:,q] (or V[:,q])
+      R[q] is the radius around U[:,q] (or V[:,q]) as in identical_fixed_points
+    """
+    if index is None: index = fixed_point_index(W)
+    self_pairs = U is None
+    if self_pairs: U = V
+    R = fixed_point_radii(W, U, Winv)
+    WV, WU = W.dot(V), W.dot(U)
+    index.clear()
+    index.add(V)
+    pairs = []
+    for q in range(U.shape[1]):
+        cand = index.candidates(U[:,[q]])
+        if self_pairs: cand = cand[cand <= q]
+        if R[q] > 0:
+            identical = np.sqrt(((WV[:,cand]-WU[:,[q]])**2).sum(axis=0)) < R[q]
+        else:
+            identical = (V[:,cand] == U[:,[q]]).all(axis=0) # keep truly identical points
+        pairs.append(cand[identical])
+    q = np.repeat(np.arange(U.shape[1]), [len(p) for p in pairs])
+    p = np.concatenate(pairs) if len(pairs) > 0 else np.empty(0, dtype=int)
+    return np.array([p, q], dtype=int).reshape((2,-1)), R
+
+def identical_fixed_points(W, V, v, Winv=None, R=None):
     """
     Looks for identical fixed points based on Taylor expansion and forward error.
     W should be the weight matrix (a numpy.array).
     V should be a numpy.array where each V[:,p] is a fixed point.
     v should be an (N by 1) numpy.array representing a single fixed point.
-    Winv should be the inverse of W, unless None, in which case it is computed.
+    Winv should be the inverse of W, unless None, in which case it is computed (or cached).
+    R should be the radius around v, as computed by fixed_point_radii, unless None, in which case it is computed.
+    To compare many points, consider identical_fixed_points_graph instead.
     Returns identical, RR, R, where
       identical[p]==True iff V[:,p] is identical to v
       RD[p]: the relative distance from V[:,p] to v (as a multiple of R)
       R: the radius around v past which another fixed point is considered distinct
     """
-    if Winv is None: Winv = np.linalg.inv(W)
+    Winv, E = fixed_point_constants(W, Winv)
     # sig'' has a maximum of sqrt(16/27) obtained at input arctanh(sqrt(1/3))
     N = W.shape[0]
-    E = estimate_forward_error(W,np.ones((N,1))).max()
     D2 = np.sqrt(16./27.)
-    Df = (1-np.tanh(W.dot(v))**2)*W - np.eye(N)
-    s_min = np.linalg.norm(Df.dot(Winv), ord=-2)
-    # R = (s_min - np.sqrt(s_min**2 - 4*D2*np.sqrt(N)*E))/D2
-    det = s_min**2 - 8*D2*np.sqrt(N)*E
+    if R is not None:
+        det = -1 if R == 0 else 0
+    else:
+        Df = (1-np.tanh(W.dot(v))**2)*W - np.eye(N)
+        s_min = np.linalg.norm(Df.dot(Winv), ord=-2)
+        # R = (s_min - np.sqrt(s_min**2 - 4*D2*np.sqrt(N)*E))/D2
+        det = s_min**2 - 8*D2*np.sqrt(N)*E
+        if det >= 0: R = (s_min - np.sqrt(det))/D2
     if det < 0:
         R = 0
         RD = np.inf*np.ones(V.shape[1])
         # identical = np.zeros(V.shape[1],dtype=bool)
         identical = (V == v).all(axis=0) # keep truly identical points
     else:
-        R = (s_min - np.sqrt(det))/D2
         RD = np.sqrt((W.dot(V-v)**2).sum(axis=0))/R
         identical = (RD < 1)
     return identical, RD, R
@@ -337,6 +758,92 @@ def s_min_calc(_J_):
     # return s_min
     return np.sqrt(e_min)
 
+def s_min_estimate(_J_, x=None, lu=None, max_iters=8, tol=2**-10, solver=None):
+    """
+    Estimates the minimum singular value of square numpy.array _J_ by inverse iteration on _J_.T.dot(_J_).
+    Each iteration costs O(N^2) once the LU factorization of _J_ is available.
+    x should be a warm start for the corresponding right singular vector (e.g., from the previous traversal step)
+      if None, a random start is used
+    lu should be the LU factorization of _J_, as returned by scipy.linalg.lu_factor
+      if None, it is computed
+    max_iters is the maximum number of inverse iterations
+    tol is the relative change in the estimate at which iteration terminates
+    solver, if not None, is a BorderedSolver used for the solves instead of lu,
+      so that its current factorization is reused (and only refactored when it would be anyway)
+    returns s_min, x, where
+      s_min is the estimate (which, up to round-off, is never below the true minimum singular value)
+      x is the corresponding right singular vector estimate (a unit-norm column numpy.array)
+    """
+    if solver is None:
+        if lu is None: lu = spl.lu_factor(_J_, check_finite=False)
+        solve = lambda b, trans: spl.lu_solve(lu, b, trans=trans, check_finite=False)
+    else:
+        solve = lambda b, trans: solver.solve(_J_, b, trans=trans)
+    if x is None: x = np.random.randn(_J_.shape[0],1)
+    x = x / np.sqrt((x**2).sum())
+    s_min = np.inf
+    for i in range(max_iters):
+        y = solve(x, 1) # _J_.T \ x
+        x = solve(y, 0) # _J_ \ (_J_.T \ x)
+        x = x / np.sqrt((x**2).sum())
+        s_prev, s_min = s_min, min(1/np.sqrt((y**2).sum()), np.sqrt((_J_.dot(x)**2).sum()))
+        if np.fabs(s_prev - s_min) <= tol*s_min: break
+    return s_min, x
+
+def s_min_lower_bound(_J_, s_est, shrink=2**-4, max_tries=4):
+    """
+    Certifies a lower bound on the minimum singular value of numpy.array _J_, near an estimate s_est.
+    theta is certified when _J_.T.dot(_J_) - theta**2 I is positive definite (i.e., its Cholesky factorization exists),
+      with an additional margin for round-off in forming and factoring _J_.T.dot(_J_).
+    Candidates start at theta = (1-shrink)*s_est and are shrunk by (1-shrink) up to max_tries times.
+    Falls back to s_min_calc if no candidate is certified.
+    Forming _J_.T.dot(_J_) and each Cholesky factorization are O(N^3), the same order as s_min_calc,
+      so the bound is certified at a smaller constant factor than s_min_calc, not a lower order.
+    returns theta, the lower bound on the minimum singular value of _J_
+    """
+    G = _J_.T.dot(_J_)
+    margin = 2*G.shape[0]*eps(np.fabs(G).max())
+    I = np.eye(G.shape[0])
+    theta = (1-shrink)*s_est
+    for t in range(max_tries):
+        try:
+            spl.cholesky(G - (theta**2 + margin)*I, check_finite=False)
+            return theta
+        except np.linalg.LinAlgError:
+            theta = (1-shrink)*theta
+    return s_min_calc(_J_)
+
+class SminEstimator:
+    """
+    Selectable computation of minimum singular values for traversal step sizes.
+    Keeps the singular vector estimate between calls so that consecutive steps are warm-started.
+    method should be one of
+      "eigh": exact computation with s_min_calc
+      "inverse": warm-started inverse iteration with s_min_estimate (not certified)
+        O(N^2) per step when solver shares factorizations, otherwise one O(N^3) LU factorization per step
+      "certified": inverse iteration followed by s_min_lower_bound (certified, and O(N^3) per step like "eigh")
+    solver, if not None, should be a BorderedSolver.
+      Inverse iteration then solves through solver, reusing its current factorization as a preconditioner,
+      so when _J_ is the bordered Jacobian (as in directional_fiber), factorizations are shared with the Newton and tangent solves.
+      It should be None when _J_ is not the bordered Jacobian (as in traverse, where it is scaled by _Winv_),
+      since the solver would then refactor on every call.
+    """
+    def __init__(self, method="eigh", solver=None):
+        if method not in ["eigh", "inverse", "certified"]:
+            raise ValueError('Unknown s_min method "%s"'%method)
+        self.method = method
+        self.solver = solver
+        self.x = None
+
+    def __call__(self, _J_):
+        """
+        Returns s_min, the minimum singular value of _J_ (or its estimate or lower bound, depending on method)
+        """
+        if self.method == "eigh": return s_min_calc(_J_)
+        s_min, self.x = s_min_estimate(_J_, self.x, solver=self.solver)
+        if self.method == "certified": s_min = s_min_lower_bound(_J_, s_min)
+        return s_min
+
 def s_max_calc(_J_):
     """
     Returns the maximum singular value of numpy.array _J_
@@ -366,7 +873,7 @@ def dsig(x):
     """
     return 1. - np.tanh(x)**2
 
-def traverse_step_size(_W_, _Winv_, D, J, va, c, z, num_samples=16):
+def traverse_step_size(_W_, _Winv_, D, J, va, c, z, num_samples=16, s_min_fun=s_min_calc):
     """
     Determines a step size according to Thm 1 (Katz and Reggia 2017).
     _W_ should be the augmented weight matrix (an N+1 by N+1 numpy.array)
@@ -378,11 +885,12 @@ def traverse_step_size(_W_, _Winv_, D, J, va, c, z, num_samples=16):
     c should be the direction vector (an N by 1 numpy.array)
     z should be the tangent vector (an N+1 by 1 numpy.array)
     num_samples should be the number of epsilon to try in (0, lambda)
+    s_min_fun should compute the minimum singular value (e.g., s_min_calc or an SminEstimator)
     """
     N = va.shape[0] - 1
     W = _W_[:N,:N]
     _J_ = np.concatenate((J, z.T), axis=0).dot(_Winv_)
-    s_min = s_min_calc(_J_)
+    s_min = s_min_fun(_J_)
     e = np.linspace(0, s_min, num_samples+2)[np.newaxis,1:-1]
     Wv = np.fabs(W.dot(va[:N,:]))
     delta = calc_delta(e, Wv)
@@ -397,30 +905,80 @@ def traverse_step_size(_W_, _Winv_, D, J, va, c, z, num_samples=16):
     max_idx = theta.flatten().argmax()
     return theta.flat[max_idx]/np.sqrt((_W_.dot(z)**2).sum()), rho.flat[max_idx], s_min
 
-def traverse_step_size2(W2norm, J, z):
+def traverse_step_size2(W2norm, J, z, s_min_fun=s_min_calc):
     """
     Determines a step size simplier
     W2norm should be the squared 2-norm of W
     J should be DF, the Jacobian of F (an N by N+1 numpy.array)
     z should be the tangent vector (an N+1 by 1 numpy.array)
+    s_min_fun should compute the minimum singular value (e.g., s_min_calc or an SminEstimator)
     """
     _J_ = np.concatenate((J, z.T), axis=0)
-    s_min = s_min_calc(_J_)
+    s_min = s_min_fun(_J_)
     return T2CONST * s_min / W2norm
     
-def traverse_step_size3(mu, J, z):
+def traverse_step_size3(mu, J, z, s_min_fun=s_min_calc):
     """
     Determines a step size simplier
     W2norm should be the squared 2-norm of W
     J should be DF, the Jacobian of F (an N by N+1 numpy.array)
     z should be the tangent vector (an N+1 by 1 numpy.array)
+    s_min_fun should compute the minimum singular value (e.g., s_min_calc or an SminEstimator)
     """
     _J_ = np.concatenate((J, z.T), axis=0)
-    s_min = s_min_calc(_J_)
+    s_min = s_min_fun(_J_)
     # return s_min / (2. * mu)
     return s_min / (4. * mu), s_min
 
-def take_traverse_step(W, I, c, va, z, step_size, max_nr_iters, nr_tol, verbose=1):
+class BorderedSolver:
+    """
+    Solves linear systems with the bordered Jacobians [DF; z.T] ((N+1) by (N+1)) that arise during traversal.
+    Between consecutive solves only D = tanh'(W.dot(v)) and z change slightly,
+      so the LU factorization of a previous bordered Jacobian is reused as a preconditioner
+      (stationary iterative refinement, O(N^2) per iteration) instead of refactoring (O(N^3)) every time.
+    A fresh factorization is computed whenever refinement stalls or exceeds max_iters iterations.
+    max_iters is the maximum number of refinement iterations per solve
+    tol is the relative residual (normwise, in the infinity-norm) at which refinement terminates
+    max_ratio is the largest residual reduction ratio per iteration tolerated before refactoring
+    """
+    def __init__(self, max_iters=8, tol=2**-44, max_ratio=0.5):
+        self.max_iters = max_iters
+        self.tol = tol
+        self.max_ratio = max_ratio
+        self.lu = None
+        self.num_solves = 0
+        self.num_factorizations = 0
+
+    def solve(self, A, b, trans=0):
+        """
+        Returns x, where x solves Ax = b, as in solve.
+        trans should be 1 to solve A.T.dot(x) = b instead
+        """
+        self.num_solves += 1
+        if trans: A = A.T
+        if self.lu is not None:
+            A_norm, b_norm = np.fabs(A).sum(axis=1).max(), np.fabs(b).max()
+            x = spl.lu_solve(self.lu, b, trans=trans, check_finite=False)
+            r_prev = np.inf
+            for i in range(self.max_iters):
+                r = b - A.dot(x)
+                r_max = np.fabs(r).max()
+                if r_max <= self.tol*(A_norm*np.fabs(x).max() + b_norm): return x
+                if not r_max < self.max_ratio*r_prev: break
+                x = x + spl.lu_solve(self.lu, r, trans=trans, check_finite=False)
+                r_prev = r_max
+        return spl.lu_solve(self.factor(A.T if trans else A), b, trans=trans, check_finite=False)
+
+    def factor(self, A):
+        """
+        Replaces the cached factorization with a fresh LU factorization of A.
+        returns lu, the factorization (as returned by scipy.linalg.lu_factor)
+        """
+        self.lu = spl.lu_factor(A, check_finite=False)
+        self.num_factorizations += 1
+        return self.lu
+
+def take_traverse_step(W, I, c, va, z, step_size, max_nr_iters, nr_tol, verbose=1, solver=None, return_iters=False):
     """
     Takes step according to Thm 1 (Katz and Reggia 2017).
     W should be the weight matrix (N by N numpy.array)
@@ -432,11 +990,16 @@ def take_traverse_step(W, I, c, va, z, step_size, max_nr_iters, nr_tol, verbose=
     step_size should be as returned by traverse_step_size
     max_nr_iters is the maximum number of iterations for Newton-Raphson refinement
     nr_tol is a tolerance at which Newton-Raphson refinement may terminate
-    returns va, F, where
+    solver should be a BorderedSolver used for the Newton-Raphson linear solves
+      if None, each linear system is solved from scratch
+    if return_iters == True, the number of Newton-Raphson iterations is also returned
+    returns va, F (, num_iters), where
       va is the new point after the step
       F is the residual value of F at the new point.
+      num_iters is the number of Newton-Raphson linear solves used
     """
     N = W.shape[0]
+    lin_solve = solve if solver is None else solver.solve
     va_start = va
     g_root = np.zeros((N+1,1))
     va = va_start + z*step_size # fast first step
@@ -450,7 +1013,8 @@ def take_traverse_step(W, I, c, va, z, step_size, max_nr_iters, nr_tol, verbose=
         D = 1 - tWv**2
         J = np.concatenate((D*W - I, -c), axis=1)
         Dg = np.concatenate((J, z.T), axis=0)
-        va = va + solve(Dg, g_root)
+        va = va + lin_solve(Dg, g_root)
+    if return_iters: return va, F, drive_step
     return va, F
 
 def get_term(W, c):
@@ -464,19 +1028,334 @@ def get_term(W, c):
     term = ((np.arctanh(np.sqrt(1 - D_bound)) + np.fabs(W).sum(axis=1))/np.fabs(W.dot(c))).max()
     return term
 
-def calc_z_new(J, z):
+def calc_z_new(J, z, solver=None):
     """
     Calculate the new tangent vector after the numerical step
     J should be the Jacobian of F at the new point after the step (N by N+1 numpy.array)
     z should be the previous tangent vector before the step (N+1 by 1 numpy.array)
+    solver should be a BorderedSolver used for the linear solve
+      if None, the linear system is solved from scratch
     returns z_new, the tangent vector after the step (N+1 by 1 numpy.array)
     """
     N = J.shape[0]
-    z_new = solve(np.concatenate((J,z.T), axis=0), np.concatenate((np.zeros((N,1)), [[1]]), axis=0)) # Fast J null-space
+    lin_solve = solve if solver is None else solver.solve
+    z_new = lin_solve(np.concatenate((J,z.T), axis=0), np.concatenate((np.zeros((N,1)), [[1]]), axis=0)) # Fast J null-space
     z_new = z_new / np.sqrt((z_new**2).sum()) # faster than linalg.norm
     return z_new
 
-def traverse(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_traverse_steps=None, max_fxpts=None, logfile=None, max_step_size=None):
+class FiberBuffer:
+    """
+    Growable, array-backed storage for a sequence of points (or scalars) along a fiber.
+    Points are stored contiguously in a preallocated float64 numpy.array whose capacity doubles when full,
+      so appending is amortized O(1) and no concatenation is needed once traversal finishes.
+    num_rows is the number of entries in each point (e.g., N+1 for points (v, alpha) along the fiber)
+      if None, the buffer stores scalars (e.g., step sizes)
+    capacity is the number of points initially preallocated
+    max_points, if not None, bounds storage to the most recent max_points points (ring buffer mode)
+    """
+    def __init__(self, num_rows=None, capacity=2**10, max_points=None):
+        if max_points is not None: capacity = max_points
+        self.num_rows = num_rows
+        self.max_points = max_points
+        self.data = np.empty((capacity,) if num_rows is None else (capacity, num_rows))
+        self.start = 0 # storage index of the oldest point
+        self.size = 0 # number of points currently stored
+        self.count = 0 # total number of points appended, including any dropped in ring buffer mode
+
+    def __len__(self):
+        return self.size
+
+    def append(self, x):
+        """
+        Append x, an (num_rows by 1) numpy.array (or a scalar if num_rows is None)
+        """
+        if self.max_points is None:
+            if self.size == self.data.shape[0]:
+                data = np.empty((2*self.size,) + self.data.shape[1:])
+                data[:self.size] = self.data
+                self.data = data
+            idx = self.size
+            self.size += 1
+        else:
+            idx = (self.start + self.size) % self.max_points
+            if self.size == self.max_points: self.start = (self.start + 1) % self.max_points
+            else: self.size += 1
+        self.data[idx] = x if self.num_rows is None else np.ravel(x)
+        self.count += 1
+
+    def extend(self, A):
+        """
+        Append every point in A, where A[:,n] (or A[n] if num_rows is None) is the n^{th} new point
+        """
+        A = np.asarray(A, dtype=float)
+        if self.num_rows is not None: A = A.T
+        if self.max_points is None:
+            capacity = self.data.shape[0]
+            while capacity < self.size + len(A): capacity *= 2
+            if capacity > self.data.shape[0]:
+                data = np.empty((capacity,) + self.data.shape[1:])
+                data[:self.size] = self.data[:self.size]
+                self.data = data
+            self.data[self.size:self.size+len(A)] = A
+            self.size += len(A)
+            self.count += len(A)
+        else:
+            # points older than the most recent max_points would be dropped anyway
+            self.count += max(0, len(A) - self.max_points)
+            for x in A[-self.max_points:]: self.append(x)
+
+    def __getitem__(self, n):
+        """
+        Returns the n^{th} stored point (oldest first), as an (num_rows by 1) numpy.array view.
+        Negative n counts back from the most recent point, as with lists.
+        """
+        if n < 0: n += self.size
+        if not 0 <= n < self.size: raise IndexError('FiberBuffer index out of range')
+        x = self.data[(self.start + n) % self.data.shape[0]]
+        return x if self.num_rows is None else x[:,np.newaxis]
+
+    def array(self, stop=None):
+        """
+        Returns the stored points in order, as a numpy.array A, where
+          A[:,n] is the n^{th} stored point (or A[n] is the n^{th} scalar if num_rows is None).
+        If stop is not None, only the first stop points are included.
+        A is a view of the underlying storage (no copy) unless in ring buffer mode.
+        """
+        if stop is None: stop = self.size
+        if self.max_points is None:
+            A = self.data[:stop]
+        else:
+            A = self.data[(self.start + np.arange(stop)) % self.max_points]
+        return A if self.num_rows is None else A.T
+
+# Record layout of traversal traces (see TraversalTrace)
+TRACE_DTYPE = np.dtype([
+    ('step', np.int64),
+    ('tangent_time', np.float32),
+    ('step_size_time', np.float32),
+    ('corrector_time', np.float32),
+    ('check_time', np.float32),
+    ('nr_iters', np.int32),
+    ('step_size', np.float32),
+    ('s_min', np.float32),
+    ('residual', np.float32),
+])
+TRACE_PHASES = ['tangent', 'step_size', 'corrector', 'check']
+
+class TraversalTrace:
+    """
+    Per-step telemetry for traverse, recorded as a compact binary trace.
+    Each step is one TRACE_DTYPE record with the time spent in each phase of the step:
+      tangent: updating the Jacobian and solving for the new tangent vector
+      step_size: computing the step size (including the minimum singular value)
+      corrector: the Newton-Raphson corrector iterations (their number is recorded in nr_iters)
+      check: checking for and reporting fixed points
+    along with the step size, minimum singular value, and residual at that step.
+    Records are buffered in memory and appended to the trace file in blocks, so tracing adds little overhead.
+    Traces can be read back with load_trace and summarized with trace_summary and trace_report.
+    """
+    def __init__(self, filename=None, mode='w', buffer_steps=2**10):
+        """
+        filename is the file name at which to save the trace
+          if None, the trace is only kept in memory
+        mode is 'w' to start a new trace, or 'a' to append to an existing one (e.g., when resuming a checkpoint)
+        buffer_steps is the number of records buffered in memory before appending them to the file
+        """
+        self.filename = filename
+        if filename is not None and mode == 'w': open(filename, 'wb').close()
+        self.buffer = np.empty(buffer_steps, dtype=TRACE_DTYPE)
+        self.num_buffered = 0
+        self.blocks = []
+    def record(self, step, tangent_time, step_size_time, corrector_time, check_time, nr_iters, step_size, s_min, residual):
+        """
+        Record the telemetry for one traversal step
+        """
+        self.buffer[self.num_buffered] = (step, tangent_time, step_size_time, corrector_time, check_time, nr_iters, step_size, s_min, residual)
+        self.num_buffered += 1
+        if self.num_buffered == self.buffer.shape[0]: self.flush()
+    def flush(self):
+        """
+        Append the buffered records to the trace file (or the in-memory trace if there is no file)
+        """
+        if self.num_buffered == 0: return
+        if self.filename is None:
+            self.blocks.append(self.buffer[:self.num_buffered].copy())
+        else:
+            trace_file = open(self.filename, 'ab')
+            self.buffer[:self.num_buffered].tofile(trace_file)
+            trace_file.close()
+        self.num_buffered = 0
+    def truncate(self, num_steps):
+        """
+        Discard the records of steps numbered num_steps or later,
+          e.g. steps recorded after the last checkpoint of an interrupted traversal, which are repeated on resume
+        """
+        records = self.array()
+        later = np.flatnonzero(records['step'] >= num_steps)
+        keep = later[0] if len(later) > 0 else len(records)
+        if self.filename is None:
+            self.blocks = [records[:keep]]
+        else:
+            trace_file = open(self.filename, 'r+b')
+            trace_file.truncate(keep*TRACE_DTYPE.itemsize)
+            trace_file.close()
+    def array(self):
+        """
+        returns records, a flat numpy.array with dtype TRACE_DTYPE, where
+          records[n] is the n^{th} step recorded
+        """
+        self.flush()
+        if self.filename is not None: return load_trace(self.filename)
+        if len(self.blocks) == 0: return np.empty(0, dtype=TRACE_DTYPE)
+        return np.concatenate(self.blocks)
+
+def load_trace(filename):
+    """
+    Load a trace saved by TraversalTrace
+    filename is the file name of the trace
+    returns records, a flat numpy.array with dtype TRACE_DTYPE, where
+      records[n] is the n^{th} step recorded
+    """
+    return np.fromfile(filename, dtype=TRACE_DTYPE)
+
+def trace_summary(records):
+    """
+    Summarize where the time went in a traversal trace
+    records should be as returned by load_trace
+    returns summary, a dictionary with keys
+      "num_steps": the number of steps recorded
+      "total_time": the total time recorded over all phases
+      "steps_per_second": the number of steps per unit total_time
+      "<phase>_time": the total time spent in each phase of TRACE_PHASES
+      "<phase>_fraction": the fraction of total_time spent in each phase
+      "mean_nr_iters", "max_nr_iters": statistics of the Newton-Raphson iterations per step
+    """
+    summary = {"num_steps": records.shape[0]}
+    phase_times = [records['%s_time'%phase].astype(float).sum() for phase in TRACE_PHASES]
+    total_time = sum(phase_times)
+    summary["total_time"] = total_time
+    summary["steps_per_second"] = records.shape[0]/total_time if total_time > 0 else np.nan
+    for (phase, phase_time) in zip(TRACE_PHASES, phase_times):
+        summary["%s_time"%phase] = phase_time
+        summary["%s_fraction"%phase] = phase_time/total_time if total_time > 0 else np.nan
+    summary["mean_nr_iters"] = records['nr_iters'].mean() if records.shape[0] > 0 else np.nan
+    summary["max_nr_iters"] = records['nr_iters'].max() if records.shape[0] > 0 else 0
+    return summary
+
+def trace_report(records):
+    """
+    Format a human-readable report of a traversal trace
+    records should be as returned by load_trace
+    returns report, a multi-line string
+    """
+    summary = trace_summary(records)
+    lines = ['%d steps in %fs (%f steps/s), %f NR iters/step (max %d)'%(
+        summary["num_steps"], summary["total_time"], summary["steps_per_second"], summary["mean_nr_iters"], summary["max_nr_iters"])]
+    for phase in TRACE_PHASES:
+        lines.append('  %-10s %10.6fs (%5.1f%%), %e s/step'%(
+            phase, summary["%s_time"%phase], 100*summary["%s_fraction"%phase], summary["%s_time"%phase]/max(summary["num_steps"],1)))
+    return '\n'.join(lines)
+
+def save_checkpoint(checkpoint, state, VA, step_sizes, s_mins, residuals, num_saved):
+    """
+    Persist traversal progress so that traverse or directional_fiber can resume after an interruption.
+    checkpoint is the base file name for the saved progress:
+      the fiber points (and their step data) are appended to <checkpoint>.fiber
+      the remaining traversal state is written to <checkpoint>.npz, which is replaced atomically
+    state is a dict of numpy.arrays with the traversal state (va, z, c, step, etc.)
+    VA, step_sizes, s_mins, residuals are the FiberBuffers of the traversal
+    num_saved is the number of fiber points already in <checkpoint>.fiber (0 starts a new file)
+    Only points appended since the last save are written, so they must still be held in VA.
+    returns the new number of fiber points saved
+    """
+    num_new = VA.count - num_saved
+    records = np.concatenate((
+        VA.array()[:,len(VA)-num_new:],
+        step_sizes.array()[np.newaxis,len(step_sizes)-num_new:],
+        s_mins.array()[np.newaxis,len(s_mins)-num_new:],
+        residuals.array()[np.newaxis,len(residuals)-num_new:]), axis=0)
+    fiber_file = open('%s.fiber'%checkpoint, 'ab' if num_saved > 0 else 'wb')
+    fiber_file.write(records.T.astype(float).tobytes())
+    fiber_file.flush()
+    os.fsync(fiber_file.fileno())
+    fiber_file.close()
+    # fiber is on disk before the state that references it
+    state = dict(state, num_saved=VA.count)
+    state_file = open('%s.tmp.npz'%checkpoint, 'wb')
+    np.savez(state_file, **state)
+    state_file.flush()
+    os.fsync(state_file.fileno())
+    state_file.close()
+    os.rename('%s.tmp.npz'%checkpoint, '%s.npz'%checkpoint)
+    return VA.count
+
+def save_solver_state(state, s_min_fun, solver=None):
+    """
+    Add the warm-start state of an SminEstimator and a BorderedSolver to a traversal state dict for save_checkpoint,
+      so that a resumed traversal continues exactly as an uninterrupted one would.
+    s_min_fun is the SminEstimator of the traversal
+    solver is the BorderedSolver of the traversal, or None if factorizations are not reused
+    returns state, with the inverse iteration vector and LU factorization added when present
+    """
+    if s_min_fun.x is not None: state['s_min_x'] = s_min_fun.x
+    if solver is not None and solver.lu is not None: state['lu'], state['lu_piv'] = solver.lu
+    return state
+
+def restore_solver_state(state, s_min_fun, solver=None):
+    """
+    Restore the warm-start state added by save_solver_state into a new SminEstimator and BorderedSolver.
+    """
+    if 's_min_x' in state: s_min_fun.x = state['s_min_x']
+    if solver is not None and 'lu' in state: solver.lu = (state['lu'], state['lu_piv'])
+
+def load_checkpoint_state(checkpoint):
+    """
+    Load the traversal state saved by save_checkpoint (without the fiber).
+    checkpoint is the base file name passed to save_checkpoint
+    returns state, the dict of saved numpy.arrays, or None if there is no checkpoint
+    """
+    if not os.path.exists('%s.npz'%checkpoint): return None
+    npz = np.load('%s.npz'%checkpoint)
+    state = {key: npz[key] for key in npz.files}
+    npz.close()
+    return state
+
+def load_checkpoint(checkpoint, max_fiber_points=None):
+    """
+    Load the traversal progress saved by save_checkpoint.
+    Fiber points written after the last saved state (e.g. by an interrupted save) are discarded.
+    checkpoint is the base file name passed to save_checkpoint
+    max_fiber_points is the number of most recent fiber points to restore in VA, as in traverse
+    returns state, VA, step_sizes, s_mins, residuals, where
+      state is the dict of saved numpy.arrays
+      VA, step_sizes, s_mins, residuals are the restored FiberBuffers
+    """
+    state = load_checkpoint_state(checkpoint)
+    num_saved = int(state['num_saved'])
+    num_rows = state['va'].shape[0] + 3
+    fiber_file = open('%s.fiber'%checkpoint, 'r+b')
+    fiber_file.truncate(num_saved*num_rows*np.dtype(float).itemsize)
+    fiber_file.close()
+    records = np.fromfile('%s.fiber'%checkpoint, dtype=float).reshape((num_saved, num_rows)).T
+    VA = FiberBuffer(num_rows-3, max_points=max_fiber_points)
+    step_sizes = FiberBuffer(capacity=max(num_saved, 2**10))
+    s_mins = FiberBuffer(capacity=max(num_saved, 2**10))
+    residuals = FiberBuffer(capacity=max(num_saved, 2**10))
+    VA.extend(records[:-3,:])
+    step_sizes.extend(records[-3,:])
+    s_mins.extend(records[-2,:])
+    residuals.extend(records[-1,:])
+    return state, VA, step_sizes, s_mins, residuals
+
+def remove_checkpoint(checkpoint):
+    """
+    Delete the files saved by save_checkpoint, if any.
+    checkpoint is the base file name passed to save_checkpoint
+    """
+    for ext in ['npz','fiber','tmp.npz']:
+        if os.path.exists('%s.%s'%(checkpoint, ext)): os.remove('%s.%s'%(checkpoint, ext))
+
+def traverse(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_traverse_steps=None, max_fxpts=None, logfile=None, max_step_size=None, max_fiber_points=None, reuse_lu=False, s_min_method="eigh", checkpoint=None, checkpoint_steps=2**10, resume=False, candidate_callback=None, trace=None, fiber_index=None):
     """
     Find fixed points via fiber traversal.
     run_solver invokes this method before post-processing the resulting fixed points.
@@ -493,48 +1372,104 @@ def traverse(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_traverse_
       if None, traversal continues until another termination criteria is met
     logfile is a file object open for writing that records progress
       if None, no progress is recorded
+    max_step_size is a maximum step size to use for each step
+      if None, no limit is imposed on the return value of traverse_step_size
+    max_fiber_points is the number of most recent fiber points to keep in VA (at least 1)
+      if None, every point along the fiber is kept
+    reuse_lu, if True, reuses LU factorizations across steps via a BorderedSolver (faster for large N)
+    s_min_method selects how minimum singular values are computed for step sizes, as in SminEstimator
+      reused LU factorizations are not shared with it, so each s_min costs O(N^3) with every method
+    checkpoint is a base file name at which progress is saved every checkpoint_steps steps (see save_checkpoint)
+      the final state is also saved, so that resuming a finished traversal returns its result immediately
+      if None, no progress is saved
+    resume, if True and a checkpoint was previously saved, continues traversal from the saved state
+      va and c are then ignored in favor of the saved ones
+      the s_min warm start and any reused LU factorization are restored too, so the result matches an uninterrupted traversal
+    candidate_callback is a function called with each new batch of candidates (N by K numpy.array) when found
+      e.g., the put method of a PostProcessor, to post-process concurrently with traversal
+      if None, candidates are only returned in fxV
+    trace is a TraversalTrace in which per-step timings are recorded
+      records of the steps about to be traversed (e.g., made after the checkpoint being resumed) are discarded first
+      if None, no timings are recorded
+    fiber_index is a FiberIndex of earlier traversals, used to stop traversal (status "Merged")
+      once it has merged into an indexed fiber with the same c (see FiberIndex.watch)
+      if None, traversal is never stopped for merging
 
     returns status, fxV, VA, c, step_sizes, s_mins, residuals, where
       status is one of
-        "Success", "Max steps reached", "Max fxpts found", "Closed loop detected"
+        "Success", "Max steps reached", "Max fxpts found", "Closed loop detected", "Merged"
       fxV[:,p] is the p^{th} (un-post-processed) fixed point found  
-      VA[:,n] is the n^{th} point along the fiber  
+      VA[:,n] is the n^{th} point along the fiber (or among the last max_fiber_points)  
       c is the direction vector that was used (N by 1 numpy.array)  
       step_sizes[n] is the step size used for the n^{th} step  
       s_mins[n] is the minimum singular value of DF at the n^{th} step  
       residuals[n] is the infinity-norm of F at the n^{th} step
     """
 
+    if max_fiber_points is not None and max_fiber_points < 1:
+        raise ValueError('max_fiber_points must be at least 1')
+
     # Set defaults
     N = W.shape[0]
+    start_clock = time.clock()
+    resuming = resume and checkpoint is not None and os.path.exists('%s.npz'%checkpoint)
+    if resuming:
+        state, VA, step_sizes, s_mins, residuals = load_checkpoint(checkpoint, max_fiber_points)
+        va, z, c = state['va'], state['z'], state['c']
     if va is None: va = np.zeros((N+1,1))
     if c is None:
         c = np.random.randn(N,1)
         c = c/np.sqrt((c**2).sum())
+    if max_fiber_points is not None: checkpoint_steps = min(checkpoint_steps, max_fiber_points)
 
     # Constants
     I = np.eye(N)
     _W_, _Winv_ = np.eye(N+1), np.eye(N+1)
     _W_[:N,:N], _Winv_[:N,:N] = W, np.linalg.inv(W)
+    solver = BorderedSolver() if reuse_lu else None
+    s_min_fun = SminEstimator(s_min_method) # step sizes use _J_ scaled by _Winv_, which cannot share solver's factorization
 
     # Termination criterion
     term = get_term(W, c)
-
-    # Drive initial va to curve
-    va = drive_initial_va(W, va, c, max_nr_iters, nr_tol)
-    D = 1 - np.tanh(W.dot(va[:N,:]))**2
-    J = np.concatenate((D*W - I, -c), axis=1)
-    _,_,z = np.linalg.svd(J)
-    z = z[[N],:].T
-
-    # Traverse
-    VA = []
-    step_sizes = []
-    s_mins = []
-    residuals = []
-    fxV = []
-    status = "Success"
-    for step in it.count(0):
+    merged = fiber_index.watch(c) if fiber_index is not None else None
+
+    if resuming:
+        restore_solver_state(state, s_min_fun, solver)
+        fxV = [state['fxV']] if state['fxV'].shape[1] > 0 else []
+        va_0, cloop = state['va_0'], state['cloop']
+        start_step, prior_runtime, num_saved = int(state['step']), float(state['runtime']), int(state['num_saved'])
+        status = str(state['status']) if 'status' in state else None
+        if logfile is not None:
+            hardwrite(logfile,'Resuming from checkpoint at iteration %d, %d fx found\n'%(start_step,len(fxV)))
+        if candidate_callback is not None and len(fxV) > 0: candidate_callback(fxV[0])
+    else:
+        # Drive initial va to curve
+        va = drive_initial_va(W, va, c, max_nr_iters, nr_tol)
+        D = 1 - np.tanh(W.dot(va[:N,:]))**2
+        J = np.concatenate((D*W - I, -c), axis=1)
+        _,_,z = np.linalg.svd(J)
+        z = z[[N],:].T
+        VA = FiberBuffer(N+1, max_points=max_fiber_points)
+        step_sizes = FiberBuffer()
+        s_mins = FiberBuffer()
+        residuals = FiberBuffer()
+        fxV = []
+        va_0, cloop = va, np.nan
+        start_step, prior_runtime, num_saved = 0, 0., 0
+        status = None
+
+    def save(step, status=None):
+        state = {'va': va, 'z': z, 'c': c, 'step': step, 'va_0': va_0, 'cloop': cloop,
+            'fxV': np.concatenate(fxV, axis=1) if len(fxV) > 0 else np.empty((N,0)),
+            'runtime': prior_runtime + time.clock() - start_clock}
+        if status is not None: state['status'] = status
+        save_solver_state(state, s_min_fun, solver)
+        return save_checkpoint(checkpoint, state, VA, step_sizes, s_mins, residuals, num_saved)
+
+    # Traverse (a finished traversal restored from checkpoint already has its status)
+    finished = status is not None
+    if trace is not None and not finished: trace.truncate(start_step) # steps after the checkpoint are recorded again
+    for step in (it.count(start_step) if not finished else []):
         if step == max_traverse_steps:
             status = "Max steps reached"
             break
@@ -542,22 +1477,27 @@ def traverse(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_traverse_
         # Track path
         VA.append(va)
         if step == 1:
-            cloop = np.sqrt(((VA[1]-VA[0])**2).sum())
+            cloop = np.sqrt(((va-va_0)**2).sum())
 
         # Update quantities
+        if trace is not None: tangent_start = time.clock()
         D = 1 - np.tanh(W.dot(va[:N,:]))**2
         J = np.concatenate((D*W - I, -c), axis=1)
 
-        z_new = calc_z_new(J, z)
+        z_new = calc_z_new(J, z, solver)
 
         # Get step size
-        step_size, rho, s_min = traverse_step_size(_W_, _Winv_, D, J, va, c, z_new)
+        if trace is not None: step_size_start = time.clock()
+        step_size, rho, s_min = traverse_step_size(_W_, _Winv_, D, J, va, c, z_new, s_min_fun=s_min_fun)
         if max_step_size is not None: step_size = min(step_size, max_step_size)
         step_sizes.append(step_size)
         s_mins.append(s_min)
 
-        va_new, F_new = take_traverse_step(W, I, c, va, z_new, step_size, max_nr_iters, nr_tol)
-        residuals.append(np.fabs(F_new).max())
+        if trace is not None: corrector_start = time.clock()
+        va_new, F_new, nr_iters = take_traverse_step(W, I, c, va, z_new, step_size, max_nr_iters, nr_tol, solver=solver, return_iters=True)
+        residual = np.fabs(F_new).max()
+        residuals.append(residual)
+        if trace is not None: check_start = time.clock()
 
         # Check fixed point
         if not np.sign(va[N]) == np.sign(va_new[N]):
@@ -566,8 +1506,13 @@ def traverse(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_traverse_
             fxV.append(va_new[:N,:])
             m = -va[N]/(va_new[N]-va[N]) # linear interpolant for alpha == 0
             fxV.append(va[:N,:] + m*(va_new[:N,:]-va[:N,:]))
+            if candidate_callback is not None: candidate_callback(np.concatenate(fxV[-3:], axis=1))
         va = va_new
         z = z_new
+        if trace is not None:
+            check_end = time.clock()
+            trace.record(step, step_size_start-tangent_start, corrector_start-step_size_start, check_start-corrector_start, check_end-check_start,
+                nr_iters, step_size, s_min, residual)
 
         # Check termination
         if np.fabs(va[N]) > term:
@@ -581,27 +1526,231 @@ def traverse(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_traverse_
             break
 
         # Check for closed loop
-        cloop_va = np.sqrt(((va-VA[0])**2).sum())
+        cloop_va = np.sqrt(((va-va_0)**2).sum())
         if step > 5 and cloop_va < 1.5*cloop:
             if logfile is not None:
                 hardwrite(logfile,'Cloop: iteration %d of %s, %d fx found, cloop: %e\n'%(step,max_traverse_steps,2*len(fxV)+1, cloop_va))
             status = "Closed loop detected"
             break
 
+        if merged is not None and merged(va):
+            status = "Merged"
+            break
+
         if (step % 100) == 0 and logfile is not None:
-            hardwrite(logfile,'iteration %d of %s,step_size=%f,s_min=%e,%d fx,term:%e>? %e,cloop:%e\n'%(step,max_traverse_steps,step_size,s_min,len(fxV),va[N],term.max(), np.sqrt(((va-VA[0])**2).sum())))
+            log_progress(logfile, 'traverse', step=step, max_steps=max_traverse_steps, step_size=step_size, s_min=s_min, num_fxpts=len(fxV), alpha=va[N], term=term.max(), cloop=cloop_va)
+
+        if checkpoint is not None and (step+1) % checkpoint_steps == 0:
+            num_saved = save(step+1)
+
+    if checkpoint is not None and not finished:
+        num_saved = save(step, status)
+    if trace is not None: trace.flush()
 
     # clean output
     if len(fxV) == 0:
         fxV = [np.zeros((N,1))]
     fxV = np.concatenate(fxV,axis=1)
-    VA = np.concatenate(VA, axis=1)
-    step_sizes = np.array(step_sizes)
-    s_mins = np.array(s_mins)
-    residuals = np.array(residuals)
+    VA = VA.array()
+    step_sizes = step_sizes.array()
+    s_mins = s_mins.array()
+    residuals = residuals.array()
     return status, fxV, VA, c, step_sizes, s_mins, residuals
 
-def directional_fiber(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_step_size=None, max_traverse_steps=None, max_refine_steps=2**5, max_fxpts=None, stop_time=None, logfile=None):
+def bordered_jacobian_stack(W, C, D, Z):
+    """
+    Stacks the bordered Jacobians [DF; z.T] of several fibers for batched (gufunc) solves.
+    W is the weight matrix (N by N numpy.array)
+    C is the matrix of direction vectors (N by K numpy.array), where C[:,k] is used by the k^{th} fiber
+    D should be tanh'(W.dot(V)) (N by K numpy.array) at the current fiber points V
+    Z is the matrix of tangent vectors (N+1 by K numpy.array)
+    returns Dg, where Dg[k] is the bordered Jacobian of the k^{th} fiber (a K by N+1 by N+1 numpy.array)
+    """
+    N, K = C.shape
+    Dg = np.empty((K,N+1,N+1))
+    Dg[:,:N,:N] = D.T[:,:,np.newaxis]*W[np.newaxis,:,:]
+    Dg[:,np.arange(N),np.arange(N)] -= 1
+    Dg[:,:N,N] = -C.T
+    Dg[:,N,:] = Z.T
+    return Dg
+
+def traverse_step_size_batch(_W_, _Winv_, D, C, V, Z, num_samples=16):
+    """
+    Batched version of traverse_step_size for several fibers at once.
+    _W_, _Winv_, and num_samples should be as in traverse_step_size
+    D should be tanh'(W.dot(V)) (N by K numpy.array) at the current fiber points
+    C is the matrix of direction vectors (N by K numpy.array)
+    V is the matrix of current fiber points (N+1 by K numpy.array)
+    Z is the matrix of tangent vectors (N+1 by K numpy.array)
+    returns step_sizes, rhos, s_mins, where the k^{th} entries are as returned by traverse_step_size for the k^{th} fiber
+    """
+    N, K = D.shape
+    W = _W_[:N,:N]
+    # [J; z.T].dot(_Winv_) == [diag(D) - Winv, -c; z.T.dot(_Winv_)]
+    _J_ = np.empty((K,N+1,N+1))
+    _J_[:,:N,:N] = -_Winv_[np.newaxis,:N,:N]
+    _J_[:,np.arange(N),np.arange(N)] += D.T
+    _J_[:,:N,N] = -C.T
+    _J_[:,N,:] = Z.T.dot(_Winv_)
+    s_min = np.sqrt(np.linalg.eigvalsh(np.matmul(_J_.transpose(0,2,1), _J_))[:,0])
+    e = s_min[:,np.newaxis,np.newaxis]*np.linspace(0, 1, num_samples+2)[np.newaxis,np.newaxis,1:-1]
+    Wv = np.fabs(W.dot(V[:N,:])).T[:,:,np.newaxis]
+    delta = calc_delta(e, Wv)
+    mu = mu_calc(Wv, delta)
+    rho = mu.max(axis=1)/(s_min[:,np.newaxis] - e[:,0,:])
+    delta = delta.min(axis=1)
+    theta = np.empty(delta.shape)
+    idx = ~np.isinf(delta)
+    theta[idx] = delta[idx]/(1+rho[idx]*delta[idx])
+    theta[~idx] = 1/rho[~idx]
+    max_idx = theta.argmax(axis=1)
+    k = np.arange(K)
+    return theta[k,max_idx]/np.sqrt((_W_.dot(Z)**2).sum(axis=0)), rho[k,max_idx], s_min
+
+def take_traverse_step_batch(W, C, V, Z, step_sizes, max_nr_iters, nr_tol):
+    """
+    Batched version of take_traverse_step for several fibers at once.
+    Newton-Raphson iterations continue only for fibers that have not yet reached nr_tol.
+    W is the weight matrix (N by N numpy.array)
+    C is the matrix of direction vectors (N by K numpy.array)
+    V is the matrix of current fiber points (N+1 by K numpy.array)
+    Z is the matrix of tangent vectors (N+1 by K numpy.array)
+    step_sizes[k] is the step size for the k^{th} fiber
+    max_nr_iters and nr_tol should be as in take_traverse_step
+    returns V, F, where
+      V[:,k] is the new point of the k^{th} fiber after the step
+      F[:,k] is the residual value of F at V[:,k]
+    """
+    N, K = C.shape
+    V = V + Z*step_sizes # fast first step
+    F = np.empty((N,K))
+    idx = np.arange(K)
+    for drive_step in range(max_nr_iters):
+        tWv = np.tanh(W.dot(V[:N,idx]))
+        F[:,idx] = tWv - V[:N,idx] - V[N,idx]*C[:,idx]
+        unconverged = ~(np.fabs(F[:,idx]) < nr_tol).all(axis=0)
+        idx, tWv = idx[unconverged], tWv[:,unconverged]
+        if len(idx) == 0: break
+        g_root = np.zeros((len(idx),N+1))
+        g_root[:,:N] = -F[:,idx].T
+        Dg = bordered_jacobian_stack(W, C[:,idx], 1 - tWv**2, Z[:,idx])
+        V[:,idx] += solve(Dg, g_root).T
+    return V, F
+
+def traverse_batch(W, VA=None, C=None, num_fibers=None, max_nr_iters=2**8, nr_tol=2**-32, max_traverse_steps=None, max_fxpts=None, logfile=None, max_step_size=None):
+    """
+    Batched version of traverse that advances several fibers of the same W in lockstep.
+    Each step uses stacked (gufunc) solves and eigenvalue computations over all fibers still being traversed,
+      amortizing Python overhead and BLAS/LAPACK calls when many direction vectors are tried on one network.
+    W is the weight matrix (N by N numpy.array)
+    VA is the matrix of initial points (N+1 by K numpy.array), where VA[:,k] starts the k^{th} fiber
+      if None, all traversals start at the origin
+    C is the matrix of direction vectors (N by K numpy.array), where C[:,k] is used by the k^{th} fiber
+      if None, num_fibers random direction vectors are chosen
+    max_nr_iters, nr_tol, max_traverse_steps, max_fxpts, logfile, and max_step_size are as in traverse,
+      and apply to each fiber separately
+    returns results, where
+      results[k] is the tuple (status, fxV, VA, c, step_sizes, s_mins, residuals) for the k^{th} fiber,
+      with the same format as returned by traverse
+    """
+
+    # Set defaults
+    N = W.shape[0]
+    if C is None:
+        C = np.random.randn(N,num_fibers)
+        C = C/np.sqrt((C**2).sum(axis=0))
+    K = C.shape[1]
+    if VA is None: VA = np.zeros((N+1,K))
+
+    # Constants
+    I = np.eye(N)
+    _W_, _Winv_ = np.eye(N+1), np.eye(N+1)
+    _W_[:N,:N], _Winv_[:N,:N] = W, np.linalg.inv(W)
+    e = np.zeros((K,N+1))
+    e[:,N] = 1
+
+    # Termination criteria (get_term for every column of C)
+    D_bound = min(1, 1/np.linalg.norm(W,ord=2))
+    term = (np.arctanh(np.sqrt(1 - D_bound)) + np.fabs(W).sum(axis=1)).max()/np.fabs(W.dot(C)).min(axis=0)
+
+    # Drive initial points to curves
+    V = np.concatenate([drive_initial_va(W, VA[:,[k]], C[:,[k]], max_nr_iters, nr_tol) for k in range(K)], axis=1)
+    D = 1 - np.tanh(W.dot(V[:N,:]))**2
+    J = D.T[:,:,np.newaxis]*W[np.newaxis,:,:] - I
+    J = np.concatenate((J, -C.T[:,:,np.newaxis]), axis=2)
+    Z = np.linalg.svd(J)[2][:,N,:].T
+
+    # Traverse
+    fiber = [FiberBuffer(N+1) for k in range(K)]
+    step_sizes = [FiberBuffer() for k in range(K)]
+    s_mins = [FiberBuffer() for k in range(K)]
+    residuals = [FiberBuffer() for k in range(K)]
+    fxV = [[] for k in range(K)]
+    status = ["Success"]*K
+    V0 = V.copy()
+    cloop = np.zeros(K)
+    active = np.arange(K)
+    for step in it.count(0):
+        if len(active) == 0: break
+        if step == max_traverse_steps:
+            for k in active: status[k] = "Max steps reached"
+            break
+
+        # Track paths
+        for k in active: fiber[k].append(V[:,k])
+        if step == 1:
+            cloop[active] = np.sqrt(((V[:,active]-V0[:,active])**2).sum(axis=0))
+
+        # Update quantities
+        V_a, C_a = V[:,active], C[:,active]
+        D = 1 - np.tanh(W.dot(V_a[:N,:]))**2
+        Z_new = solve(bordered_jacobian_stack(W, C_a, D, Z[:,active]), e[:len(active)]).T
+        Z_new = Z_new / np.sqrt((Z_new**2).sum(axis=0))
+
+        # Get step sizes
+        step_size, rho, s_min = traverse_step_size_batch(_W_, _Winv_, D, C_a, V_a, Z_new)
+        if max_step_size is not None: step_size = np.minimum(step_size, max_step_size)
+
+        # Take steps
+        V_new, F_new = take_traverse_step_batch(W, C_a, V_a, Z_new, step_size, max_nr_iters, nr_tol)
+        residual = np.fabs(F_new).max(axis=0)
+        V[:,active], Z[:,active] = V_new, Z_new
+
+        # Record steps and check fixed points and termination for each fiber
+        keep = np.ones(len(active), dtype=bool)
+        for j, k in enumerate(active):
+            step_sizes[k].append(step_size[j])
+            s_mins[k].append(s_min[j])
+            residuals[k].append(residual[j])
+            if not np.sign(V_a[N,j]) == np.sign(V_new[N,j]):
+                # extra redundancy: seed local optimization with both endpoints and linear interpolant
+                m = -V_a[N,j]/(V_new[N,j]-V_a[N,j]) # linear interpolant for alpha == 0
+                fxV[k] += [V_a[:N,[j]], V_new[:N,[j]], V_a[:N,[j]] + m*(V_new[:N,[j]]-V_a[:N,[j]])]
+            if np.fabs(V[N,k]) > term[k]:
+                status[k] = "Success"
+                keep[j] = False
+            elif max_fxpts is not None and len(fxV[k]) >= max_fxpts:
+                status[k] = "Max fxpts found"
+                keep[j] = False
+            elif step > 5 and np.sqrt(((V[:,k]-V0[:,k])**2).sum()) < 1.5*cloop[k]:
+                status[k] = "Closed loop detected"
+                keep[j] = False
+            if not keep[j] and logfile is not None:
+                hardwrite(logfile,'fiber %d: %s at iteration %d of %s, %d fx found\n'%(k,status[k],step,max_traverse_steps,len(fxV[k])))
+        active = active[keep]
+
+        if (step % 100) == 0 and logfile is not None:
+            hardwrite(logfile,'iteration %d of %s, %d of %d fibers active\n'%(step,max_traverse_steps,len(active),K))
+
+    # clean output
+    results = []
+    for k in range(K):
+        if len(fxV[k]) == 0: fxV[k] = [np.zeros((N,1))]
+        results.append((status[k], np.concatenate(fxV[k],axis=1), fiber[k].array(), C[:,[k]],
+            step_sizes[k].array(), s_mins[k].array(), residuals[k].array()))
+    return results
+
+def directional_fiber(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_step_size=None, max_traverse_steps=None, max_refine_steps=2**5, max_fxpts=None, stop_time=None, logfile=None, max_fiber_points=None, reuse_lu=False, s_min_method="eigh", checkpoint=None, checkpoint_steps=2**10, resume=False, cancel=None, fiber_index=None):
     """
     Generator version of traverse.
     Yields refined fixed point candidates one by one, for use in a for loop.
@@ -624,12 +1773,28 @@ def directional_fiber(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_
       if None, traversal continues until another termination criteria is met
     logfile is a file object open for writing that records progress
       if None, no progress is recorded
+    max_fiber_points is the number of most recent fiber points to keep in VA (at least 3)
+      if None, every point along the fiber is kept
+    reuse_lu, if True, reuses LU factorizations across steps via a BorderedSolver (faster for large N)
+    s_min_method selects how minimum singular values are computed for step sizes, as in SminEstimator
+    checkpoint is a base file name at which progress is saved every checkpoint_steps steps (see save_checkpoint)
+      candidates already yielded before a save are not yielded again after resuming
+      if None, no progress is saved
+    resume, if True and a checkpoint was previously saved, continues traversal from the saved state
+      va and c are then ignored in favor of the saved ones
+      the s_min warm start and any reused LU factorization are restored too, so the result matches an uninterrupted traversal
+    cancel is a function with no arguments, called every step, that returns True when traversal should be cancelled
+      (e.g., the is_set method of a multiprocessing.Event)
+      if None, traversal is never cancelled
+    fiber_index is a FiberIndex of earlier traversals, used to stop traversal (status "Merged")
+      once it has merged into an indexed fiber with the same c (see FiberIndex.watch)
+      if None, traversal is never stopped for merging
 
     yields status, fxv, VA, c, step_sizes, s_mins, residuals, refinement, where
       status is one of
-        "Traversing", "Success", "Max steps reached", "Max fxpts found", "Closed loop detected", "Timed out"
+        "Traversing", "Success", "Max steps reached", "Max fxpts found", "Closed loop detected", "Timed out", "Cancelled", "Merged"
       fxv is the next fixed point candidate
-      VA[:,n] is the n^{th} point along the fiber so far
+      VA[:,n] is the n^{th} point along the fiber so far (or among the last max_fiber_points)
       c is the direction vector that was used (N by 1 numpy.array)
       step_sizes[n] is the step size used for the n^{th} step so far
       s_mins[n] is the minimum singular value of DF at the n^{th} step so far
@@ -637,15 +1802,26 @@ def directional_fiber(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_
       refinement is the output of refine_fiber_fxpt for the current candidate
     """
 
+    if max_fiber_points is not None and max_fiber_points < 3:
+        raise ValueError('max_fiber_points must be at least 3')
+
     # Set defaults
     N = W.shape[0]
+    start_clock = time.clock()
+    resuming = resume and checkpoint is not None and os.path.exists('%s.npz'%checkpoint)
+    if resuming:
+        state, VA, step_sizes, s_mins, residuals = load_checkpoint(checkpoint, max_fiber_points)
+        va, z, c = state['va'], state['z'], state['c']
     if va is None: va = np.zeros((N+1,1))
     if c is None:
         c = np.random.randn(N,1)
         c = c/np.sqrt((c**2).sum())
+    if max_fiber_points is not None: checkpoint_steps = min(checkpoint_steps, max_fiber_points)
 
     # Constants
     I = np.eye(N)
+    solver = BorderedSolver() if reuse_lu else None
+    s_min_fun = SminEstimator(s_min_method, solver)
     # Winv = np.linalg.inv(W)
     Winv = np.eye(N)
     _W_, _Winv_ = np.eye(N+1), np.eye(N+1)
@@ -657,39 +1833,61 @@ def directional_fiber(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_
 
     # Termination criterion
     term = get_term(W, c)
-
-    # Drive initial va to curve
-    va = drive_initial_va(W, va, c, max_nr_iters, nr_tol)
-    D = 1 - np.tanh(W.dot(va[:N,:]))**2
-    J = np.concatenate((D*W - I, -c), axis=1)
-    _,_,z = np.linalg.svd(J)
-    z = z[[N],:].T
-
-    # Traverse
-    VA = []
-    step_sizes = []
-    s_mins = []
-    residuals = []
-    num_fxpts = 0
-    cloop_distance = np.nan
-    status = "Traversing"
-    for step in it.count(0):
+    merged = fiber_index.watch(c) if fiber_index is not None else None
+
+    if resuming:
+        restore_solver_state(state, s_min_fun, solver)
+        va_4, cloop = state['va_4'], state['cloop']
+        num_fxpts, cloop_distance = int(state['num_fxpts']), float(state['cloop_distance'])
+        start_step, prior_runtime, num_saved = int(state['step']), float(state['runtime']), int(state['num_saved'])
+        status = str(state['status'])
+        if logfile is not None:
+            hardwrite(logfile,'Resuming from checkpoint at iteration %d, %d fx found\n'%(start_step,num_fxpts))
+    else:
+        # Drive initial va to curve
+        va = drive_initial_va(W, va, c, max_nr_iters, nr_tol)
+        D = 1 - np.tanh(W.dot(va[:N,:]))**2
+        J = np.concatenate((D*W - I, -c), axis=1)
+        _,_,z = np.linalg.svd(J)
+        z = z[[N],:].T
+        VA = FiberBuffer(N+1, max_points=max_fiber_points)
+        step_sizes = FiberBuffer()
+        s_mins = FiberBuffer()
+        residuals = FiberBuffer()
+        va_4, cloop = np.full((N+1,1), np.nan), np.nan
+        num_fxpts = 0
+        cloop_distance = np.nan
+        start_step, prior_runtime, num_saved = 0, 0., 0
+        status = "Traversing"
+
+    def save(step, status):
+        state = {'va': va, 'z': z, 'c': c, 'step': step, 'va_4': va_4, 'cloop': cloop,
+            'num_fxpts': num_fxpts, 'cloop_distance': cloop_distance, 'status': status,
+            'runtime': prior_runtime + time.clock() - start_clock}
+        save_solver_state(state, s_min_fun, solver)
+        return save_checkpoint(checkpoint, state, VA, step_sizes, s_mins, residuals, num_saved)
+
+    # Traverse (a finished traversal restored from checkpoint skips straight to final output)
+    finished = status != "Traversing"
+    for step in (it.count(start_step) if not finished else []):
 
         # Save fiber
         VA.append(va)
+        if VA.count == 5: va_4 = va # reference points for closed loop check
+        if VA.count == 7: cloop = np.fabs(va-va_4).max()
 
         # Update quantities
         D = 1 - np.tanh(W.dot(va[:N,:]))**2
         J = np.concatenate((D*W - I, -c), axis=1)
 
-        z_new = calc_z_new(J, z)
+        z_new = calc_z_new(J, z, solver)
 
         # Get step size
         # step_size, rho, s_min = traverse_step_size(_W_, _Winv_, D, J, va, c, z_new)
         # step_size, rho, s_min = 0, 0, 0
         # step_size1 = traverse_step_size2(W2norm1, J, z_new)
         # step_size2 = traverse_step_size2(W2norm2, J, z_new) / np.linalg.norm(_W_.dot(z))
-        step_size3, s_min = traverse_step_size3(mu, J, z_new)
+        step_size3, s_min = traverse_step_size3(mu, J, z_new, s_min_fun=s_min_fun)
         # if (step % 100) == 0: print(step_size, step_size1, step_size2, step_size3)
         # if (step % 100) == 0: print(step_size, step_size3)
         step_size = step_size3
@@ -698,15 +1896,15 @@ def directional_fiber(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_
         s_mins.append(s_min)
 
         # Take step
-        va_new, F_new = take_traverse_step(W, I, c, va, z_new, step_size, max_nr_iters, nr_tol)
+        va_new, F_new = take_traverse_step(W, I, c, va, z_new, step_size, max_nr_iters, nr_tol, solver=solver)
         residuals.append(np.fabs(F_new).max())
         va = va_new
         z = z_new
 
         # Check local |alpha| minimum OR alpha sign change (neither implies the other in discretization)
-        origin = (len(VA) == 2)
-        sign_change = (len(VA) > 1 and not np.sign(VA[-1][N]) == np.sign(VA[-2][N]))
-        local_min = (len(VA) > 2 and np.fabs(VA[-2][N]) <= np.fabs(VA[-1][N]) and np.fabs(VA[-2][N]) <= np.fabs(VA[-3][N]))
+        origin = (VA.count == 2)
+        sign_change = (VA.count > 1 and not np.sign(VA[-1][N]) == np.sign(VA[-2][N]))
+        local_min = (VA.count > 2 and np.fabs(VA[-2][N]) <= np.fabs(VA[-1][N]) and np.fabs(VA[-2][N]) <= np.fabs(VA[-3][N]))
         if origin or sign_change or local_min:
             B = -3 if local_min else -2
             for b in range(B,0):
@@ -715,7 +1913,7 @@ def directional_fiber(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_
                     max_refine_steps=max_refine_steps, stop_time=stop_time, logfile=logfile)
                 _, fxv, _, _, _, _ = refinement
                 num_fxpts += 1
-                yield status, fxv, VA[:len(VA)+b+1], c, step_sizes, s_mins, residuals, refinement
+                yield status, fxv, VA.array(len(VA)+b+1), c, step_sizes.array(), s_mins.array(), residuals.array(), refinement
 
         # Check for asymptote
         if np.fabs(va[N]) > term:
@@ -725,9 +1923,9 @@ def directional_fiber(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_
             break
             
         # Check for closed loop
-        if len(VA) > 7:
-            cloop_distance = np.fabs(VA[-1]-VA[4]).max()
-            if cloop_distance < np.fabs(VA[6]-VA[4]).max():
+        if VA.count > 7:
+            cloop_distance = np.fabs(VA[-1]-va_4).max()
+            if cloop_distance < cloop:
                 if logfile is not None:
                     hardwrite(logfile,'Cloop: iteration %d of %s, %d fx found, cloop: %e\n'%(step,max_traverse_steps,2*num_fxpts+1, cloop_distance))
                 status = "Closed loop detected"
@@ -743,12 +1941,24 @@ def directional_fiber(W, va=None, c=None, max_nr_iters=2**8, nr_tol=2**-32, max_
         if stop_time is not None and time.clock() > stop_time:
             status = "Timed out"
             break
+        if cancel is not None and cancel():
+            status = "Cancelled"
+            break
+        if merged is not None and merged(va):
+            status = "Merged"
+            break
 
         if (step % 100) == 0 and logfile is not None:
-            hardwrite(logfile,'iteration %d of %s,step_size=%f,s_min=%e,%d fx,term:%e>? %e,cloop:%e\n'%(step,max_traverse_steps,step_size,s_min,num_fxpts,va[N],term, cloop_distance))
+            log_progress(logfile, 'directional_fiber', step=step, max_steps=max_traverse_steps, step_size=step_size, s_min=s_min, num_fxpts=num_fxpts, alpha=va[N], term=term, cloop=cloop_distance)
+
+        if checkpoint is not None and (step+1) % checkpoint_steps == 0:
+            num_saved = save(step+1, status)
+
+    if checkpoint is not None and not finished:
+        num_saved = save(step, status)
 
     # final output
-    yield status, np.empty((N,0)), VA, c, step_sizes, s_mins, residuals, ()
+    yield status, np.empty((N,0)), VA.array(), c, step_sizes.array(), s_mins.array(), residuals.array(), ()
 
 def refine_fiber_fxpt(W, _W_, _Winv_, c, va, z, max_nr_iters=2**8, nr_tol=2**-32, max_step_size=None, max_refine_steps=None, stop_time=None, logfile=None):
     """
@@ -829,7 +2039,7 @@ def refine_fiber_fxpt(W, _W_, _Winv_, c, va, z, max_nr_iters=2**8, nr_tol=2**-32
             break
 
         if (step % 10) == 0 and logfile is not None:
-            hardwrite(logfile,'refine iteration %d of %s,step_size=%f,s_min=%e,resid/margin:%e\n'%(step,max_refine_steps,step_size,s_min,(F_new/margin).max()))
+            log_progress(logfile, 'refine', step=step, max_steps=max_refine_steps, step_size=step_size, s_min=s_min, residual_margin=(F_new/margin).max())
 
     # final output
     fxv = va[:N,:].copy()
@@ -916,7 +2126,7 @@ def refine_fiber_fxpt2(W, _W_, c, va, z, max_nr_iters=2**8, nr_tol=2**-32, max_s
             break
 
         if (step % 10) == 0 and logfile is not None:
-            hardwrite(logfile,'refine iteration %d of %s,step_size=%f,s_min=%e,resid/margin:%e\n'%(step,max_refine_steps,step_size,s_min,(F_new/margin).max()))
+            log_progress(logfile, 'refine', step=step, max_steps=max_refine_steps, step_size=step_size, s_min=s_min, residual_margin=(F_new/margin).max())
 
     # final output
     fxv = va[:N,:].copy()
@@ -924,6 +2134,7 @@ def refine_fiber_fxpt2(W, _W_, c, va, z, max_nr_iters=2**8, nr_tol=2**-32, max_s
 
 def process_fxpt(W, V, v, tolerance = 2**-21):
     """
+    Consider FixedPointSet instead, which avoids copying V for every candidate.
     Process a new candidate fixed point v against existing set V
     V[:,p] is the p^th fixed point found so far
     tolerance is the maximum infinity norm at which two points are considered duplicates
@@ -947,6 +2158,101 @@ def process_fxpt(W, V, v, tolerance = 2**-21):
             V = np.concatenate((V[:, ~duplicates], fxv, -fxv), axis=1)
     return V, fx, dup, fxv
 
+class FixedPointSet:
+    """
+    Incrementally growing set of unique fixed points, for long solver trials.
+    Points are stored in a preallocated FiberBuffer (amortized O(1) insertion),
+      duplicates of v or -v are found with a tolerance_index instead of scanning every point,
+      and the growth of the set is logged as counts and timestamps rather than full snapshots.
+    W should be the weight matrix (N by N numpy.array)
+    V should be initial fixed points (N by P numpy.array), e.g. the origin, which are inserted as is
+      if None, the set starts empty
+    tolerance is the maximum infinity norm at which two points are considered duplicates
+    capacity is the number of points initially preallocated
+    """
+    def __init__(self, W, V=None, tolerance=2**-21, capacity=2**10):
+        N = W.shape[0]
+        self.W = W
+        self.tolerance = tolerance
+        self.points = FiberBuffer(N, capacity=capacity)
+        self.index = tolerance_index(N, tolerance)
+        self.counts = FiberBuffer()
+        self.timestamps = FiberBuffer()
+        if V is not None: self.insert(V)
+        self.log()
+
+    def __len__(self):
+        return len(self.points)
+
+    def array(self):
+        """
+        Returns V, where V[:,p] is the p^{th} fixed point in the set (a view, not a copy)
+        """
+        return self.points.array()
+
+    def insert(self, V):
+        """
+        Insert points V (N by P numpy.array) as is, without refinement or duplicate checks
+        """
+        self.points.extend(V)
+        self.index.add(V)
+
+    def find(self, v):
+        """
+        Returns the sorted indices of all points in the set within tolerance of v or -v
+        """
+        V = self.array()
+        found = []
+        for s in [v, -v]:
+            cand = self.index.candidates(s)
+            found.append(cand[np.fabs(V[:,cand]-s).max(axis=0) < self.tolerance])
+        return np.union1d(found[0], found[1])
+
+    def check(self, v):
+        """
+        Refine a candidate fixed point v (N by 1 numpy.array) and check it against the set, without inserting it
+        returns fx, dup, fxv as in add
+        """
+        fxv, fx = refine_fxpts(self.W, v.copy())
+        fx = fx.shape[0] > 0 and fx.all() # no candidate when v is empty (e.g., on time out)
+        dup = fx and len(self.find(fxv)) > 0
+        return fx, dup, fxv
+
+    def add(self, v):
+        """
+        Process a new candidate fixed point v (N by 1 numpy.array), as in process_fxpt.
+        Refines v, and if it is fixed and new, inserts v and -v (only v if v is the origin).
+        Existing duplicates are kept in place of the new point.
+        Logs the size of the set after processing.
+        returns fx, dup, fxv, where
+          fx is True iff v is fixed
+          dup is True iff there were duplicates
+          fxv is the refined v
+        """
+        fx, dup, fxv = self.check(v)
+        if fx and not dup:
+            if np.fabs(fxv).max() < self.tolerance: # zero fxpt
+                self.insert(fxv)
+            else:
+                self.insert(np.concatenate((fxv, -fxv), axis=1))
+        self.log()
+        return fx, dup, fxv
+
+    def log(self):
+        """
+        Record the current number of points and clock time in the history
+        """
+        self.counts.append(len(self))
+        self.timestamps.append(time.clock())
+
+    def history(self):
+        """
+        returns counts, timestamps, where
+          counts[i] is the number of points in the set at the i^{th} log entry
+          timestamps[i] is the clock time of the i^{th} log entry
+        """
+        return self.counts.array().astype(int), self.timestamps.array()
+
 def get_test_points():
     """
     Construct a set of 300 test points with at most 3 "unique" members.
@@ -969,6 +2275,17 @@ def test_get_connected_components():
     assert len(np.unique(components)) <= 3
     print('test get connected components passed!')
 
+def test_get_graph_components():
+    """
+    Sanity check that get_graph_components and get_connected_components give the same component labels
+    """
+    V = np.random.randint(8, size=(1,200)).astype(float)
+    neighbors = lambda X, y: (X == y).all(axis=0)
+    pairs = np.array([(p, q) for p in range(V.shape[1]) for q in range(p) if V[0,p] == V[0,q]], dtype=int).T
+    assert (get_graph_components(V.shape[1], pairs) == get_connected_components(V, neighbors)).all()
+    assert (get_graph_components(3, np.empty((2,0), dtype=int)) == np.arange(3)).all()
+    print('test get graph components passed!')
+
 def test_get_unique_points():
     """
     Sanity check for get_unique_points
@@ -981,6 +2298,214 @@ def test_get_unique_points():
         assert l0_diffs.min() < (5*eps(V[:,p])).max()
     print('test get unique points passed!')
 
+def test_traverse_batch():
+    """
+    Sanity check for traverse_batch against serial traverse
+    """
+    for N in [4, 8, 16]:
+        W = 1.5*np.random.randn(N,N)/np.sqrt(N)
+        C = np.random.randn(N,3)
+        C = C/np.sqrt((C**2).sum(axis=0))
+        results = traverse_batch(W, C=C, max_traverse_steps=2**8)
+        for k in range(C.shape[1]):
+            status, fxV, VA, _, step_sizes, _, _ = traverse(W, c=C[:,[k]], max_traverse_steps=2**8)
+            assert results[k][0] == status
+            assert results[k][2].shape == VA.shape
+            assert np.fabs(results[k][2] - VA).max() < 2**-20
+            assert np.fabs(results[k][4] - step_sizes).max() < 2**-20
+    print('test traverse batch passed!')
+
+def test_reuse_lu():
+    """
+    Sanity check that traversal with reused LU factorizations (and iterative refinement)
+      finds the same fixed points as traversal with the default solver
+    """
+    for seed in range(3):
+        for N in [4, 8, 16]:
+            rng = np.random.RandomState(seed)
+            W = 1.5*rng.randn(N,N)/np.sqrt(N)
+            c = rng.randn(N,1)
+            status, fxV, VA, _, _, _, _ = traverse(W, c=c, max_traverse_steps=2**12)
+            status_lu, fxV_lu, VA_lu, _, _, _, _ = traverse(W, c=c, max_traverse_steps=2**12, reuse_lu=True)
+            assert status == status_lu
+            assert fxV.shape == fxV_lu.shape
+            assert VA.shape == VA_lu.shape
+            assert np.fabs(fxV - fxV_lu).max() < 2**-20
+    print('test reuse lu passed!')
+
+def test_refine_fxpts_batched():
+    """
+    Sanity check for refine_fxpts_batched against refine_fxpts
+    """
+    for N in [4, 8, 16]:
+        W = 1.5*np.random.randn(N,N)/np.sqrt(N)
+        V = 2*np.random.rand(N,64) - 1
+        V_serial, converged_serial = refine_fxpts(W, V.copy())
+        # small cap forces several chunks
+        V_batched, converged_batched = refine_fxpts_batched(W, V.copy(), cap=16)
+        # convergence flags may only differ for the same point (e.g., at the origin, where fixed_within_eps is sensitive to round-off)
+        same = np.fabs(V_serial - V_batched).max(axis=0) < 2**-20
+        assert ((converged_serial == converged_batched) | same).all()
+        assert same[converged_serial].all()
+    print('test refine fxpts batched passed!')
+
+def test_s_min_lower_bound():
+    """
+    Sanity check that certified s_min lower bounds never exceed the minimum singular value from s_min_calc,
+      on random and nearly singular Jacobians, from both inverse iteration estimates and overestimates
+    """
+    for N in [4, 16, 64]:
+        for trial in range(10):
+            U, _ = np.linalg.qr(np.random.randn(N,N))
+            V, _ = np.linalg.qr(np.random.randn(N,N))
+            s = np.random.rand(N) + 0.1
+            if trial % 2 == 1: s[0] *= 2.**-np.random.randint(1,20) # s_min_calc loses s_min below about sqrt(eps)
+            _J_ = (U*s).dot(V.T)
+            s_min = s_min_calc(_J_)
+            s_est, _ = s_min_estimate(_J_)
+            for s_guess in [s_est, 4*s_est]:
+                theta = s_min_lower_bound(_J_, s_guess)
+                assert 0 < theta <= s_min
+    print('test s min lower bound passed!')
+
+def test_local_search_timeout():
+    """
+    Sanity check that batched local search stops promptly at stop_time,
+      instead of finishing a batch (which takes many times longer here)
+    """
+    N = 64
+    W = 1.5*np.random.randn(N,N)/np.sqrt(N)
+    for delay in [0, 0.05]:
+        stop_time = time.clock() + delay
+        for status, fxv, V in local_search(W, stop_time=stop_time, batch_size=2**9): pass
+        assert status == 'Timed out'
+        assert fxv.shape == (N,0)
+        assert time.clock() - stop_time < 0.5
+        if delay == 0: assert len(V) == 0
+    print('test local search timeout passed!')
+
+def test_baseline_objective():
+    """
+    Sanity check that BaselineObjective matches baseline_solver_qg and baseline_solver_G,
+      and that minimization with its Hessian-vector products reaches the same fixed points as with the dense Hessian
+    """
+    for N in [4, 8, 16, 32]:
+        W = 1.5*np.random.randn(N,N)/np.sqrt(N)
+        objective = BaselineObjective(W)
+        for trial in range(4):
+            v, p = 2*np.random.rand(N) - 1, np.random.randn(N)
+            q, g = baseline_solver_qg(v, W)
+            q_obj, g_obj = objective.qg(v)
+            assert np.fabs(q - q_obj) < 2**-40 and np.fabs(g - g_obj).max() < 2**-40
+            assert np.fabs(objective.hessp(v, p) - baseline_solver_G(v, W).dot(p)).max() < 2**-40
+            # minimization from seeds that reach a fixed point should reach the same one (after refinement)
+            v = v.reshape((N,1))
+            fxv, fixed = refine_fxpts(W, baseline_minimize(W, v))
+            fxv_hessp, fixed_hessp = refine_fxpts(W, baseline_minimize(W, v, hessp=True))
+            if not fixed[0]: continue
+            assert fixed_hessp[0]
+            assert np.fabs(fxv - fxv_hessp).max() < 2**-20
+    print('test baseline objective passed!')
+
+def test_local_search_seeds():
+    """
+    Sanity check that LocalSearchSeeds yields unique fixed points until stop_time,
+      and that closing it leaves no live worker processes
+    """
+    N = 8
+    W = 3*np.random.randn(N,N)/np.sqrt(N)
+    W = (W + W.T)/2 # symmetric, so that there are several fixed points to find
+    for batch_size in [None, 2**4]:
+        seed_producer = LocalSearchSeeds(W, num_workers=2, max_queued=2, batch_size=batch_size)
+        wall_start = time.time()
+        for status, fxv, V in seed_producer.seeds(stop_time=time.clock() + 1): pass
+        assert status == 'Timed out'
+        assert time.time() - wall_start < 2
+        seed_producer.close()
+        assert len(mp.active_children()) == 0
+        assert len(V) > 0
+        for p in range(len(V)):
+            assert fixed_within_eps(W, V[p])[0].all()
+            for q in range(p):
+                assert not identical_fixed_points(W, np.concatenate((V[q], -V[q]), axis=1), V[p])[0].any()
+    print('test local search seeds passed!')
+
+def test_checkpoint_resume():
+    """
+    Sanity check that traverse and directional_fiber resumed from a checkpoint after an interruption
+      give the same results as uninterrupted traversals
+    """
+    class Interrupt(Exception): pass
+    class InterruptingTrace:
+        def __init__(self, steps): self.steps = steps
+        def record(self, step, *args):
+            if step == self.steps: raise Interrupt()
+        def flush(self): pass
+        def truncate(self, num_steps): pass
+    def interrupt_after(steps):
+        calls = [0]
+        def cancel():
+            calls[0] += 1
+            if calls[0] == steps: raise Interrupt()
+            return False
+        return cancel
+    N = 8
+    W = 1.5*np.random.randn(N,N)/np.sqrt(N)
+    c = np.random.randn(N,1)
+    checkpoint_dir = tempfile.mkdtemp()
+    checkpoint = os.path.join(checkpoint_dir, 'checkpoint')
+    try:
+        for s_min_method, reuse_lu, max_fiber_points in [("eigh", False, None), ("inverse", True, None), ("certified", True, 2**6)]:
+            kwargs = dict(c=c, max_traverse_steps=2**9, s_min_method=s_min_method, reuse_lu=reuse_lu, max_fiber_points=max_fiber_points)
+            np.random.seed(0)
+            full = traverse(W, **kwargs)
+            np.random.seed(0)
+            try:
+                traverse(W, checkpoint=checkpoint, checkpoint_steps=2**5, trace=InterruptingTrace(100), **kwargs)
+            except Interrupt: pass
+            resumed = traverse(W, checkpoint=checkpoint, checkpoint_steps=2**5, resume=True, **kwargs)
+            assert full[0] == resumed[0]
+            for a, b in zip(full[1:], resumed[1:]): assert np.array_equal(a, b)
+
+            kwargs = dict(c=c, max_traverse_steps=2**9, s_min_method=s_min_method, reuse_lu=reuse_lu, max_fiber_points=max_fiber_points)
+            np.random.seed(0)
+            full = list(directional_fiber(W, **kwargs))[-1]
+            np.random.seed(0)
+            try:
+                for _ in directional_fiber(W, checkpoint=checkpoint, checkpoint_steps=2**5, cancel=interrupt_after(100), **kwargs): pass
+            except Interrupt: pass
+            resumed = list(directional_fiber(W, checkpoint=checkpoint, checkpoint_steps=2**5, resume=True, **kwargs))[-1]
+            assert full[0] == resumed[0]
+            for a, b in zip(full[2:7], resumed[2:7]): assert np.array_equal(a, b)
+    finally:
+        shutil.rmtree(checkpoint_dir)
+    print('test checkpoint resume passed!')
+
+def test_fiber_index():
+    """
+    Sanity check that a traversal seeded on an indexed fiber stops as merged,
+      and that a traversal of an unrelated fiber does not
+    """
+    N = 8
+    W = 1.5*np.random.randn(N,N)/np.sqrt(N)
+    c = np.random.randn(N,1)
+    c = c/np.sqrt((c**2).sum())
+    status, _, VA, _, step_sizes, _, _ = traverse(W, c=c, max_traverse_steps=2**12)
+    fiber_index = FiberIndex(N)
+    fiber_index.add(c, VA, step_sizes)
+    # seed on a point halfway along the indexed fiber
+    status, _, VA_merged, _, _, _, _ = traverse(W, va=VA[:,[VA.shape[1]//2]], c=c, max_traverse_steps=2**12, fiber_index=fiber_index)
+    assert status == "Merged"
+    assert VA_merged.shape[1] <= fiber_index.check_steps + 1
+    # an unrelated fiber with a different direction vector
+    c_other = np.random.randn(N,1)
+    c_other = c_other/np.sqrt((c_other**2).sum())
+    status, _, VA_other, _, _, _, _ = traverse(W, c=c_other, max_traverse_steps=2**12)
+    status_indexed, _, VA_indexed, _, _, _, _ = traverse(W, c=c_other, max_traverse_steps=2**12, fiber_index=fiber_index)
+    assert status_indexed == status != "Merged"
+    assert np.array_equal(VA_indexed, VA_other)
+    print('test fiber index passed!')
+
 def test_fixed_within_eps():
     """
     Sanity check for fixed_within_eps
@@ -1064,7 +2589,17 @@ def run_tests():
     """
     #estimate_tanh_eps_error()
     test_get_connected_components()
+    test_get_graph_components()
     test_get_unique_points()
+    test_traverse_batch()
+    test_reuse_lu()
+    test_refine_fxpts_batched()
+    test_s_min_lower_bound()
+    test_local_search_timeout()
+    test_baseline_objective()
+    test_local_search_seeds()
+    test_checkpoint_resume()
+    test_fiber_index()
     test_fixed_within_eps()
     # test_identical_fixed_points()
 
@@ -1113,17 +2648,125 @@ def refine_fxpts_capped(W, V, max_iters=2**5, cap=10000):
     converged = np.concatenate([r[1] for r in refines])
     return V, converged
 
-def refine_pts(W, V):
+def available_memory():
+    """
+    Returns the number of bytes of physical memory currently available, or None if unknown.
+    """
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES')*os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def refine_fxpts_batched(W, V, max_iters=2**5, cap=None, memory_budget=None, float32_iters=0):
+    """
+    This is a helper function, consider refine_pts instead.
+    Memory-bounded variant of refine_fxpts for large numbers of points.
+    Points are processed in chunks sized so that the chunk's Jacobians fit in memory_budget.
+    Each chunk reuses preallocated Jacobian and point buffers, and converged points are removed
+      by compacting the remaining ones to the front (through a preallocated scratch buffer),
+      so work shrinks as points converge without allocating per iteration beyond solve's LU copies.
+    W, V, and max_iters should be as in refine_fxpts
+    cap is the maximum number of points to process at a time
+      if None, only memory_budget limits the chunk size
+    memory_budget is the number of bytes available for each chunk
+      if None, a quarter of the available physical memory is used (or 1GB if unknown)
+    float32_iters is the number of (the max_iters) iterations done in single precision first
+      single precision iterations are cheaper, and subsequent double precision iterations restore accuracy
+    returns V, converged as in refine_fxpts.
+    """
+    N, P = V.shape
+    if memory_budget is None:
+        memory_budget = available_memory()
+        memory_budget = 2**30 if memory_budget is None else memory_budget/4
+    # Jacobians, their LU copies in solve, and a few vectors per point
+    chunk = int(max(1, memory_budget // (8*(2*N**2 + 10*N))))
+    if cap is not None: chunk = min(chunk, cap)
+    chunk = min(chunk, max(P, 1))
+    I = np.eye(N)
+    J = np.empty((chunk, N, N))
+    X_buf, X_scratch = np.empty((chunk, N)), np.empty((chunk, N))
+    idx_buf, idx_scratch = np.empty(chunk, dtype=int), np.empty(chunk, dtype=int)
+    if float32_iters > 0:
+        J32 = np.empty((chunk, N, N), dtype=np.float32)
+        W32 = W.astype(np.float32)
+    converged = np.zeros(P, dtype=bool)
+    for start in range(0, P, chunk):
+        A = min(chunk, P - start) # number of active points
+        X = X_buf[:A] # X[a,:] is the a^{th} active point
+        X[:] = V[:,start:start+A].T
+        idx = idx_buf[:A] # idx[a] is its column in V
+        idx[:] = np.arange(start, start+A)
+        if float32_iters > 0:
+            X32 = X.astype(np.float32)
+            for i in range(min(float32_iters, max_iters)):
+                T = np.tanh(X32.dot(W32.T))
+                np.multiply((1-T**2)[:,:,np.newaxis], W32[np.newaxis,:,:], out=J32[:A])
+                J32[:A] -= I
+                X32 -= solve(J32[:A], T - X32)
+            X[:] = X32
+        for i in range(max(0, max_iters - float32_iters)):
+            T = np.tanh(X[:A].dot(W.T))
+            np.multiply((1-T**2)[:,:,np.newaxis], W[np.newaxis,:,:], out=J[:A])
+            J[:A] -= I
+            X[:A] -= solve(J[:A], T - X[:A])
+            fixed, _ = fixed_within_eps(W, X[:A].T)
+            # save converged points and compact the rest to the front
+            V[:,idx[:A][fixed]] = X[:A][fixed].T
+            converged[idx[:A][fixed]] = True
+            keep = ~fixed
+            A_new = keep.sum()
+            np.compress(keep, X[:A], axis=0, out=X_scratch[:A_new])
+            np.compress(keep, idx[:A], out=idx_scratch[:A_new])
+            X[:A_new], idx[:A_new] = X_scratch[:A_new], idx_scratch[:A_new]
+            A = A_new
+            if A == 0: break
+        V[:,idx[:A]] = X[:A].T
+    return V, converged
+
+def refine_fxpts_parallel(W, V, num_workers, max_iters=2**5, cap=None, memory_budget=None, float32_iters=0):
+    """
+    This is a helper function, consider refine_pts instead.
+    Multithreaded variant of refine_fxpts_batched.
+    The points are partitioned into blocks of columns, which a pool of worker threads refine in place.
+    numpy releases the GIL in tanh and the batched solves, so the workers run concurrently,
+      and W is shared read-only between them without copying or pickling.
+    Multithreaded BLAS should usually be limited (e.g., OMP_NUM_THREADS=1) to avoid oversubscription.
+    num_workers is the number of worker threads
+    W, V, max_iters, cap, and float32_iters should be as in refine_fxpts_batched
+    memory_budget is as in refine_fxpts_batched, but shared among all workers
+    returns V, converged as in refine_fxpts.
+    """
+    if memory_budget is None:
+        memory_budget = available_memory()
+        memory_budget = 2**30 if memory_budget is None else memory_budget/4
+    # several blocks per worker balance the load when some blocks converge faster
+    num_blocks = min(4*num_workers, max(V.shape[1], 1))
+    bounds = np.linspace(0, V.shape[1], num_blocks+1).astype(int)
+    def refine_block(b):
+        _, converged = refine_fxpts_batched(W, V[:,bounds[b]:bounds[b+1]], max_iters=max_iters, cap=cap,
+            memory_budget=memory_budget/num_workers, float32_iters=float32_iters)
+        return converged
+    pool = mpp.ThreadPool(processes=num_workers)
+    converged = pool.map(refine_block, range(num_blocks), chunksize=1)
+    pool.close()
+    pool.join()
+    return V, np.concatenate(converged)
+
+def refine_pts(W, V, num_workers=None):
     """
     Refines approximate fixed point locations with the Newton-Raphson method.
     W should be the weight matrix (N by N numpy.array)
     V should be the approximate fixed points, where
       V[:,p] is the p^{th} point
+    num_workers is the number of threads to refine with, as in refine_fxpts_parallel
+      if None, refinement is single-threaded
     returns V, converged, where
       V[:,p] is the p^{th} point after refinement
       converged[p] == True iff the p^{th} point is fixed_within_eps after refinement.
     """
-    return refine_fxpts_capped(W, V)
+    if num_workers is not None and num_workers > 1:
+        return refine_fxpts_parallel(W, V, num_workers)
+    return refine_fxpts_batched(W, V)
 
 def baseline_solver_qg(v, W):
     """
@@ -1150,7 +2793,157 @@ def baseline_solver_G(v, W):
     tWv = np.tanh(W.dot(v))
     J = (1-tWv**2)*W - np.eye(W.shape[0])
     return J.T.dot(J)
-def baseline_solver(W, timeout=60, max_fxpts=None, max_traj_steps=10, logfile=None):
+class BaselineObjective:
+    """
+    The baseline solver objective (Sussillo and Barak 2013), for use with scipy's trust-ncg.
+    Caches the evaluation at the most recent point, so that the objective, gradient, and Hessian products
+      requested at the same point share the tanh(Wv) computation.
+    Hessian-vector products are matrix-free (J.T.dot(J.dot(p)) with the cached tanh derivative),
+      costing O(N^2) per product instead of the O(N^3) needed to form G.
+    """
+    def __init__(self, W):
+        """
+        W should be the weight matrix (N by N numpy.array)
+        """
+        self.W = W
+        self.v = None
+    def evaluate(self, v):
+        """
+        Evaluates the residual at v, unless v is the point of the cached evaluation.
+        v should be the current optimization point as a flat length N numpy.array
+        returns f, d, where
+          f is the residual tanh(Wv) - v (a flat length N numpy.array)
+          d is the tanh derivative 1 - tanh(Wv)**2 (a flat length N numpy.array)
+        """
+        if self.v is None or not np.array_equal(v, self.v):
+            tWv = np.tanh(self.W.dot(v))
+            self.v = v.copy()
+            self.f = tWv - v
+            self.d = 1 - tWv**2
+        return self.f, self.d
+    def qg(self, v):
+        """
+        Computes the objective q and gradient g, as in baseline_solver_qg.
+        v should be the current optimization point as a flat length N numpy.array
+        returns q, g
+        """
+        f, d = self.evaluate(v)
+        return (f**2).sum(), self.W.T.dot(d*f) - f
+    def hessp(self, v, p):
+        """
+        Computes the approximate Hessian-vector product G.dot(p), with G as in baseline_solver_G.
+        v should be the current optimization point as a flat length N numpy.array
+        p should be the vector to multiply (a flat length N numpy.array)
+        returns Gp, the product (a flat length N numpy.array)
+        """
+        f, d = self.evaluate(v)
+        Jp = d*self.W.dot(p) - p
+        return self.W.T.dot(d*Jp) - Jp
+def baseline_minimize(W, v, hessp=False):
+    """
+    Runs the baseline solver minimization from a single seed with scipy's trust-ncg.
+    W should be the weight matrix (N by N numpy.array)
+    v should be the seed (N by 1 numpy.array)
+    hessp should be True to use matrix-free Hessian-vector products (see BaselineObjective)
+      if False, the dense approximate Hessian is formed at every iteration
+    returns fxv, the point reached (N by 1 numpy.array)
+    """
+    if hessp:
+        objective = BaselineObjective(W)
+        res = spo.minimize(objective.qg, v.flatten(), method='trust-ncg', jac=True, hessp=objective.hessp)
+    else:
+        res = spo.minimize(baseline_solver_qg, v.flatten(), args=(W,), method='trust-ncg', jac=True, hess=baseline_solver_G)
+    return res.x.reshape((W.shape[0],1))
+def baseline_seeds(W, num_seeds, max_traj_steps=10):
+    """
+    Samples seeds for the baseline solver as in baseline_solver, but many at once:
+    each seed is sampled uniformly at random in [-1,1]^N and iterated a random number of steps along its trajectory.
+    W should be the weight matrix (N by N numpy.array)
+    num_seeds is the number of seeds to sample
+    max_traj_steps is the maximum number of steps along a trajectory
+    returns V, where V[:,k] is the k^{th} seed (N by num_seeds numpy.array)
+    """
+    V = 2*np.random.rand(W.shape[0], num_seeds) - 1
+    num_traj_steps = np.random.randint(max_traj_steps, size=num_seeds)
+    for step in range(num_traj_steps.max() if num_seeds > 0 else 0):
+        iterating = step < num_traj_steps
+        V[:,iterating] = np.tanh(W.dot(V[:,iterating]))
+    return V
+
+def baseline_solver_batch(W, V, max_iters=2**7, gtol=1e-5, damping=1e-3, max_damping=1e16, memory_budget=None, stop_time=None):
+    """
+    Minimizes the baseline solver objective (as in baseline_solver_qg) from many seeds at once.
+    Uses a vectorized Levenberg-Marquardt iteration on the stacked Jacobians of all seeds still being optimized.
+    Each seed has its own damping, which shrinks after a step that reduces the objective and grows otherwise,
+      so steps range between Gauss-Newton (near a solution) and short gradient steps (far from one).
+    Seeds are processed in chunks sized so that the chunk's Jacobians fit in memory_budget.
+    W should be the weight matrix (N by N numpy.array)
+    V[:,k] should be the k^{th} seed (N by K numpy.array)
+    max_iters is the maximum number of iterations
+    gtol is the gradient norm at which a seed has converged (as in scipy's trust-ncg)
+    damping is the initial damping of every seed
+    max_damping is the damping at which a seed that cannot make progress is abandoned
+    memory_budget is the number of bytes available for each chunk
+      if None, a quarter of the available physical memory is used (or 1GB if unknown)
+    stop_time is the time.clock() value after which optimization stops
+      it is checked before every iteration, so it is overrun by at most one iteration of one chunk
+      if None, optimization stops only after max_iters
+    returns V, converged, optimized, where
+      V[:,k] is the point reached from the k^{th} seed
+      converged[k] is True if the k^{th} seed reached gtol
+      optimized[k] is False if the k^{th} seed's chunk was not started before stop_time (V[:,k] is then the seed)
+    """
+    N, K = V.shape
+    if memory_budget is None:
+        memory_budget = available_memory()
+        memory_budget = 2**30 if memory_budget is None else memory_budget/4
+    # Jacobians, their normal matrices, the LU copies in solve, and a few vectors per seed
+    chunk = int(max(1, memory_budget // (8*(3*N**2 + 10*N))))
+    I = np.eye(N)
+    V = V.copy()
+    converged = np.zeros(K, dtype=bool)
+    optimized = np.zeros(K, dtype=bool)
+    for start in range(0, K, chunk):
+        if stop_time is not None and time.clock() > stop_time: break
+        stop = min(start + chunk, K)
+        optimized[start:stop] = True
+        tWV = np.tanh(W.dot(V[:,start:stop]))
+        F = tWV - V[:,start:stop]
+        q = (F**2).sum(axis=0)
+        lam = damping*np.ones(stop-start)
+        active = np.arange(stop-start)
+        for iteration in range(max_iters):
+            if stop_time is not None and time.clock() > stop_time: break
+
+            # stacked Jacobians and gradients
+            J = (1 - tWV[:,active]**2).T[:,:,np.newaxis]*W[np.newaxis,:,:] - I
+            JT = J.transpose(0,2,1)
+            g = np.matmul(JT, F[:,active].T[:,:,np.newaxis])[:,:,0]
+            done = np.sqrt((g**2).sum(axis=1)) < gtol
+            converged[start + active[done]] = True
+            keep = ~done & (lam[active] < max_damping)
+            active, J, JT, g = active[keep], J[keep], JT[keep], g[keep]
+            if len(active) == 0: break
+
+            # damped Gauss-Newton steps
+            A = np.matmul(JT, J)
+            del J, JT
+            A[:,np.arange(N),np.arange(N)] += lam[active][:,np.newaxis]
+            V_new = V[:,start + active] - solve(A, g).T
+            del A
+            tWV_new = np.tanh(W.dot(V_new))
+            F_new = tWV_new - V_new
+            q_new = (F_new**2).sum(axis=0)
+
+            # accept improvements, adjust damping
+            better = q_new < q[active]
+            accepted = active[better]
+            V[:,start + accepted], tWV[:,accepted], F[:,accepted], q[accepted] = V_new[:,better], tWV_new[:,better], F_new[:,better], q_new[better]
+            lam[accepted] /= 3.
+            lam[active[~better]] *= 2.
+    return V, converged, optimized
+
+def baseline_solver(W, timeout=60, max_fxpts=None, max_traj_steps=10, logfile=None, batch_size=None, hessp=False):
     """
     A baseline fixed point solver (Sussillo and Barak 2013)
     Repeatedly samples and optimizes seeds along random trajectories until timing out.
@@ -1161,6 +2954,10 @@ def baseline_solver(W, timeout=60, max_fxpts=None, max_traj_steps=10, logfile=No
     max_traj_steps is the maximum number of steps along a trajectory before optimization starts.
     logfile is a file object open for writing that records progress
       if None, no progress is recorded
+    batch_size is the number of seeds optimized at once by baseline_solver_batch
+      the timeout is also checked between iterations within a batch, so runtime stays close to timeout
+      if None, seeds are optimized one at a time with scipy's trust-ncg
+    hessp should be True for trust-ncg to use matrix-free Hessian-vector products (see BaselineObjective)
     returns fxV, num_reps, where
       fxV[:,p] is the p^{th} (potentially non-fixed or duplicate) point found (a numpy.array)
       num_reps is the number of repetitions performed before timeout (i.e., fxV.shape[1])
@@ -1169,6 +2966,19 @@ def baseline_solver(W, timeout=60, max_fxpts=None, max_traj_steps=10, logfile=No
     fxV = []
     neighbors = lambda X, y: identical_fixed_points(W, X, y)[0]
     start = time.clock()
+    if batch_size is not None:
+        num_reps = 0
+        while True:
+            fxv, _, optimized = baseline_solver_batch(W, baseline_seeds(W, batch_size, max_traj_steps), stop_time=start+timeout)
+            fxV.append(fxv[:,optimized])
+            num_reps += optimized.sum()
+            runtime = time.clock()-start
+            if runtime > timeout: break
+            if logfile is not None:
+                hardwrite(logfile,'%d reps (%f of %fs)\n'%(num_reps, runtime, timeout))
+        if logfile is not None:
+            hardwrite(logfile,'term: %d reps %fs\n'%(num_reps,runtime))
+        return np.concatenate(fxV,axis=1), num_reps
     for num_reps in it.count(1):
 
         # get random initial seed anywhere in range
@@ -1180,8 +2990,7 @@ def baseline_solver(W, timeout=60, max_fxpts=None, max_traj_steps=10, logfile=No
             v = np.tanh(W.dot(v))
 
         # run minimization
-        res = spo.minimize(baseline_solver_qg, v.flatten(), args=(W,), method='trust-ncg', jac=True, hess=baseline_solver_G)
-        fxv = res.x.reshape((W.shape[0],1))
+        fxv = baseline_minimize(W, v, hessp=hessp)
         fxV.append(fxv)
 
         # check termination
@@ -1197,7 +3006,7 @@ def baseline_solver(W, timeout=60, max_fxpts=None, max_traj_steps=10, logfile=No
     fxV = np.concatenate(fxV,axis=1)
     return fxV, num_reps
 
-def local_search(W, max_traj_steps=10, max_repetitions=None, stop_time=None, logfile=None):
+def local_search(W, max_traj_steps=10, max_repetitions=None, stop_time=None, logfile=None, batch_size=None, hessp=False):
     """
     A generator version of the baseline solver.
     Yields (unprocessed) fixed point candidates one by one, for use in a for loop.
@@ -1209,6 +3018,11 @@ def local_search(W, max_traj_steps=10, max_repetitions=None, stop_time=None, log
       if None, search continues until another termination criteria is met
     logfile is a file object open for writing that records progress
       if None, no progress is recorded
+    batch_size is the number of seeds optimized at once by baseline_solver_batch
+      candidates from each batch are then yielded one by one
+      optimization of a batch stops at stop_time, and only seeds whose optimization started are yielded
+      if None, seeds are optimized one at a time with scipy's trust-ncg
+    hessp should be True for trust-ncg to use matrix-free Hessian-vector products (see BaselineObjective)
     yields status, fxv, V where
       status is one of
         "Searching", "Max repetitions", "Timed out"
@@ -1218,20 +3032,31 @@ def local_search(W, max_traj_steps=10, max_repetitions=None, stop_time=None, log
     N = W.shape[0]
     V = []
     status = 'Searching'
+    batch = np.empty((N,0))
     for repetition in it.count(1):
 
-        # get random initial seed anywhere in range
-        v = 2*np.random.rand(W.shape[0],1) - 1
+        if batch_size is not None:
+            # optimize a new batch of seeds once the last one is used up
+            if batch.shape[1] == 0:
+                batch, _, optimized = baseline_solver_batch(W, baseline_seeds(W, batch_size, max_traj_steps), stop_time=stop_time)
+                batch = batch[:,optimized]
+                if batch.shape[1] == 0: # timed out before any seed was optimized
+                    status = 'Timed out'
+                    break
+            fxv, batch = batch[:,:1], batch[:,1:]
+            V.append(fxv)
+        else:
+            # get random initial seed anywhere in range
+            v = 2*np.random.rand(W.shape[0],1) - 1
 
-        # iterate trajectory a random number of steps
-        num_traj_steps = np.random.randint(max_traj_steps)
-        for step in range(num_traj_steps):
-            v = np.tanh(W.dot(v))
+            # iterate trajectory a random number of steps
+            num_traj_steps = np.random.randint(max_traj_steps)
+            for step in range(num_traj_steps):
+                v = np.tanh(W.dot(v))
 
-        # run minimization
-        res = spo.minimize(baseline_solver_qg, v.flatten(), args=(W,), method='trust-ncg', jac=True, hess=baseline_solver_G)
-        fxv = res.x.reshape((W.shape[0],1))
-        V.append(fxv)
+            # run minimization
+            fxv = baseline_minimize(W, v, hessp=hessp)
+            V.append(fxv)
 
         # yield
         yield status, fxv, V
@@ -1252,7 +3077,103 @@ def local_search(W, max_traj_steps=10, max_repetitions=None, stop_time=None, log
 
     yield status, np.empty((N,0)), V
 
-def post_process_fxpts(W, fxV, logfile=None, refine_cap=10000, Winv=None, neighbors=None):
+def local_search_worker(W, random_seed, seed_queue, stop_event, max_traj_steps, batch_size, hessp):
+    """
+    This is a helper function, consider LocalSearchSeeds instead.
+    Worker process loop: runs local_search until stop_event is set,
+      and puts each new refined fixed point found by this worker on seed_queue.
+    Waits for room on seed_queue when it is full, so that at most a bounded number of seeds are waiting.
+    """
+    np.random.seed(random_seed)
+    seed_queue.cancel_join_thread() # exit promptly even if seeds are never consumed
+    found = FixedPointSet(W, V=np.zeros((W.shape[0],1)))
+    for status, fxv, _ in local_search(W, max_traj_steps=max_traj_steps, batch_size=batch_size, hessp=hessp):
+        if stop_event.is_set(): break
+        fx, dup, fxv = found.add(fxv)
+        if dup or not fx: continue
+        while not stop_event.is_set():
+            try:
+                seed_queue.put(fxv, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+
+class LocalSearchSeeds:
+    """
+    Parallel producer of local_search seeds, for overlapping local optimization with fiber traversal.
+    Background worker processes run local_search and feed a bounded queue with seeds that are
+      already refined and fixed, and that are deduplicated (up to sign) both within each worker and across workers.
+    W should be the weight matrix (N by N numpy.array)
+    num_workers is the number of worker processes
+      if None, one fewer than the number of cpus (and at least one)
+    max_queued is the number of seeds that may be waiting in the queue before the workers pause
+    max_traj_steps, batch_size and hessp are passed to local_search
+    Multithreaded BLAS should usually be limited (e.g., OMP_NUM_THREADS=1) to avoid oversubscription.
+    """
+    def __init__(self, W, num_workers=None, max_queued=2**6, max_traj_steps=10, batch_size=None, hessp=False):
+        if num_workers is None: num_workers = max(mp.cpu_count()-1, 1)
+        self.W = W
+        self.found = FixedPointSet(W, V=np.zeros((W.shape[0],1)))
+        self.V = [] # seeds produced so far
+        self.queue = mp.Queue(maxsize=max_queued)
+        self.stop_event = mp.Event()
+        self.workers = []
+        for random_seed in np.random.randint(2**31, size=num_workers):
+            worker = mp.Process(target=local_search_worker,
+                args=(W, random_seed, self.queue, self.stop_event, max_traj_steps, batch_size, hessp))
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+    def get(self, timeout=None):
+        """
+        Waits for the next seed not yet produced by any worker.
+        timeout is the maximum number of (wall clock) seconds to wait
+          if None, waits indefinitely
+        returns fxv, the next seed (N by 1 numpy.array), or None if the timeout elapsed first
+        """
+        wait_until = None if timeout is None else time.time() + timeout
+        while True:
+            wait = 0.1 if wait_until is None else min(0.1, wait_until - time.time())
+            if wait <= 0: return None
+            try:
+                fxv = self.queue.get(timeout=wait)
+            except queue.Empty:
+                continue
+            if len(self.found.find(fxv)) > 0: continue
+            self.found.insert(np.concatenate((fxv, -fxv), axis=1))
+            self.V.append(fxv)
+            return fxv
+
+    def seeds(self, stop_time=None):
+        """
+        A drop-in replacement for the local_search generator, for use in a for loop.
+        stop_time is a clock time (compared with time.clock()) at which production is terminated
+          since time.clock() may not advance while waiting on the workers,
+          the remaining time is also enforced in wall clock seconds
+          if None, production continues until close is called
+        yields status, fxv, V as in local_search, except that
+          status is one of "Searching", "Timed out"
+        """
+        N = self.W.shape[0]
+        wall_stop = None if stop_time is None else time.time() + stop_time - time.clock()
+        while True:
+            if stop_time is not None and (time.clock() > stop_time or time.time() > wall_stop): break
+            fxv = self.get(timeout = 0.1 if stop_time is None else max(min(0.1, wall_stop - time.time()), 0))
+            if fxv is not None: yield 'Searching', fxv, self.V
+        yield 'Timed out', np.empty((N,0)), self.V
+
+    def close(self):
+        """
+        Stops and joins all worker processes
+        """
+        self.stop_event.set()
+        for worker in self.workers:
+            worker.join(timeout=1)
+            if worker.is_alive(): worker.terminate()
+        self.queue.close()
+
+def post_process_fxpts(W, fxV, logfile=None, refine_cap=10000, Winv=None, neighbors=None, index=None, num_workers=None):
     """
     Post-process a set of candidate fixed points:
       1. Refines the approximate point locations via Newton-Raphson
@@ -1266,22 +3187,127 @@ def post_process_fxpts(W, fxV, logfile=None, refine_cap=10000, Winv=None, neighb
     refine_cap is the maximum number of candidates refined at a time
     Winv should be the inverse of W, unless None, in which case it is computed
     neighbors should be a neighbor function as in identical_fixed_points
+      if None, identical_fixed_points is used
+    index should be a GridIndex compatible with neighbors, as in get_connected_components
+      if None and neighbors is None, a fixed_point_index is used
+    num_workers is the number of threads used for refinement, as in refine_fxpts_parallel
+      if None, refinement is single-threaded
     returns fxV_unique, fxV, where
       fxV_unique[:,p] is the p^{th} refined, unique fixed point found
       fxV[:,q] is the q^{th} refined (potentially duplicate) fixed point found
     """
     if logfile is not None: hardwrite(logfile,'Refining fxpts...')
     if Winv is None: Winv = np.linalg.inv(W)
-    fxV, converged = refine_fxpts_capped(W, fxV, cap=refine_cap)
+    if num_workers is not None and num_workers > 1:
+        fxV, converged = refine_fxpts_parallel(W, fxV, num_workers, cap=refine_cap)
+    else:
+        fxV, converged = refine_fxpts_batched(W, fxV, cap=refine_cap)
     fxV = fxV[:,converged]
     N = W.shape[0]
     fxV = np.concatenate((-fxV, np.zeros((N,1)), fxV),axis=1)
     if logfile is not None: hardwrite(logfile,'Uniqueing fxpts...\n')
     if neighbors is None:
-        neighbors = lambda X, y: identical_fixed_points(W, X, y, Winv)[0]
-    fxV_unique = get_unique_points_recursively(fxV, neighbors=neighbors)
+        # compare all candidates at once
+        pairs, _ = identical_fixed_points_graph(W, fxV, Winv=Winv, index=index)
+        _, idx = np.unique(get_graph_components(fxV.shape[1], pairs), return_index=True)
+        fxV_unique = fxV[:,idx]
+    else:
+        fxV_unique = get_unique_points_recursively(fxV, neighbors=neighbors, index=index)
     return fxV_unique, fxV
 
+class PostProcessor:
+    """
+    Streaming version of post_process_fxpts that overlaps with traversal.
+    Candidates submitted with put are refined and de-duplicated in a background thread,
+      so most post-processing is already done by the time traversal finishes.
+    numpy releases the GIL in its linear algebra, so the thread runs concurrently with traversal.
+    W, refine_cap, Winv, neighbors, and index should be as in post_process_fxpts
+    logfile is a file object open for writing that records progress
+      if None, no progress is recorded
+    """
+    def __init__(self, W, logfile=None, refine_cap=10000, Winv=None, neighbors=None, index=None):
+        Winv, _ = fixed_point_constants(W, Winv)
+        if neighbors is None and index is None: index = fixed_point_index(W)
+        if index is not None:
+            index.clear()
+            index.add(np.zeros((W.shape[0],1)))
+        self.W = W
+        self.Winv = Winv
+        self.index = index
+        self.logfile = logfile
+        self.refine_cap = refine_cap
+        self.neighbors = neighbors
+        self.fxV = [] # refined candidates that converged
+        self.fxV_unique = FiberBuffer(W.shape[0]) # one representative per unique point so far
+        self.fxV_unique.append(np.zeros((W.shape[0],1)))
+        self.error = None
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def put(self, fxV):
+        """
+        Submit candidates for post-processing, where fxV[:,p] is the p^{th} candidate fixed point
+        """
+        self.queue.put(fxV)
+
+    def run(self):
+        """
+        Worker loop: processes submitted candidates in batches until finish is called
+        """
+        done = False
+        while not done:
+            # drain whatever else is already waiting, up to the refinement cap
+            batch = [self.queue.get()]
+            while batch[-1] is not None and sum(V.shape[1] for V in batch) < self.refine_cap:
+                try: batch.append(self.queue.get_nowait())
+                except queue.Empty: break
+            done = batch[-1] is None
+            if done: batch.pop()
+            if len(batch) == 0 or self.error is not None: continue
+            try:
+                self.process(np.concatenate(batch, axis=1))
+            except Exception as e:
+                self.error = e
+
+    def process(self, V):
+        """
+        Refine candidates V and add any new unique fixed points (and their negatives)
+        """
+        if V.shape[1] == 0: return
+        V, converged = refine_fxpts_batched(self.W, V.copy(), cap=self.refine_cap)
+        V = V[:,converged]
+        self.fxV.append(V)
+        # radii are shared by v and -v
+        if self.neighbors is None: R = fixed_point_radii(self.W, V, self.Winv)
+        for p in range(V.shape[1]):
+            for v in [V[:,[p]], -V[:,[p]]]:
+                U = self.fxV_unique.array()
+                if self.index is not None: U = U[:,self.index.candidates(v)]
+                if self.neighbors is None:
+                    identical, _, _ = identical_fixed_points(self.W, U, v, self.Winv, R[p])
+                else:
+                    identical = self.neighbors(U, v)
+                if not identical.any():
+                    self.fxV_unique.append(v)
+                    if self.index is not None: self.index.add(v)
+        if self.logfile is not None:
+            hardwrite(self.logfile,'Post-processed %d candidates, %d unique fxpts so far\n'%(len(converged), len(self.fxV_unique)))
+
+    def finish(self):
+        """
+        Wait for all submitted candidates to be processed.
+        returns fxV_unique, fxV as in post_process_fxpts
+        """
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None: raise self.error
+        N = self.W.shape[0]
+        fxV = np.concatenate(self.fxV, axis=1) if len(self.fxV) > 0 else np.empty((N,0))
+        fxV = np.concatenate((-fxV, np.zeros((N,1)), fxV),axis=1)
+        return self.fxV_unique.array().copy(), fxV
+
 def run_solver(W, c=None):
     """
     Convenience wrapper for the traverse algorithm with post-processing.
@@ -1292,16 +3318,13 @@ def run_solver(W, c=None):
       fxpts[:,p] is the p^{th} fixed point found
       fiber[:,n] is the n^{th} point along the fiber encountered during traversal
     """
-    # Run traverse
+    # Run traverse, post-processing candidates as they are found
     # _, fxpts, fiber, _, _, _, _ = traverse(W, c=c, max_traverse_steps = 2**20)
-    fxpts, fiber = [], []
+    post_processor = PostProcessor(W)
     for iterate in directional_fiber(W, c=c, max_traverse_steps = 2**20):
-        fxpts.append(iterate[1])
+        post_processor.put(iterate[1])
         fiber = iterate[2]
-    fxpts = np.concatenate(fxpts, axis=1)
-    fiber = np.concatenate(fiber, axis=1)
-    # Post-process
-    fxpts, _ = post_process_fxpts(W, fxpts)
+    fxpts, _ = post_processor.finish()
     # Return output
     return fxpts, fiber
 
@@ -19,16 +19,19 @@ def get_relative_errors(test_data_id):
     Compute and save the relative errors of every point found on every network in a testing set.
     Relative error is defined in (Katz and Reggia 2017).
     test_data_id should be as in fxpt_experiments.generate_test_data (without file extension).
+    Results are read from and saved to the test data's fxpt_experiments.ResultsStore if it exists.
     """
-    network_sizes, num_samples, _ = fe.load_test_data('%s.npz'%test_data_id)
+    store = fe.find_results_store(test_data_id)
+    network_sizes, num_samples, test_data = fe.load_test_data('%s.npz'%test_data_id)
+    test_data.close()
     for alg in ['traverse','baseline']:
         for (N, S) in zip(network_sizes, num_samples):
             for samp in range(S):
                 print('%s, alg %s, N %d,samp %d'%(test_data_id,alg,N,samp))
-                npz = np.load('results/%s_%s_N_%d_s_%d.npz'%(alg,test_data_id,N,samp))
+                npz = fe.load_result_arrays(store, '%s_%s_N_%d_s_%d'%(alg,test_data_id,N,samp), ['W','fxV'])
                 W = npz['W']
                 fxV = npz['fxV']
-                fxV, converged = rfx.refine_fxpts_capped(W, fxV)
+                fxV, converged = rfx.refine_fxpts_batched(W, fxV)
                 margin = rfx.estimate_forward_error(W, fxV)
                 f = np.tanh(W.dot(fxV))-fxV
                 re = np.fabs(f/margin)
@@ -41,7 +44,7 @@ def get_relative_errors(test_data_id):
                 re_npz['f_un'] = f_un
                 re_npz['re_fx'] = re_fx
                 re_npz['re_un'] = re_un
-                fe.save_npz_file('results/%s_re_%s_N_%d_s_%d.npz'%(alg,test_data_id,N,samp), **re_npz)
+                fe.save_results(store, '%s_re_%s_N_%d_s_%d'%(alg,test_data_id,N,samp), npz=re_npz)
 
 def show_traverse_re_fig(test_data_ids, Ns, samp_range):
     """
@@ -57,7 +60,7 @@ def show_traverse_re_fig(test_data_ids, Ns, samp_range):
     for samp in samp_range:
         for (test_data_id,N) in zip(test_data_ids, Ns):
             print('samp %d, N %d'%(samp,N))
-            npz = np.load('results/traverse_re_%s_N_%d_s_%d.npz'%(test_data_id,N,samp))
+            npz = fe.load_result_arrays(fe.find_results_store(test_data_id), 'traverse_re_%s_N_%d_s_%d'%(test_data_id,N,samp), ['re_fx','re_un'])
             m_fx, m_un = npz['re_fx'], npz['re_un']
             ax = plt.subplot(len(samp_range),len(Ns),sp)
             sp += 1
@@ -83,8 +86,9 @@ def baseline_re_single_analysis(test_data_id, N, samp, cap=10):
     Returns the number of edge cases divided by the difference |T-B| - |B-T| as a percent.
     T and B are as defined in (Katz and Reggia 2017).
     """
-    npz = fe.load_npz_file('results/baseline_re_%s_N_%d_s_%d.npz'%(test_data_id,N,samp))
-    res = fe.load_pkl_file('results/TvB_%s_N_%d_s_%d.pkl'%(test_data_id, N, samp))
+    store = fe.find_results_store(test_data_id)
+    npz = fe.load_result_arrays(store, 'baseline_re_%s_N_%d_s_%d'%(test_data_id,N,samp), ['re_un'])
+    res = fe.load_results(store, 'TvB_%s_N_%d_s_%d'%(test_data_id, N, samp))
     re_un = npz['re_un']
     percent = 100.*(re_un < 2**cap).sum()/np.array(res['T-B']-res['B-T'])
     print('N=%d, samp %d: B-T = %d, T-B = %d, %d (%f%%) possibly unique slow RE(B) < 2**%d'%(N, samp, res['B-T'], res['T-B'],(re_un < 2**cap).sum(), percent, cap))
@@ -98,7 +102,8 @@ def baseline_re_batch_analysis(test_data_id, Ns, cap=10):
       percents[i] is as in baseline_re_single_analysis for the i^{th} sample network.
     """
     percents = []
-    network_sizes, num_samples, _ = fe.load_test_data('%s.npz'%test_data_id)
+    network_sizes, num_samples, test_data = fe.load_test_data('%s.npz'%test_data_id)
+    test_data.close()
     for (N, S) in zip(network_sizes, num_samples):
         if N not in Ns: continue
         for samp in range(S):
@@ -120,7 +125,7 @@ def show_baseline_re_fig(test_data_ids, Ns, samp_range):
     for samp in samp_range:
         for (test_data_id,N) in zip(test_data_ids, Ns):
             print('samp %d, N %d'%(samp,N))
-            npz = np.load('results/baseline_re_%s_N_%d_s_%d.npz'%(test_data_id,N,samp))
+            npz = fe.load_result_arrays(fe.find_results_store(test_data_id), 'baseline_re_%s_N_%d_s_%d'%(test_data_id,N,samp), ['re_fx','re_un'])
             m_fx, m_un = npz['re_fx'], npz['re_un']
             ax = plt.subplot(len(samp_range),len(Ns),sp)
             sp += 1
@@ -137,7 +142,7 @@ def show_baseline_re_fig(test_data_ids, Ns, samp_range):
             baseline_re_single_analysis(test_data_id, N, samp)
     plt.show()
 
-def get_baseline_rd(test_data_id,N,samp,cap,logfilename=os.devnull):
+def get_baseline_rd(test_data_id,N,samp,cap,logfilename=os.devnull,store=None):
     """
     Compute and save relative distances between pairs of points found by the baseline solver.
     Relative distance is defined in (Katz and Reggia 2017).
@@ -145,10 +150,11 @@ def get_baseline_rd(test_data_id,N,samp,cap,logfilename=os.devnull):
     test_data_id should be as in fxpt_experiments.generate_test_data (without file extension).
     Only pairs within a random subset of points of size cap are inspected.
     logfilename is a file name at which progress updates are written.
+    store is a fxpt_experiments.ResultsStore from which to load and in which to save results (None for separate files).
     """
-    logfile = open(logfilename,'w')
+    logfile = rfx.ProgressLog(logfilename,'w')
     logfile.write('Running baseline rd (%s,%d,%d)...\n'%(test_data_id,N,samp))
-    npz = fe.load_npz_file('results/baseline_%s_N_%d_s_%d.npz'%(test_data_id,N,samp))
+    npz = fe.load_result_arrays(store, 'baseline_%s_N_%d_s_%d'%(test_data_id,N,samp), None if store is None else ['W','fxV_converged','fxV_unique'])
     fxV = npz['fxV_converged']
     fxV_unique = npz['fxV_unique']
     W = npz['W']
@@ -157,14 +163,15 @@ def get_baseline_rd(test_data_id,N,samp,cap,logfilename=os.devnull):
         perm = np.random.permutation(fxV.shape[1])
         fxV = fxV[:,perm[:cap]]
     in_RR, out_RR = [],[]
+    R = rfx.fixed_point_radii(W, fxV_unique)
     for j in range(fxV_unique.shape[1]):
         logfile.write('duping %d of %d...\n'%(j,fxV_unique.shape[1]))
-        dups, RR, R = rfx.identical_fixed_points(W, fxV, fxV_unique[:,[j]])
+        dups, RR, _ = rfx.identical_fixed_points(W, fxV, fxV_unique[:,[j]], R=R[j])
         in_RR.append(RR[dups])
         out_RR.append(RR[~dups])
     in_RR, out_RR = np.concatenate(in_RR), np.concatenate(out_RR)
     npz["in_RR"], npz["out_RR"] = in_RR, out_RR
-    fe.save_npz_file('results/baseline_rd_%s_N_%d_s_%d.npz'%(test_data_id,N,samp), **npz)
+    fe.save_results(store, 'baseline_rd_%s_N_%d_s_%d'%(test_data_id,N,samp), npz=npz, new_arrays=['in_RR','out_RR'])
     logfile.write('Done.\n')
     logfile.close()
     print('Done %s %d %d'%(test_data_id,N,samp))
@@ -175,35 +182,35 @@ def pool_get_baseline_rd(args):
     """
     get_baseline_rd(*args)
 
-def run_baseline_rd(test_data_id, Ns, num_procs):
+def run_baseline_rd(test_data_id, Ns, num_procs, resume=False, use_store=False):
     """
     Run get_baseline_rd on all networks in test_data_id whose size is in the list Ns.
     Multiprocessing is used to run on multiple networks in parallel.
     num_procs is the number of processors to use.
+    if resume == True, networks recorded as complete in the run manifest are skipped (see fxpt_experiments.run_pool_jobs).
+    if use_store == True, results are loaded from and saved in the test data's fxpt_experiments.ResultsStore.
     """
     cpu_count = mp.cpu_count()
     print('%d cpus, using %d'%(cpu_count, num_procs))
 
-    pool_args = []
-    network_sizes, num_samples, _ = fe.load_test_data('%s.npz'%test_data_id)
+    store = fe.ResultsStore(test_data_id) if use_store else None
+    pool_args, result_keys = [], []
+    network_sizes, num_samples, test_data = fe.load_test_data('%s.npz'%test_data_id)
+    test_data.close()
     for (N, S) in zip(network_sizes, num_samples):
         if N not in Ns: continue
         cap = 20000
         for s in range(S):
-            logfilename = 'logs/baseline_rd_%s_N_%d_s_%d.log'%(test_data_id,N,s)
-            pool_args.append((test_data_id,N,s,cap,logfilename))
+            result_key = 'baseline_rd_%s_N_%d_s_%d'%(test_data_id,N,s)
+            logfilename = 'logs/%s.log'%result_key
+            pool_args.append((test_data_id,N,s,cap,logfilename,store))
+            result_keys.append(result_key)
+    costs = fe.predict_job_costs(result_keys, [args[1] for args in pool_args], store=store)
     start_time = time.time()
-    test_fun = pool_get_baseline_rd
-    if num_procs < 1: # don't multiprocess
-        for args in pool_args: test_fun(args)
-    else:
-        pool = mp.Pool(processes=num_procs)
-        pool.map(test_fun, pool_args)
-        pool.close()
-        pool.join()
+    fe.run_pool_jobs(pool_get_baseline_rd, pool_args, num_procs, costs=costs, result_keys=result_keys, manifest='results/baseline_rd_%s_manifest.txt'%test_data_id, resume=resume, store=store)
     print('total time: %f'%(time.time()-start_time))
 
-def get_traverse_rd(test_data_id,N,samp,cap,logfilename=os.devnull):
+def get_traverse_rd(test_data_id,N,samp,cap,logfilename=os.devnull,store=None):
     """
     Compute and save relative distances between pairs of points found by the baseline solver.
     Relative distance is defined in (Katz and Reggia 2017).
@@ -211,10 +218,11 @@ def get_traverse_rd(test_data_id,N,samp,cap,logfilename=os.devnull):
     test_data_id should be as in fxpt_experiments.generate_test_data (without file extension).
     Only pairs within a random subset of points of size cap are inspected.
     logfilename is a file name at which progress updates are written.
+    store is a fxpt_experiments.ResultsStore from which to load and in which to save results (None for separate files).
     """
-    logfile = open(logfilename,'w')
+    logfile = rfx.ProgressLog(logfilename,'w')
     logfile.write('Running traverse rd (%s,%d,%d)...\n'%(test_data_id,N,samp))
-    npz = fe.load_npz_file('results/traverse_%s_N_%d_s_%d.npz'%(test_data_id,N,samp))
+    npz = fe.load_result_arrays(store, 'traverse_%s_N_%d_s_%d'%(test_data_id,N,samp), None if store is None else ['W','fxV_converged','fxV_unique'])
     fxV = npz['fxV_converged']
     fxV_unique = npz['fxV_unique']
     W = npz['W']
@@ -223,14 +231,15 @@ def get_traverse_rd(test_data_id,N,samp,cap,logfilename=os.devnull):
         perm = np.random.permutation(fxV.shape[1])
         fxV = fxV[:,perm[:cap]]
     in_RR, out_RR = [],[]
+    R = rfx.fixed_point_radii(W, fxV_unique)
     for j in range(fxV_unique.shape[1]):
         logfile.write('duping %d of %d...\n'%(j,fxV_unique.shape[1]))
-        dups, RR, R = rfx.identical_fixed_points(W, fxV, fxV_unique[:,[j]])
+        dups, RR, _ = rfx.identical_fixed_points(W, fxV, fxV_unique[:,[j]], R=R[j])
         in_RR.append(RR[dups])
         out_RR.append(RR[~dups])
     in_RR, out_RR = np.concatenate(in_RR), np.concatenate(out_RR)
     npz["in_RR"], npz["out_RR"] = in_RR, out_RR
-    fe.save_npz_file('results/traverse_rd_%s_N_%d_s_%d.npz'%(test_data_id,N,samp), **npz)
+    fe.save_results(store, 'traverse_rd_%s_N_%d_s_%d'%(test_data_id,N,samp), npz=npz, new_arrays=['in_RR','out_RR'])
     logfile.write('Done.\n')
     logfile.close()
     print('Done %s %d %d'%(test_data_id,N,samp))
@@ -241,36 +250,36 @@ def pool_get_traverse_rd(args):
     """
     get_traverse_rd(*args)
 
-def run_traverse_rd(test_data_id, Ns, num_procs):
+def run_traverse_rd(test_data_id, Ns, num_procs, resume=False, use_store=False):
     """
     Run get_traverse_rd on all networks in test_data_id whose size is in the list Ns.
     Multiprocessing is used to run on multiple networks in parallel.
     num_procs is the number of processors to use.
+    if resume == True, networks recorded as complete in the run manifest are skipped (see fxpt_experiments.run_pool_jobs).
+    if use_store == True, results are loaded from and saved in the test data's fxpt_experiments.ResultsStore.
     """
 
     cpu_count = mp.cpu_count()
     print('%d cpus, using %d'%(cpu_count, num_procs))
 
-    pool_args = []
-    network_sizes, num_samples, _ = fe.load_test_data('%s.npz'%test_data_id)
+    store = fe.ResultsStore(test_data_id) if use_store else None
+    pool_args, result_keys = [], []
+    network_sizes, num_samples, test_data = fe.load_test_data('%s.npz'%test_data_id)
+    test_data.close()
     for (N,S) in zip(network_sizes, num_samples):
         if N not in Ns: continue
         cap = 20000
         for s in range(S):
-            logfilename = 'logs/traverse_rd_%s_N_%d_s_%d.log'%(test_data_id,N,s)
-            pool_args.append((test_data_id,N,s,cap,logfilename))
+            result_key = 'traverse_rd_%s_N_%d_s_%d'%(test_data_id,N,s)
+            logfilename = 'logs/%s.log'%result_key
+            pool_args.append((test_data_id,N,s,cap,logfilename,store))
+            result_keys.append(result_key)
+    costs = fe.predict_job_costs(result_keys, [args[1] for args in pool_args], store=store)
     start_time = time.time()
-    test_fun = pool_get_traverse_rd
-    if num_procs < 1: # don't multiprocess
-        for args in pool_args: test_fun(args)
-    else:
-        pool = mp.Pool(processes=num_procs)
-        pool.map(test_fun, pool_args)
-        pool.close()
-        pool.join()
+    fe.run_pool_jobs(pool_get_traverse_rd, pool_args, num_procs, costs=costs, result_keys=result_keys, manifest='results/traverse_rd_%s_manifest.txt'%test_data_id, resume=resume, store=store)
     print('total time: %f'%(time.time()-start_time))
 
-def get_simple_rd(test_data_id,N,samp,cap,logfilename=os.devnull):
+def get_simple_rd(test_data_id,N,samp,cap,logfilename=os.devnull,store=None):
     """
     Use simple unique test: if max absolute coordinate-wise difference < 2**-32
     Compute and save distances between pairs of points found by both solvers.
@@ -279,13 +288,14 @@ def get_simple_rd(test_data_id,N,samp,cap,logfilename=os.devnull):
     Only pairs within a random subset of points of size cap are inspected.
     Saves pair-wise distance distribution in histogram with one bucket per integer power of 2
     logfilename is a file name at which progress updates are written.
+    store is a fxpt_experiments.ResultsStore from which to load and in which to save results (None for separate files).
     """
-    logfile = open(logfilename,'w')
+    logfile = rfx.ProgressLog(logfilename,'w')
     rfx.hardwrite(logfile,'Running simple rd (%s,%d,%d)...\n'%(test_data_id,N,samp))
     buckets = {}
     bins = np.arange(-1025,3)
     for method_key in ['traverse','baseline']:
-        npz = fe.load_npz_file('results/%s_%s_N_%d_s_%d.npz'%(method_key,test_data_id,N,samp))
+        npz = fe.load_result_arrays(store, '%s_%s_N_%d_s_%d'%(method_key,test_data_id,N,samp), ['fxV_converged'])
         fxV = npz['fxV_converged']
         buckets[method_key] = np.zeros(len(bins)-1)
         if cap is not None and fxV.shape[1] > cap:
@@ -302,7 +312,7 @@ def get_simple_rd(test_data_id,N,samp,cap,logfilename=os.devnull):
             hist,_ = np.histogram(logdists,bins=bins)
             buckets[method_key] += hist
     npz = {'bins':bins,'traverse_buckets':buckets['traverse'],'baseline_buckets':buckets['baseline']}    
-    fe.save_npz_file('results/simple_rd_%s_N_%d_s_%d.npz'%(test_data_id,N,samp), **npz)
+    fe.save_results(store, 'simple_rd_%s_N_%d_s_%d'%(test_data_id,N,samp), npz=npz)
     rfx.hardwrite(logfile,'Done.\n')
     logfile.close()
     print('Done %s %d %d'%(test_data_id,N,samp))
@@ -313,33 +323,33 @@ def pool_get_simple_rd(args):
     """
     get_simple_rd(*args)
 
-def run_simple_rd(test_data_id, Ns, num_procs):
+def run_simple_rd(test_data_id, Ns, num_procs, resume=False, use_store=False):
     """
     Run get_simple_rd on all networks in test_data_id whose size is in the list Ns.
     Multiprocessing is used to run on multiple networks in parallel.
     num_procs is the number of processors to use.
+    if resume == True, networks recorded as complete in the run manifest are skipped (see fxpt_experiments.run_pool_jobs).
+    if use_store == True, results are loaded from and saved in the test data's fxpt_experiments.ResultsStore.
     """
 
     cpu_count = mp.cpu_count()
     print('%d cpus, using %d'%(cpu_count, num_procs))
 
-    pool_args = []
-    network_sizes, num_samples, _ = fe.load_test_data('%s.npz'%test_data_id)
+    store = fe.ResultsStore(test_data_id) if use_store else None
+    pool_args, result_keys = [], []
+    network_sizes, num_samples, test_data = fe.load_test_data('%s.npz'%test_data_id)
+    test_data.close()
     for (N,S) in zip(network_sizes, num_samples):
         if N not in Ns: continue
         cap = 1000
         for s in range(S):
-            logfilename = 'logs/simple_rd_%s_N_%d_s_%d.log'%(test_data_id,N,s)
-            pool_args.append((test_data_id,N,s,cap,logfilename))
+            result_key = 'simple_rd_%s_N_%d_s_%d'%(test_data_id,N,s)
+            logfilename = 'logs/%s.log'%result_key
+            pool_args.append((test_data_id,N,s,cap,logfilename,store))
+            result_keys.append(result_key)
+    costs = fe.predict_job_costs(result_keys, [args[1] for args in pool_args], store=store)
     start_time = time.time()
-    test_fun = pool_get_simple_rd
-    if num_procs < 1: # don't multiprocess
-        for args in pool_args: test_fun(args)
-    else:
-        pool = mp.Pool(processes=num_procs)
-        pool.map(test_fun, pool_args)
-        pool.close()
-        pool.join()
+    fe.run_pool_jobs(pool_get_simple_rd, pool_args, num_procs, costs=costs, result_keys=result_keys, manifest='results/simple_rd_%s_manifest.txt'%test_data_id, resume=resume, store=store)
     print('total time: %f'%(time.time()-start_time))
 
 def show_traverse_rd_fig(test_data_ids, Ns, samp_range):
@@ -353,7 +363,7 @@ def show_traverse_rd_fig(test_data_ids, Ns, samp_range):
     for samp in samp_range:
         for (test_data_id,N) in zip(test_data_ids, Ns):
             print('samp %d, N %d'%(samp,N))
-            npz = np.load('results/traverse_rd_%s_N_%d_s_%d.npz'%(test_data_id,N,samp))
+            npz = fe.load_result_arrays(fe.find_results_store(test_data_id), 'traverse_rd_%s_N_%d_s_%d'%(test_data_id,N,samp), ['in_RR','out_RR'])
             in_rr, out_rr = npz['in_RR'], npz['out_RR']
             if (in_rr > 0).any(): in_rr[in_rr == 0] = in_rr[in_rr > 0].min()
             else: in_rr[in_rr == 0] = 2**(-30)
@@ -382,7 +392,7 @@ def show_baseline_rd_fig(test_data_ids, Ns, samp_range):
     for samp in samp_range:
         for (test_data_id,N) in zip(test_data_ids, Ns):
             print('samp %d, N %d'%(samp,N))
-            npz = np.load('results/baseline_rd_%s_N_%d_s_%d.npz'%(test_data_id,N,samp))
+            npz = fe.load_result_arrays(fe.find_results_store(test_data_id), 'baseline_rd_%s_N_%d_s_%d'%(test_data_id,N,samp), ['in_RR','out_RR'])
             in_rr, out_rr = npz['in_RR'], npz['out_RR']
             if (in_rr > 0).any(): in_rr[in_rr == 0] = in_rr[in_rr > 0].min()
             else: in_rr[in_rr == 0] = 2**(-30)
@@ -425,7 +435,7 @@ def show_simple_rd_all_fig(test_data_ids, Ns, samp_range):
     for samp in samp_range:
         for (test_data_id,N) in zip(test_data_ids, Ns):
             print('samp %d, N %d'%(samp,N))
-            npz = np.load('results/simple_rd_%s_N_%d_s_%d.npz'%(test_data_id,N,samp))
+            npz = fe.load_result_arrays(fe.find_results_store(test_data_id), 'simple_rd_%s_N_%d_s_%d'%(test_data_id,N,samp), ['bins','traverse_buckets','baseline_buckets'])
             if buckets is None:
                 buckets = np.zeros(npz['traverse_buckets'].shape)
                 bins = npz['bins']
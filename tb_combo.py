@@ -35,7 +35,7 @@ def setdiff(fxV1, fxV2):
 
 def union(fxV1, fxV2):
     fxV = np.concatenate((fxV1, fxV2), axis=1)
-    fxV = rfx.get_unique_points_recursively(fxV, neighbors=neighbors)
+    fxV = rfx.get_unique_points_recursively(fxV, neighbors=neighbors, index=rfx.tolerance_index(fxV.shape[0]))
     return fxV
 
 def add_alpha_mins(W, VA, fxV):
@@ -48,16 +48,19 @@ def add_alpha_mins(W, VA, fxV):
     seed_mask[2:] |= local_mins
     slowV = VA[:N, seed_mask]
     fxV = np.concatenate((fxV,slowV),axis=1)
-    fxV, _ = rfx.post_process_fxpts(W, fxV,neighbors=neighbors)
+    fxV, _ = rfx.post_process_fxpts(W, fxV, neighbors=neighbors, index=rfx.tolerance_index(W.shape[0]))
     return fxV
 
-def test_tbc(test_data_id, N, s,verbose=0):
+def test_tbc(test_data_id, N, s,verbose=0, early_merge=False):
+    # early_merge stops each traversal once it merges into the fiber of an earlier one (see rfx.FiberIndex)
     # load data
     npz = {'T': fe.load_npz_file('results/traverse_full_base_N_%d_s_%d.npz'%(N,samp)),
          'B': fe.load_npz_file('results/baseline_full_base_N_%d_s_%d.npz'%(N,samp))}
     knV = npz['T']['V']
     W = npz['T']['W']
     c = npz['T']['c']
+    fiber_index = rfx.FiberIndex(N) if early_merge else None
+    if early_merge: fiber_index.add(c, npz['T']['VA'])
 
     # add alpha mins
     npz['T']['fxV_unique'] = add_alpha_mins(W, npz['T']['VA'], npz['T']['fxV_unique'])
@@ -68,6 +71,8 @@ def test_tbc(test_data_id, N, s,verbose=0):
     
     found = [npz['T']['fxV_unique']] # initial Traverse results
     seeds = [setdiff(npz['B']['fxV_unique'],found[0])] # B - T initial seeds
+    npz['T'].close()
+    npz['B'].close()
     seed = [np.zeros((N,1))]
     new = [np.empty((N,0))]
     statuses = ['success']
@@ -82,16 +87,17 @@ def test_tbc(test_data_id, N, s,verbose=0):
         seed.append(seeds[k-1][:,[0]])
     
         va = np.concatenate((seed[k],np.array([[0]])),axis=0) # include alpha in seed
-        status, fxV, VA, c, _, _, _ = rfx.traverse(W, va=va, c=c, max_traverse_steps = 2**20)
+        status, fxV, VA, c, step_sizes, _, _ = rfx.traverse(W, va=va, c=c, max_traverse_steps = 2**20, fiber_index=fiber_index)
         statuses.append(status)
+        if early_merge: fiber_index.add(c, VA, step_sizes)
     
-        if status != 'Closed loop detected':
+        if status not in ['Closed loop detected', 'Merged']:
             # need to go both directions if non-cloops
             raw_input('not cloop...')
             pass
     
         fxV = np.concatenate((seed[k],fxV),axis=1) # be sure to include seed(t)
-        fxV, _ = rfx.post_process_fxpts(W, fxV, neighbors=neighbors)
+        fxV, _ = rfx.post_process_fxpts(W, fxV, neighbors=neighbors, index=rfx.tolerance_index(W.shape[0]))
     
         new.append(fxV)
         found.append(union(found[k-1], new[k]))